@@ -0,0 +1,202 @@
+import errno
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from manifest import file_hash
+
+LINK_MODES = ("copy", "hardlink", "reflink")
+# ioctl request number to clone a file's extents on Linux (btrfs, XFS, ...)
+FICLONE = 0x40049409
+
+
+def _copy_file_range(src, dst):
+    # Copies in the kernel, which may itself share extents on CoW filesystems
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        remaining = os.fstat(fsrc.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+
+
+def _reflink(src, dst):
+    import fcntl
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+
+
+def _copy(src, dst, link_mode):
+    if link_mode == "hardlink":
+        try:
+            os.link(src, dst)
+            return
+        except OSError as e:
+            # Across filesystems, or where links aren't supported, copy instead
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                raise
+    elif link_mode == "reflink":
+        try:
+            _reflink(src, dst)
+            shutil.copystat(src, dst)
+            return
+        except (OSError, ImportError):
+            pass
+    if hasattr(os, "copy_file_range"):
+        try:
+            _copy_file_range(src, dst)
+            shutil.copystat(src, dst)
+            return
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+
+
+def is_up_to_date(src, dst, check_hash=False):
+    """
+    Checks whether dst already holds the contents of src.
+
+    Files of equal size and mtime are taken to match. With check_hash, files
+    of equal size but different mtime are compared by hash, and a match has
+    its mtime brought in line so the next check is cheap again.
+
+    Args:
+        src (str): The path to the source file.
+        dst (str): The path to the destination file.
+        check_hash (bool): Whether to fall back to comparing hashes.
+
+    Returns:
+        bool: True if dst does not need to be copied.
+    """
+    try:
+        dst_stat = os.stat(dst)
+    except FileNotFoundError:
+        return False
+    src_stat = os.stat(src)
+    if src_stat.st_size != dst_stat.st_size:
+        return False
+    if src_stat.st_mtime_ns == dst_stat.st_mtime_ns:
+        return True
+    if check_hash and file_hash(src) == file_hash(dst):
+        os.utime(dst, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+        return True
+    return False
+
+
+def _sync_transformed(src, dst, transform):
+    # The output differs from the source, so it is compared by content
+    with open(src, 'rb') as f:
+        data = transform(f.read())
+    try:
+        with open(dst, 'rb') as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp_path = f"{dst}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, dst)
+    return True
+
+
+def sync_file(src, dst, link_mode="copy", check_hash=False, transform=None):
+    """
+    Copies src to dst unless dst is already up to date, keeping the source's
+    mtime so later syncs can skip it.
+
+    Args:
+        src (str): The path to the source file.
+        dst (str): The path to the destination file.
+        link_mode (str): "copy", "hardlink" or "reflink". Links fall back to
+            copying when source and destination can't share the file.
+        check_hash (bool): Whether to compare hashes when mtimes differ.
+        transform (callable): If given, dst is written with transform applied
+            to the bytes of src, e.g. a minifier, rather than as a copy.
+
+    Returns:
+        bool: True if the file was copied.
+    """
+    if transform is not None:
+        return _sync_transformed(src, dst, transform)
+    if is_up_to_date(src, dst, check_hash):
+        return False
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    # Never write through an existing file, which may be a hardlink to a source
+    if os.path.lexists(dst):
+        os.remove(dst)
+    _copy(src, dst, link_mode)
+    return True
+
+
+def prune_destination(destination, wanted):
+    """
+    Deletes the files in destination that are not wanted, and the
+    directories left empty by that.
+
+    Args:
+        destination (str): The destination directory.
+        wanted (iterable): The paths to keep, relative to destination.
+
+    Returns:
+        list: The relative paths of the deleted files.
+    """
+    if not os.path.isdir(destination):
+        return []
+    wanted = {os.path.normpath(rel_path) for rel_path in wanted}
+    removed = []
+    for dirpath, dirnames, filenames in os.walk(destination, topdown=False):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            rel_path = os.path.relpath(path, destination)
+            if rel_path not in wanted:
+                os.remove(path)
+                removed.append(rel_path)
+        if dirpath != destination and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+    return removed
+
+
+def sync_assets(source, destination, link_mode="copy", check_hash=False, prune=False, jobs=None, transforms=None):
+    """
+    Mirrors every file under source into destination, copying only the files
+    that changed, with the copies run concurrently in a thread pool.
+
+    Args:
+        source (str): The source directory.
+        destination (str): The destination directory.
+        link_mode (str): "copy", "hardlink" or "reflink", as for sync_file.
+        check_hash (bool): Whether to compare hashes when mtimes differ.
+        prune (bool): Whether to delete files in destination that are not
+            in source, and the directories left empty by that.
+        jobs (int): The number of copy threads; None picks a default.
+        transforms (dict): File extension, e.g. ".css", to the transform
+            files with it are written through, see sync_file.
+
+    Returns:
+        dict: Path relative to destination to True if it was copied, False
+            if it was already up to date.
+    """
+    if link_mode not in LINK_MODES:
+        raise ValueError(f"Unknown link mode {link_mode}, expected one of {', '.join(LINK_MODES)}")
+    relative_paths = []
+    for dirpath, _, filenames in os.walk(source):
+        for filename in filenames:
+            relative_paths.append(os.path.relpath(os.path.join(dirpath, filename), source))
+
+    if prune:
+        prune_destination(destination, relative_paths)
+
+    transforms = transforms or {}
+
+    def sync(rel_path):
+        transform = transforms.get(os.path.splitext(rel_path)[1].lower())
+        return sync_file(os.path.join(source, rel_path), os.path.join(destination, rel_path), link_mode, check_hash,
+                         transform)
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = dict(zip(relative_paths, executor.map(sync, relative_paths)))
+    copied = sum(results.values())
+    print(f"Synced {source} to {destination}: {copied} files copied, {len(results) - copied} unchanged")
+    return results
@@ -0,0 +1,168 @@
+"""
+Benchmarks the single-pass inline tokenizer against the chained
+split_nodes_* passes it replaced, on paragraphs with many links, the
+pre-screened image and link extraction on prose-heavy pages, and the
+table-driven, batched inline serialization against the if/elif chain and
+LeafNode.to_html it replaced.
+
+Run with: python3 src/bench_inline.py
+"""
+import re
+import timeit
+from corpus import CorpusSpec, page_markdown
+from block import markdown_to_blocks
+from textnode import TextNode, TextType, text_node_to_html_node, text_nodes_to_html
+from inline import (split_nodes_delimiter, split_nodes_image, split_nodes_link, text_to_textnodes,
+                    extract_markdown_images, extract_markdown_links)
+
+def rescanning_split_nodes(old_nodes, extract, markdown_format, text_type):
+    # The original split_nodes_image/split_nodes_link: re-extract from the
+    # remaining text after every match, which is quadratic in the match count
+    result = []
+    for node in old_nodes:
+        current_text = node.text
+        if not extract(current_text):
+            result.append(node)
+            continue
+        while extract(current_text):
+            anchor, url = extract(current_text)[0]
+            before_text, current_text = current_text.split(markdown_format.format(anchor, url), 1)
+            if before_text:
+                result.append(TextNode(before_text, TextType.TEXT))
+            result.append(TextNode(anchor, text_type, url))
+        if current_text:
+            result.append(TextNode(current_text, TextType.TEXT))
+    return result
+
+def uncompiled_extract_images(text):
+    return re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+
+def uncompiled_extract_links(text):
+    return re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+
+def chained_text_to_textnodes(text):
+    # The original text_to_textnodes: five passes over the node list
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = rescanning_split_nodes(nodes, uncompiled_extract_images, "![{}]({})", TextType.IMAGE)
+    return rescanning_split_nodes(nodes, uncompiled_extract_links, "[{}]({})", TextType.LINK)
+
+def chained_finditer_text_to_textnodes(text):
+    # The same passes with today's finditer-based, pre-screened split_nodes_*
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_image(nodes)
+    return split_nodes_link(nodes)
+
+def link_paragraph(links):
+    # One long run of text between links, as in a link-heavy list of references
+    return " ".join(f"see [page {i}](/docs/page-{i})" for i in range(links))
+
+def mixed_paragraph(links):
+    parts = []
+    for i in range(links):
+        parts.append(f"See **note {i}** and [page {i}](/docs/page-{i}) or ![figure {i}](/images/fig-{i}.png) for `item{i}`.")
+    return " ".join(parts)
+
+def uncompiled_extract(text):
+    # The original extraction: raw pattern strings on every call, no pre-check
+    return uncompiled_extract_images(text), uncompiled_extract_links(text)
+
+def prose_blocks(pages):
+    # Long paragraphs with almost no markup, as in essays and docs prose
+    spec = CorpusSpec(pages=pages, paragraphs=20, links=0, images=0, list_depth=0, code_blocks=0, words=150)
+    blocks = []
+    for i in range(pages):
+        for block in markdown_to_blocks(page_markdown(i, spec)):
+            # Keep only the plain prose, dropping the corpus's inline spans
+            blocks.append(" ".join(word for word in block.split() if word.isalpha()))
+    return blocks
+
+def bench_prose():
+    blocks = prose_blocks(50)
+    number = 5
+    timings = {
+        "uncompiled extract": lambda: [uncompiled_extract(block) for block in blocks],
+        "pre-screened extract": lambda: [(extract_markdown_images(block), extract_markdown_links(block)) for block in blocks],
+        "original chained passes": lambda: [chained_text_to_textnodes(block) for block in blocks],
+        "finditer chained passes": lambda: [chained_finditer_text_to_textnodes(block) for block in blocks],
+        "single-pass text_to_textnodes": lambda: [text_to_textnodes(block) for block in blocks],
+    }
+    print(f"prose: {len(blocks)} blocks, {sum(map(len, blocks)) // 1024} KiB")
+    for name, func in timings.items():
+        seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+        print(f"  {name:30s} {seconds * 1000:8.3f} ms")
+
+class ChainLeafNode:
+    # The original LeafNode: a fresh list of self-closing tags per call, a
+    # loop over props and no escaping
+    def __init__(self, tag, value, props=None):
+        self.tag = tag
+        self.value = value
+        self.props = props
+
+    def to_html(self):
+        self_closing_tags = ["img", "br", "hr", "input", "meta", "link"]
+        if self.tag is None:
+            return self.value or ""
+        props_html = ""
+        if self.props:
+            for key, value in self.props.items():
+                props_html += f' {key}="{value}"'
+        if self.tag in self_closing_tags:
+            return f"<{self.tag}{props_html} />"
+        return f"<{self.tag}{props_html}>{self.value}</{self.tag}>"
+
+def chain_text_node_to_html_node(text_node):
+    # The original if/elif dispatch
+    if text_node.text_type == TextType.TEXT:
+        return ChainLeafNode(None, text_node.text)
+    elif text_node.text_type == TextType.BOLD:
+        return ChainLeafNode("b", text_node.text)
+    elif text_node.text_type == TextType.ITALIC:
+        return ChainLeafNode("i", text_node.text)
+    elif text_node.text_type == TextType.CODE:
+        return ChainLeafNode("code", text_node.text)
+    elif text_node.text_type == TextType.LINK:
+        return ChainLeafNode("a", text_node.text, {"href": text_node.url})
+    elif text_node.text_type == TextType.IMAGE:
+        return ChainLeafNode("img", "", {"src": text_node.url, "alt": text_node.text})
+    raise Exception("Text node is not a text")
+
+def bench_serialize():
+    spec = CorpusSpec(pages=50)
+    spans = [text_to_textnodes(block.replace("\n", " ")) for i in range(spec.pages)
+             for block in markdown_to_blocks(page_markdown(i, spec)) if not block.startswith(("```", "-", "#", ">"))]
+    count = sum(map(len, spans))
+    number = 5
+    timings = {
+        "if/elif chain, unescaped": lambda: ["".join(chain_text_node_to_html_node(node).to_html() for node in span) for span in spans],
+        "table, LeafNode per node": lambda: ["".join(text_node_to_html_node(node).to_html() for node in span) for span in spans],
+        "table, batched": lambda: [text_nodes_to_html(span) for span in spans],
+    }
+    print(f"serialize: {len(spans)} spans, {count} text nodes")
+    for name, func in timings.items():
+        seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+        print(f"  {name:30s} {seconds * 1000:8.3f} ms  {seconds * 1e9 / count:6.0f} ns/node")
+
+def main():
+    for name, make_paragraph in (("links", link_paragraph), ("mixed", mixed_paragraph)):
+        for links in (10, 100, 500, 1000):
+            text = make_paragraph(links)
+            assert chained_text_to_textnodes(text) == text_to_textnodes(text)
+            number = max(1, 1000 // links)
+            timings = [
+                min(timeit.repeat(lambda: func(text), number=number, repeat=3)) / number
+                for func in (chained_text_to_textnodes, chained_finditer_text_to_textnodes, text_to_textnodes)
+            ]
+            print(f"{name} {links:5d} links: original chained {timings[0] * 1000:9.3f} ms  "
+                  f"finditer chained {timings[1] * 1000:8.3f} ms  single-pass {timings[2] * 1000:8.3f} ms")
+    bench_prose()
+    bench_serialize()
+
+if __name__ == "__main__":
+    main()
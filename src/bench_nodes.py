@@ -0,0 +1,78 @@
+"""
+Measures the memory and allocations of node trees with the slotted node
+classes against plain classes shaped like the previous ones.
+
+Run with: python3 src/bench_nodes.py [--pages N]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from htmlnode import LeafNode
+from textnode import TextNode, TextType, text_node_to_html_node
+from corpus import CorpusSpec, page_markdown
+from block import markdown_to_html_node
+
+
+class DictLeafNode:
+    # The previous layout: a __dict__ per node and fresh [] and {} per leaf
+    def __init__(self, tag, value, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = []
+        self.props = props or {}
+
+
+class DictTextNode:
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+def measure(build):
+    """
+    Runs build under tracemalloc and returns (bytes still allocated by what
+    it built, allocations made, seconds).
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    seconds = time.perf_counter() - start
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = snapshot.statistics("filename")
+    size = sum(stat.size for stat in stats)
+    count = sum(stat.count for stat in stats)
+    del result
+    return size, count, seconds
+
+
+def report(name, count, measured):
+    size, allocations, seconds = measured
+    print(f"{name:34s} {size / count:8.1f} bytes/node  {allocations / count:6.2f} allocations/node  {seconds * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure node memory and allocations.")
+    parser.add_argument("--nodes", type=int, default=200000)
+    parser.add_argument("--pages", type=int, default=20)
+    args = parser.parse_args()
+    n = args.nodes
+
+    report("dict LeafNode", n, measure(lambda: [DictLeafNode("b", "text") for _ in range(n)]))
+    report("slotted LeafNode", n, measure(lambda: [LeafNode("b", "text") for _ in range(n)]))
+    report("dict TextNode", n, measure(lambda: [DictTextNode("text", TextType.BOLD) for _ in range(n)]))
+    report("slotted TextNode", n, measure(lambda: [TextNode("text", TextType.BOLD) for _ in range(n)]))
+    text_nodes = [TextNode("text", TextType.LINK, "/url") for _ in range(n)]
+    report("text_node_to_html_node (links)", n, measure(lambda: [text_node_to_html_node(node) for node in text_nodes]))
+
+    spec = CorpusSpec(pages=args.pages)
+    pages = [page_markdown(i, spec) for i in range(args.pages)]
+    size, allocations, seconds = measure(lambda: [markdown_to_html_node(page) for page in pages])
+    print(f"{args.pages} corpus pages as node trees: {size / 1024:.1f} KiB, {allocations} allocations, {seconds * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
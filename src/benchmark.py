@@ -0,0 +1,212 @@
+"""
+Benchmarks the Markdown pipeline on a synthetic corpus and compares the
+timings with a stored baseline.
+
+Run with: python3 src/benchmark.py [--pages N ...] [--save-baseline]
+
+Timings are only comparable on the machine that recorded the baseline, so
+record one with --save-baseline on the machine that runs the comparison.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from corpus import (CorpusSpec, add_spec_arguments, code_markdown, generate_corpus, nested_list_markdown, page_markdown,
+                    paragraph_markdown)
+from block import markdown_to_html_node
+from highlight import highlight
+from inline import text_to_textnodes
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench_baseline.json")
+
+
+def best_of(func, repeat):
+    """Runs func repeat times and returns the fastest run in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_markdown_to_html_node(spec, repeat):
+    markdown = page_markdown(1, spec)
+    return best_of(lambda: markdown_to_html_node(markdown), repeat)
+
+
+def bench_text_to_textnodes(spec, repeat):
+    rng = random.Random(spec.seed)
+    paragraphs = [paragraph_markdown(rng, spec, spec.pages) for _ in range(spec.paragraphs)]
+    return best_of(lambda: [text_to_textnodes(paragraph) for paragraph in paragraphs], repeat)
+
+
+def bench_to_html(spec, repeat):
+    html_node = markdown_to_html_node(page_markdown(1, spec))
+    return best_of(html_node.to_html, repeat)
+
+
+def code_heavy_markdown(spec, blocks_per_page=20):
+    """A document of fenced Python blocks, as many as a code-heavy page has on every page of the corpus."""
+    rng = random.Random(spec.seed)
+    return "\n\n".join(code_markdown(rng, spec, "python") for _ in range(spec.pages * blocks_per_page)) + "\n"
+
+
+def bench_highlight(spec, repeat):
+    # Cold: every block is tokenized
+    markdown = code_heavy_markdown(spec)
+
+    def render():
+        highlight.cache_clear()
+        markdown_to_html_node(markdown)
+    return best_of(render, repeat)
+
+
+def bench_highlight_cached(spec, repeat):
+    # Warm: every block is already in the highlight cache, as in a rebuild
+    markdown = code_heavy_markdown(spec)
+    markdown_to_html_node(markdown)
+    return best_of(lambda: markdown_to_html_node(markdown), repeat)
+
+
+def bench_nested_lists(spec, repeat):
+    # One list eight levels deep per page, in a single document
+    rng = random.Random(spec.seed)
+    markdown = "\n\n".join(nested_list_markdown(rng, spec, 8) for _ in range(spec.pages)) + "\n"
+    return best_of(lambda: markdown_to_html_node(markdown), repeat)
+
+
+def bench_deep_list(spec, repeat):
+    # A single list far deeper than the recursion limit would allow
+    markdown = nested_list_markdown(random.Random(spec.seed), spec, 1200)
+    return best_of(lambda: markdown_to_html_node(markdown).to_html(), repeat)
+
+
+def bench_full_build(spec, repeat):
+    # Imported here so the other benchmarks don't pull in the build machinery
+    from main import generate_pages_recursive
+    with tempfile.TemporaryDirectory() as tmp:
+        content = os.path.join(tmp, "content")
+        template = os.path.join(tmp, "template.html")
+        generate_corpus(content, spec)
+        with open(template, 'w') as f:
+            f.write("<html><head><title>{{ Title }}</title></head><body>{{ Content }}</body></html>")
+
+        def build():
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_pages_recursive(content, template, content, os.path.join(tmp, "docs"))
+        return best_of(build, repeat)
+
+
+def bench_plan_cached(spec, repeat):
+    # Finding every page, its output path and its metadata, with the
+    # metadata cache warmed by a first pass, as on a build with no changes
+    from main import collect_pages
+    from metadata import read_site_index
+    import metadata_cache
+    with tempfile.TemporaryDirectory() as tmp:
+        content = os.path.join(tmp, "content")
+        docs = os.path.join(tmp, "docs")
+        generate_corpus(content, spec)
+        metadata_cache.configure(os.path.join(tmp, "metadata.db"))
+        try:
+            read_site_index(collect_pages(content, content, docs), docs)
+            return best_of(lambda: read_site_index(collect_pages(content, content, docs), docs), repeat)
+        finally:
+            metadata_cache.disable()
+
+
+# Benchmark name to function(spec, repeat) returning the best time in seconds
+BENCHMARKS = {
+    "markdown_to_html_node": bench_markdown_to_html_node,
+    "text_to_textnodes": bench_text_to_textnodes,
+    "to_html": bench_to_html,
+    "highlight": bench_highlight,
+    "highlight_cached": bench_highlight_cached,
+    "nested_lists": bench_nested_lists,
+    "deep_list": bench_deep_list,
+    "full_build": bench_full_build,
+    "plan_cached": bench_plan_cached,
+}
+
+
+def run_benchmarks(spec, repeat=5, names=None):
+    """
+    Runs the benchmarks.
+
+    Args:
+        spec (CorpusSpec): The shape of the synthetic corpus.
+        repeat (int): How many times to run each benchmark; the best run counts.
+        names (list): The benchmarks to run; all of them if None.
+
+    Returns:
+        dict: Benchmark name to best time in seconds.
+    """
+    results = {}
+    for name in names or BENCHMARKS:
+        results[name] = BENCHMARKS[name](spec, repeat)
+        print(f"{name:28s} {results[name] * 1000:10.3f} ms")
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    Compares results with a baseline recorded for the same corpus.
+
+    Args:
+        results (dict): Benchmark name to seconds.
+        baseline (dict): Benchmark name to seconds.
+        tolerance (float): The allowed slowdown, e.g. 0.2 for 20%.
+
+    Returns:
+        list: The names of the benchmarks that regressed.
+    """
+    regressions = []
+    for name, seconds in results.items():
+        if name not in baseline:
+            continue
+        ratio = seconds / baseline[name]
+        status = "REGRESSION" if ratio > 1 + tolerance else "ok"
+        print(f"{name:28s} {ratio:6.2f}x baseline  {status}")
+        if status != "ok":
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Markdown pipeline on a synthetic corpus.")
+    add_spec_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark; the best one counts")
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS), help="run only this benchmark")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="the baseline file to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before failing")
+    args = parser.parse_args()
+    spec = CorpusSpec(**{name: getattr(args, name) for name in CorpusSpec().as_dict()})
+
+    results = run_benchmarks(spec, args.repeat, args.only)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({"spec": spec.as_dict(), "results": results}, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; record one with --save-baseline")
+        return
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    if baseline["spec"] != spec.as_dict():
+        print("Baseline was recorded for a different corpus; not comparing")
+        return
+    if compare_with_baseline(results, baseline["results"], args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,21 @@
+import io
 import os
+import re
 from enum import Enum
-from htmlnode import HTMLNode, LeafNode, ParentNode
-from inline import text_to_textnodes, extract_title
-from textnode import TextNode, TextType, text_node_to_html_node
+from highlight import highlight, info_language
+from htmlnode import HTMLNode, LeafNode, ParentNode, RawNode, escape_text
+from inline import text_to_textnodes
+from metadata import read_metadata
+from textnode import TextType, text_nodes_to_html
+from template import RelocatableHTML, load_template, relocate
+import feeds
+import images
+import links
+import minify
+import profiler
+import render_cache
+import targets
+import writer
 class BlockType(Enum):
     """
     Enum for different block types in a Markdown document.
@@ -14,6 +27,197 @@ class BlockType(Enum):
     UNORDERED_LIST = "unordered_list"
     ORDERED_LIST = "ordered_list"
 
+# The opening or closing line of a fenced code block
+FENCE = "```"
+# A list item marker at the start of a line: indentation, then "- " or "N. "
+LIST_MARKER = re.compile(r"( *)(?:-|(\d+)\.) ")
+
+class Block:
+    """
+    A block of a Markdown document: its lines, with the surrounding
+    whitespace of the block stripped, and its type. The type is worked out
+    on first use, so a block served from the render cache is never
+    classified.
+    """
+    __slots__ = ("lines", "_block_type", "_level")
+
+    def __init__(self, lines, block_type=None, level=0):
+        self.lines = lines
+        self._block_type = block_type
+        self._level = level
+
+    def _classify(self):
+        self._block_type, self._level = classify_lines(self.lines)
+
+    @property
+    def block_type(self):
+        if self._block_type is None:
+            self._classify()
+        return self._block_type
+
+    @property
+    def level(self):
+        """The number of leading # characters, for headings."""
+        if self._block_type is None:
+            self._classify()
+        return self._level
+
+    @property
+    def text(self):
+        return "\n".join(self.lines)
+
+    def __repr__(self):
+        return f"Block({self.block_type.value}, {self.lines})"
+
+def heading_level(line):
+    """
+    Returns the level of a heading line (1 to 6), or 0 if it is not a heading.
+    """
+    hash_count = len(line) - len(line.lstrip("#"))
+    # Check if 1-6 # followed by a space
+    if 1 <= hash_count <= 6 and line[hash_count:hash_count + 1] == " ":
+        return hash_count
+    return 0
+
+@profiler.profiled("block_to_block_type")
+def classify_lines(lines):
+    """
+    Determines the block type of a block from its lines, looking at each
+    line once.
+
+    Args:
+        lines (list): The lines of the block, without newlines.
+
+    Returns:
+        tuple: The BlockType and, for headings, the heading level.
+    """
+    level = heading_level(lines[0])
+    if level:
+        return BlockType.HEADING, level
+
+    unordered = quote = ordered = True
+    for i, line in enumerate(lines, 1):
+        unordered = unordered and line.startswith("- ")
+        quote = quote and line.startswith(">")
+        ordered = ordered and line.startswith(f"{i}. ")
+        if not (unordered or quote or ordered):
+            break
+
+    if unordered:
+        return BlockType.UNORDERED_LIST, 0
+    if lines[0].startswith("```") and lines[-1].endswith("```"):
+        return BlockType.CODE, 0
+    if quote:
+        return BlockType.QUOTE, 0
+    if ordered:
+        return BlockType.ORDERED_LIST, 0
+    marker = LIST_MARKER.match(lines[0])
+    if marker and is_nested_list(lines, marker.group(2) is not None):
+        return (BlockType.ORDERED_LIST if marker.group(2) else BlockType.UNORDERED_LIST), 0
+    return BlockType.PARAGRAPH, 0
+
+def is_nested_list(lines, ordered):
+    """
+    Checks whether a block is a list whose items hold indented content,
+    i.e. nested lists or more blocks: every line is either an item marker
+    of the list's kind, indented, or a "lazy" continuation of the paragraph
+    on the line before, as list_block_to_html_node reads it, and at least
+    one is not a marker.
+    """
+    nested = False
+    previous = lines[0]
+    for line in lines[1:]:
+        if not line or line[0] == " ":
+            nested = True
+        else:
+            marker = LIST_MARKER.match(line)
+            if marker is None:
+                # Only a paragraph line carries on without indentation
+                if not previous or _opens_fence(line):
+                    return False
+                nested = True
+            elif (marker.group(2) is not None) != ordered:
+                return False
+        previous = line
+    return nested
+
+def make_block(lines):
+    """
+    Builds a Block from the raw lines between two blank lines, stripping
+    the whitespace around the block as a whole. Returns None if the lines
+    are all whitespace. The block is classified later, when needed.
+    """
+    start, end = 0, len(lines)
+    while start < end and not lines[start].strip():
+        start += 1
+    while end > start and not lines[end - 1].strip():
+        end -= 1
+    if start == end:
+        return None
+    lines = lines[start:end]
+    lines[0] = lines[0].lstrip()
+    lines[-1] = lines[-1].rstrip()
+    return Block(lines)
+
+@profiler.profiled_generator("markdown_to_blocks")
+def iter_blocks(source):
+    """
+    Splits Markdown into blocks, reading it line by line. Blocks are
+    separated by empty lines and are yielded as soon as they end, so only
+    one block is held in memory at a time.
+
+    Args:
+        source: The Markdown document, either as a string or as an iterable
+            of lines such as an open text file.
+
+    Yields:
+        Block: The blocks, in document order.
+    """
+    if isinstance(source, str):
+        source = source.split("\n")
+    lines = []
+    # Whether the block is a fenced code block still open, or a list
+    fenced = in_list = False
+    # Blank lines after a list, held until the next line shows whether the
+    # list goes on: an indented line continues its last item
+    blanks = 0
+    for line in source:
+        if line.endswith("\n"):
+            line = line[:-1]
+        if fenced:
+            # Blank lines belong to the code until the closing fence
+            lines.append(line)
+            fenced = not line.lstrip().startswith(FENCE)
+            continue
+        if not line:
+            if in_list:
+                blanks += 1
+            elif lines:
+                block = make_block(lines)
+                if block:
+                    yield block
+                lines = []
+            continue
+        if blanks:
+            if line[0] == " ":
+                lines.extend([""] * blanks)
+            else:
+                block = make_block(lines)
+                if block:
+                    yield block
+                lines = []
+            blanks = 0
+        if not any(previous.strip() for previous in lines):
+            # The first line decides what kind of block this is
+            text = line.strip()
+            fenced = text.startswith(FENCE) and not (len(text) > len(FENCE) and text.endswith(FENCE))
+            in_list = LIST_MARKER.match(text) is not None
+        lines.append(line)
+    if lines:
+        block = make_block(lines)
+        if block:
+            yield block
+
 def markdown_to_blocks(markdown):
     """
     Converts a Markdown document into a list of block strings.
@@ -24,10 +228,7 @@ def markdown_to_blocks(markdown):
     Returns:
         list: A list of block strings.
     """
-    blocks = markdown.split("\n\n")
-    stripped_blocks = [block.strip() for block in blocks if block.strip()]    
-
-    return stripped_blocks
+    return [block.text for block in iter_blocks(markdown)]
 
 def block_to_block_type(block):
     """
@@ -39,131 +240,330 @@ def block_to_block_type(block):
     Returns:
         BlockType: The block type.
     """
-    # Split into lines for checks that need to examine each line
-    lines = block.split("\n")
-    # Check if it starts with 1-6 # followed by a space
-    if block.startswith('#'):
-    # Count consecutive # characters
-        hash_count = 0
-        for char in block:
-            if char == '#':
-                hash_count += 1
+    return classify_lines(block.split("\n"))[0]
+
+def block_to_html_node(block):
+    """
+    Converts a Block into an HTMLNode.
+    """
+    block_type = block.block_type
+    lines = block.lines
+
+    if block_type == BlockType.PARAGRAPH:
+        return ParentNode(tag="p", children=text_to_children(block.text))
+
+    elif block_type == BlockType.HEADING:
+        return ParentNode(tag=f"h{block.level}", children=text_to_children(block.text[block.level:].strip()))
+
+    elif block_type == BlockType.CODE:
+        # Extract the content between the triple backticks
+        # Join with newlines and ensure there's a trailing newline
+        code_content = "\n".join(lines[1:-1]) + "\n"
+        # The info string after the opening backticks names the language
+        lang = info_language(lines[0])
+        props = {"class": f"language-{lang}"} if lang else None
+        # Create the pre node with the code node, escaped and highlighted, as its child
+        # Highlighted code is HTML already, so it must not be escaped again
+        return ParentNode(tag="pre", children=[ParentNode("code", [RawNode(highlight(code_content, lang))], props)])
+
+    elif block_type == BlockType.QUOTE:
+        quote_lines = [line[2:] if line.startswith("> ") else line for line in lines]
+        return ParentNode(tag="blockquote", children=text_to_children("\n".join(quote_lines).strip()))
+
+    elif block_type in (BlockType.UNORDERED_LIST, BlockType.ORDERED_LIST) and any(
+            not line or line[0] == " " or not LIST_MARKER.match(line) for line in lines):
+        # The items hold indented content: nested lists, paragraphs or code,
+        # or lazy continuation lines
+        return list_block_to_html_node(lines)
+
+    elif block_type == BlockType.UNORDERED_LIST:
+        # Every line of the block starts with "- "
+        li_nodes = [ParentNode(tag="li", children=text_to_children(line[2:].strip())) for line in lines]
+        return ParentNode(tag="ul", children=li_nodes)
+
+    elif block_type == BlockType.ORDERED_LIST:
+        # Line i of the block starts with "i. ", however many digits i has
+        li_nodes = [
+            ParentNode(tag="li", children=text_to_children(line[len(str(i)) + 2:].strip()))
+            for i, line in enumerate(lines, 1)
+        ]
+        return ParentNode(tag="ol", children=li_nodes)
+
+class _ListFrame:
+    """A list still open while a list block is parsed."""
+    __slots__ = ("tag", "indent", "start", "items", "loose")
+
+    def __init__(self, tag, indent, start):
+        self.tag = tag
+        self.indent = indent
+        self.start = start
+        self.items = []
+        # A list is loose, i.e. its paragraphs get <p> tags, when a blank
+        # line separates its items or the blocks inside one of them
+        self.loose = False
+
+class _ItemFrame:
+    """A list item still open while a list block is parsed."""
+    __slots__ = ("indent", "list", "children", "leaf")
+
+    def __init__(self, indent, list_frame):
+        # The indentation of the item's content, past its marker
+        self.indent = indent
+        self.list = list_frame
+        # Blocks and nested list nodes, in order
+        self.children = []
+        # The lines of the block being read
+        self.leaf = []
+
+    def flush(self):
+        block = make_block(self.leaf) if self.leaf else None
+        if block:
+            self.children.append(block)
+        self.leaf = []
+
+    def to_html_node(self, loose):
+        children = []
+        for child in self.children:
+            if isinstance(child, HTMLNode):
+                children.append(child)
+            elif child.block_type == BlockType.PARAGRAPH and not loose:
+                # Items of a tight list hold their text directly
+                children.extend(text_to_children(child.text))
             else:
+                children.append(block_to_html_node(child))
+        return ParentNode(tag="li", children=children or [LeafNode(None, "")])
+
+def _dedent(line, indent):
+    # Strips up to indent leading spaces
+    stripped = len(line) - len(line.lstrip(" "))
+    return line[min(indent, stripped):]
+
+def _opens_fence(text):
+    text = text.strip()
+    return text.startswith(FENCE) and not (len(text) > len(FENCE) and text.endswith(FENCE))
+
+@profiler.profiled("list_block_to_html_node")
+def list_block_to_html_node(lines):
+    """
+    Builds the HTMLNode of a list block whose items hold indented content:
+    nested lists, paragraphs separated by blank lines and fenced code.
+
+    The container tree is built in one pass over the lines with an explicit
+    stack of open lists and items, so each line costs amortized constant
+    work however deep the nesting, and no depth hits the recursion limit.
+
+    Args:
+        lines (list): The lines of the block, blank lines included.
+
+    Returns:
+        ParentNode: The ul or ol node.
+    """
+    # The bottom of the stack stands in for the document and holds the list
+    root = _ItemFrame(0, None)
+    # Open frames, alternating items and lists: root, list, item, list, item...
+    stack = [root]
+    fenced = False
+    blank = False
+
+    def close_top():
+        frame = stack.pop()
+        if isinstance(frame, _ItemFrame):
+            frame.flush()
+            return
+        props = {"start": str(frame.start)} if frame.start not in (None, 1) else None
+        items = [item.to_html_node(frame.loose) for item in frame.items]
+        stack[-1].children.append(ParentNode(tag=frame.tag, children=items, props=props))
+
+    for line in lines:
+        item = stack[-1]
+        if fenced:
+            item.leaf.append(_dedent(line, item.indent))
+            if line.lstrip().startswith(FENCE):
+                fenced = False
+                item.flush()
+            continue
+        if not line.strip():
+            blank = True
+            continue
+        indent = len(line) - len(line.lstrip(" "))
+        marker = LIST_MARKER.match(line)
+        if marker:
+            ordered = marker.group(2) is not None
+            tag = "ol" if ordered else "ul"
+            # Close the items this marker is not inside of, and a list of
+            # the other kind at its level
+            while True:
+                top = stack[-1]
+                if isinstance(top, _ItemFrame):
+                    if top is not root and indent <= top.list.indent:
+                        # At or left of the item's own marker: a sibling or
+                        # an item further out
+                        close_top()
+                        continue
+                    # A list nested in this item, even when its marker is
+                    # indented less than the item's content
+                    top.flush()
+                    if blank and top is not root:
+                        top.list.loose = True
+                    list_frame = _ListFrame(tag, indent, int(marker.group(2)) if ordered else None)
+                    stack.append(list_frame)
+                    break
+                parent = stack[-2]
+                # The list of the whole block is never closed, so it is the
+                # only node the block makes: is_nested_list lets no marker of
+                # the other kind in at its level
+                if parent is not root and (top.tag != tag or indent <= parent.list.indent):
+                    close_top()
+                    continue
+                # Another item of this list
+                list_frame = top
+                if blank:
+                    list_frame.loose = True
                 break
-    # Check if 1-6 # followed by a space
-        if 1 <= hash_count <= 6 and block[hash_count] == ' ':
-            return BlockType.HEADING
-    
-    if all(line.startswith("- ") for line in lines):
-        return BlockType.UNORDERED_LIST
-    
-    if block.startswith("```") and block.endswith("```"):
-        return BlockType.CODE
-    
-    if all(line.startswith(">") for line in lines):
-        return BlockType.QUOTE
-    
-    if len(lines) > 0:
-        is_ordered_list = True
-        for i, line in enumerate(lines, 1):
-            expected_prefix = f"{i}. "
-            if not line.startswith(expected_prefix):
-                is_ordered_list = False
-                break
-        if is_ordered_list:
-            return BlockType.ORDERED_LIST
-        
-    return BlockType.PARAGRAPH
+            item = _ItemFrame(marker.end(), list_frame)
+            list_frame.items.append(item)
+            stack.append(item)
+            text = line[marker.end():]
+            item.leaf.append(text)
+            fenced = _opens_fence(text)
+        elif not blank and not _opens_fence(line):
+            # Continues the paragraph, even when not indented as far as its
+            # item's content ("lazy" continuation)
+            item.leaf.append(line.strip())
+        else:
+            # A new block in the innermost item it is indented into
+            while item.indent > indent and len(stack) > 3:
+                close_top()
+                close_top()
+                item = stack[-1]
+            item.flush()
+            if blank:
+                item.list.loose = True
+            item.leaf.append(_dedent(line, item.indent))
+            fenced = _opens_fence(line)
+        blank = False
+
+    while len(stack) > 1:
+        close_top()
+    return root.children[0]
+
+def iter_block_nodes(source):
+    """
+    Lazily converts Markdown into one HTMLNode per block. When the render
+    cache is on, each block comes back as a RawNode of its rendered HTML.
+
+    Args:
+        source: The Markdown document, as a string or an iterable of lines.
+
+    Yields:
+        HTMLNode: The node of each block, in document order.
+    """
+    cache = render_cache.active()
+    image_index = images.active()
+    # <img> attributes come from the image index, so cached blocks depend on it
+    context = image_index.fingerprint() if image_index is not None else ""
+    for block in iter_blocks(source):
+        if cache is None:
+            yield block_to_html_node(block)
+            continue
+        # Identical blocks render identically, so a cached fragment stands in
+        # for classifying, parsing and serializing the block again
+        key = cache.key(block.lines, context)
+        entry = cache.get(key)
+        if entry is None:
+            # Kept with the fragment whatever this build collects, for the
+            # builds that reuse it
+            with links.capture() as refs, feeds.capture() as texts:
+                html = block_to_html_node(block).to_html()
+            cache.put(key, html, refs, texts)
+        else:
+            html, refs, texts = entry
+            # The block is not parsed again, so replay its references and text
+            links.add(refs)
+            feeds.add(texts)
+        yield RawNode(html)
+
+def iter_markdown_html(source):
+    """
+    Converts Markdown into HTML chunks, one block at a time, so a large
+    document never has to be in memory as a whole.
+
+    Args:
+        source: The Markdown document, as a string or an iterable of lines.
 
+    Yields:
+        str: The chunks of the same HTML markdown_to_html_node produces.
+    """
+    yield "<div>"
+    for html_node in iter_block_nodes(source):
+        yield from html_node.iter_html()
+    yield "</div>"
+
+@profiler.profiled("markdown_to_html_node")
 def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
-    blocks_types = []
-    for block in blocks:
-        block_type = block_to_block_type(block)
-        # Process each block type individually if needed
-        # Example: print or log the block type
-        # print(f"Processing block: {block}, Type: {block_type}")
-        blocks_types.append(block_type)
-    html_nodes = []
-    for block, block_type in zip(blocks, blocks_types):
-
-        if block_type == BlockType.PARAGRAPH:
-            html_nodes.append(ParentNode(tag="p", children=text_to_children(block)))
-
-        elif block_type == BlockType.HEADING:
-            level = block.count("#")
-            html_nodes.append(ParentNode(tag=f"h{level}", children=text_to_children(block[level:].strip())))
-
-        elif block_type == BlockType.CODE:
-            # Extract the content between the triple backticks
-            code_lines = block.split("\n")[1:-1]
-    
-            # Join with newlines and ensure there's a trailing newline
-            code_content = "\n".join(code_lines) + "\n"
-    
-            # Create a text node for the code content
-            text_node = TextNode(code_content, TextType.TEXT)
-    
-            # Convert to HTML node
-            code_node = text_node_to_html_node(text_node)
-    
-            # Ensure code_node has the right tag
-            code_node.tag = "code"
-    
-            # Create the pre node with the code node as its child
-            html_nodes.append(ParentNode(tag="pre", children=[code_node]))
-
-        elif block_type == BlockType.QUOTE:
-            lines = block.split("\n")
-            quote_content = ""
-            for line in lines:
-                if line.startswith("> "):
-                    quote_content += line[2:] + "\n"
-                else:
-                    quote_content += line + "\n"
-            html_nodes.append(ParentNode(tag="blockquote", children=text_to_children(quote_content.strip())))
-        
-        elif block_type == BlockType.UNORDERED_LIST:
-            li_nodes = []
-            items = block.split("\n")
-            for item in items:
-                if item.startswith("- "):
-                    text = item[2:].strip()
-                    children = text_to_children(text)
-                    li_nodes.append(ParentNode(tag="li", children=children))
-            if li_nodes:
-                html_nodes.append(ParentNode(tag="ul", children=li_nodes))
-
-        elif block_type == BlockType.ORDERED_LIST:
-            items = block.split("\n")
-            ol_nodes = []
-            for item in items:
-                if item[0].isdigit() and item[1] == ".":
-                    text = item[2:].strip()
-                    children = text_to_children(text)
-                    ol_nodes.append(ParentNode(tag="li", children=children))
-            if ol_nodes:
-                html_nodes.append(ParentNode(tag="ol", children=ol_nodes))
-    html_parent = ParentNode(tag="div", children=html_nodes)
-
-    return html_parent
+    """
+    Converts a Markdown document into a single div HTMLNode.
+
+    Args:
+        markdown: The Markdown document, as a string or an iterable of lines.
+
+    Returns:
+        ParentNode: The div holding one node per block.
+    """
+    return ParentNode(tag="div", children=list(iter_block_nodes(markdown)))
 
 def text_to_children(text):
     """
-    Converts a text string into a list of HTMLNode objects.
+    Converts a text string into a list of HTMLNode objects: a single
+    RawNode holding the HTML of the whole span, serialized in one batched
+    call, or no node at all for empty text.
     """
     # For paragraphs, replace newlines with spaces
     normalized_text = text.replace("\n", " ")
     # Process the text as a whole
     text_nodes = text_to_textnodes(normalized_text)
-    # Convert each TextNode to an HTMLNode
-    html_nodes = []
+    # Record links and images for the link index and the plain text for
+    # excerpts and search
     for text_node in text_nodes:
-        html_node = text_node_to_html_node(text_node)
-        html_nodes.append(html_node)
-    return html_nodes
+        kind = links.REFERENCE_KINDS.get(text_node.text_type)
+        if kind:
+            links.record(kind, text_node.url)
+    if feeds.collecting():
+        feeds.record("".join(text_node.text for text_node in text_nodes if text_node.text_type != TextType.IMAGE))
+    if not text_nodes:
+        return []
+    return [RawNode(text_nodes_to_html(text_nodes))]
+
+def write_page(template, dest_path, values):
+    """
+    Renders a template into an output file: through the output writer when
+    one is active, otherwise through a temporary file, so a page that fails
+    halfway leaves no partial output.
 
-def generate_page(from_path, template_path, dest_path, basepath="/"):
+    Args:
+        template (Template): The compiled template.
+        dest_path (str): The destination path for the generated HTML file.
+        values (dict): Slot name to value, as for Template.iter_render.
+    """
+    output_writer = writer.active()
+    if output_writer is not None:
+        # Render to memory and leave the writing to the writer's threads
+        buffer = io.StringIO()
+        template.write(buffer, values)
+        output_writer.submit(dest_path, buffer.getvalue().encode("utf-8"))
+        return
+    # Ensure the destination directory exists
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    tmp_path = f"{dest_path}.tmp"
+    try:
+        with open(tmp_path, 'w') as out:
+            template.write(out, values)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, dest_path)
+
+def generate_page(from_path, template_path, dest_path, basepath="/", values=None):
     """
     Generates an HTML page from a Markdown file using a template.
 
@@ -171,31 +571,59 @@ def generate_page(from_path, template_path, dest_path, basepath="/"):
         from_path (str): The path to the Markdown file.
         template_path (str): The path to the HTML template file.
         dest_path (str): The destination path for the generated HTML file.
+        basepath (str): The path the site is served from.
+        values (dict): Values for the template's other slots, e.g. "Nav",
+            already relocated to the basepath.
+
+    When targets are configured, the page is also written into each of
+    them, relocated to its basepath.
     """
     print(f"Generating page from {from_path} to {dest_path} using template {template_path}")
-    # Read the Markdown content
-    with open(from_path, 'r') as f:
-        markdown_content = f.read()
-    # Read the template content
-    with open(template_path, 'r') as f:
-        template_content = f.read()
-
-    # Convert Markdown to HTML nodes
-    html_node = markdown_to_html_node(markdown_content)
-    # Convert the HTML nodes to HTML strings
-    html_content = html_node.to_html()
-    title = extract_title(markdown_content)
-
-
-    # Replace the placeholder in the template with the generated HTML
-    html_content = template_content.replace("{{ Content }}", html_content)
-    # Replace the placeholder in the template with the title
-    html_content = html_content.replace("{{ Title }}", title)
-    # Replace the href="{{ href }}" with the path to the file
-    html_content = html_content.replace('href="/', f'href="{basepath}')
-    html_content = html_content.replace('src="/', f'src="{basepath}')
-    # Write the generated HTML content to the destination file
-    # Ensure the destination directory exists
-    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-    with open(dest_path, 'w') as f:
-        f.write(html_content)
\ No newline at end of file
+    # Collect the page's links and images for the link index, and its text
+    # for the site-wide outputs, only when they are on
+    link_index = links.active()
+    site_feeds = feeds.active()
+    with (profiler.page(from_path), links.capture(link_index is not None) as refs,
+          feeds.capture(site_feeds is not None) as texts):
+        # The template is parsed once and reused across pages
+        template = load_template(template_path, basepath, minify.enabled())
+
+        with open(from_path, 'r') as f:
+            # Front matter and title are at the top, so this reads very little,
+            # and leaves f at the start of the body
+            with profiler.stage("read"):
+                meta, title = read_metadata(f)
+
+            site_targets = targets.active()
+            if profiler.active() is None and site_targets is None:
+                # Stream the body block by block and chunk by chunk, so the page is
+                # never held in memory as a whole; a leaf is always a single chunk,
+                # so no attribute spans two chunks
+                content = (relocate(chunk, basepath) for chunk in iter_markdown_html(f))
+            else:
+                # Parse and serialize up front so each stage is timed apart, and
+                # so the body is serialized once for every target
+                html_node = markdown_to_html_node(f)
+                with profiler.stage("to_html"):
+                    html = html_node.to_html()
+                if site_targets is None:
+                    content = relocate(html, basepath)
+                else:
+                    # The image stage left srcset root-relative for the targets
+                    body = RelocatableHTML(html)
+                    content = body.relocate(basepath)
+
+            with profiler.stage("write"):
+                # The title is raw text from the page, the content already HTML
+                page_title = escape_text(title)
+                write_page(template, dest_path, dict(values or {}, Title=page_title, Content=content))
+                if site_targets is not None:
+                    for target_basepath, target_path in site_targets.output_paths(dest_path):
+                        target_template = load_template(template_path, target_basepath, minify.enabled())
+                        target_values = site_targets.values.get(target_basepath, {})
+                        write_page(target_template, target_path,
+                                   dict(target_values, Title=page_title, Content=body.relocate(target_basepath)))
+    if link_index is not None:
+        link_index.add_page(link_index.relative(dest_path), refs)
+    if site_feeds is not None:
+        site_feeds.add_page(site_feeds.relative(dest_path), title, meta.get("date"), texts, from_path)
@@ -0,0 +1,162 @@
+"""
+Generates synthetic Markdown content trees for benchmarking.
+
+Run with: python3 src/corpus.py OUTPUT_DIR [--pages N ...]
+"""
+import argparse
+import os
+import random
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog elf ring hobbit wizard shire mountain river "
+    "forest tower road journey song star light shadow sword king council ancient silver"
+).split()
+
+
+class CorpusSpec:
+    """
+    The shape of a synthetic corpus. Every page gets the same number of each
+    kind of block, with densities given per paragraph.
+    """
+    def __init__(self, pages=100, paragraphs=10, links=5, images=1, list_depth=2, list_items=4,
+                 code_blocks=1, code_lines=10, words=60, seed=0):
+        self.pages = pages
+        self.paragraphs = paragraphs
+        self.links = links
+        self.images = images
+        self.list_depth = list_depth
+        self.list_items = list_items
+        self.code_blocks = code_blocks
+        self.code_lines = code_lines
+        self.words = words
+        self.seed = seed
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+def _sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def paragraph_markdown(rng, spec, page_count):
+    """
+    Builds one paragraph with the spec's word count and link and image
+    density, plus some bold, italic and code spans.
+    """
+    parts = [_sentence(rng, spec.words // 2), f"**{_sentence(rng, 2)}**", f"_{_sentence(rng, 2)}_",
+             f"`{rng.choice(WORDS)}`", _sentence(rng, spec.words // 2)]
+    for _ in range(spec.links):
+        target = rng.randrange(page_count)
+        parts.insert(rng.randrange(len(parts) + 1), f"[{_sentence(rng, 3)}](/pages/page-{target})")
+    for i in range(spec.images):
+        parts.insert(rng.randrange(len(parts) + 1), f"![{_sentence(rng, 2)}](/images/image-{i}.png)")
+    return " ".join(parts)
+
+
+def list_markdown(rng, spec):
+    """
+    Builds a list nested list_depth levels deep, each level indented by two
+    spaces.
+    """
+    lines = []
+
+    def add_level(depth):
+        for i in range(spec.list_items):
+            lines.append("  " * depth + f"- {_sentence(rng, 6)}")
+            if depth + 1 < spec.list_depth and i == 0:
+                add_level(depth + 1)
+
+    add_level(0)
+    return "\n".join(lines)
+
+
+def nested_list_markdown(rng, spec, depth):
+    """
+    Builds a list that goes depth levels deep, with list_items items on
+    each level and a second paragraph in every other item, so its items
+    hold blocks as well as lists.
+    """
+    lines = []
+    for level in range(depth):
+        indent = "  " * level
+        for i in range(spec.list_items):
+            lines.append(f"{indent}- {_sentence(rng, 6)}")
+            if i % 2:
+                lines.extend(["", f"{indent}  {_sentence(rng, 8)}"])
+    return "\n".join(lines)
+
+
+def code_markdown(rng, spec, language=""):
+    lines = ["```" + language]
+    for i in range(spec.code_lines):
+        lines.append(f"    value_{i} = compute({rng.randrange(1000)}) + offset")
+    lines.append("```")
+    return "\n".join(lines)
+
+
+def page_markdown(index, spec, rng=None):
+    """
+    Builds the Markdown of one synthetic page.
+
+    Args:
+        index (int): The page number, used in the title.
+        spec (CorpusSpec): The shape of the corpus.
+        rng (random.Random): The random source; seeded from the spec if None.
+
+    Returns:
+        str: The page's Markdown.
+    """
+    rng = rng or random.Random(spec.seed + index)
+    blocks = [f"# Page {index}: {_sentence(rng, 4)}"]
+    for i in range(spec.paragraphs):
+        blocks.append(paragraph_markdown(rng, spec, spec.pages))
+        if i == spec.paragraphs // 3 and spec.list_depth:
+            blocks.append(list_markdown(rng, spec))
+        if i == spec.paragraphs // 2:
+            blocks.extend(code_markdown(rng, spec) for _ in range(spec.code_blocks))
+    blocks.append(f"> {_sentence(rng, 12)}\n> {_sentence(rng, 12)}")
+    return "\n\n".join(blocks) + "\n"
+
+
+def generate_corpus(root, spec):
+    """
+    Writes a content tree of spec.pages pages under root, one directory per
+    page, with an index.md at the top.
+
+    Args:
+        root (str): The directory to write the content tree to.
+        spec (CorpusSpec): The shape of the corpus.
+
+    Returns:
+        list: The paths of the written Markdown files.
+    """
+    paths = []
+    for index in range(spec.pages):
+        rel_path = "index.md" if index == 0 else os.path.join("pages", f"page-{index}", "index.md")
+        path = os.path.join(root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(page_markdown(index, spec))
+        paths.append(path)
+    return paths
+
+
+def add_spec_arguments(parser):
+    """Adds a command line option for every CorpusSpec field."""
+    for name, default in CorpusSpec().as_dict().items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=default, dest=name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Markdown content tree.")
+    parser.add_argument("output", help="the directory to write the content tree to")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+    spec = CorpusSpec(**{name: getattr(args, name) for name in CorpusSpec().as_dict()})
+    paths = generate_corpus(args.output, spec)
+    print(f"Wrote {len(paths)} pages to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
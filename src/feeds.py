@@ -0,0 +1,404 @@
+"""
+Site-wide outputs built from a summary of each page as it is rendered:
+sitemap.xml, an Atom feed of the blog and a JSON search index sharded by
+term prefix. Everything is written incrementally, so the build never holds
+the text of the whole site in memory.
+"""
+import contextlib
+import heapq
+import json
+import os
+import re
+import shutil
+import subprocess
+from urllib.parse import urlsplit
+from xml.sax.saxutils import escape, quoteattr
+from metadata import page_url
+
+SITEMAP_NAME = "sitemap.xml"
+FEED_NAME = "feed.xml"
+SEARCH_DIR = "search"
+# The section whose pages go into the feed, and how many of the newest
+FEED_SECTION = "blog"
+FEED_SIZE = 20
+EXCERPT_LENGTH = 200
+# The date an undated post in the feed gets when git has none for it, e.g.
+# before it is committed
+UNDATED = "1970-01-01"
+# Search terms are sharded on their first characters
+SHARD_PREFIX_LENGTH = 1
+TERM_PATTERN = re.compile(r"[a-z0-9]{2,}")
+
+# The SiteFeeds writing this build's outputs, or a FeedBuffer in a worker
+# process, or None when they are off
+_active = None
+# The list collecting the plain text of each run of inline text of the page
+# or block being rendered, for excerpts and search, or None when nothing is
+# being collected
+_texts = None
+
+
+@contextlib.contextmanager
+def capture(enabled=True):
+    """
+    Collects the page text recorded while the block runs into a new list,
+    the way links.capture collects references. Nested captures also count
+    for the outer one.
+
+    Args:
+        enabled (bool): Whether to collect at all, e.g. only when the
+            site-wide outputs are on. When False, None is yielded.
+
+    Yields:
+        list: The plain text of each run of inline text, in order.
+    """
+    global _texts
+    if not enabled:
+        yield None
+        return
+    outer = _texts
+    texts = _texts = []
+    try:
+        yield texts
+    finally:
+        _texts = outer
+        if outer is not None:
+            outer.extend(texts)
+
+
+def collecting():
+    """Returns whether page text is being collected, so it is only made when wanted."""
+    return _texts is not None
+
+
+def record(text):
+    """Records a run of plain text from the page being rendered, if collecting."""
+    if _texts is not None:
+        _texts.append(text)
+
+
+def add(texts):
+    """Adds text gathered earlier, e.g. stored with a cached block."""
+    if _texts is not None:
+        _texts.extend(texts)
+
+
+def excerpt(texts, length=EXCERPT_LENGTH):
+    """
+    Builds a plain-text excerpt from a page's text, cut at a word boundary.
+
+    Args:
+        texts (list): The plain text of each block, in order.
+        length (int): The longest excerpt to return, in characters.
+    """
+    text = " ".join(" ".join(texts).split())
+    if len(text) <= length:
+        return text
+    cut = text.rfind(" ", 0, length)
+    return text[:cut if cut > 0 else length].rstrip(" ,;:") + "…"
+
+
+def search_terms(texts):
+    """Returns the sorted distinct lowercase words of a page's text."""
+    terms = set()
+    for text in texts:
+        terms.update(TERM_PATTERN.findall(text.lower()))
+    return sorted(terms)
+
+
+def commit_date(source):
+    """
+    Returns the UTC time of the last commit that touched a file, as an Atom
+    timestamp, or None if git has none, e.g. outside a repository. Unlike
+    the file's mtime it is the same in every checkout.
+    """
+    directory, name = os.path.split(os.path.abspath(source))
+    try:
+        result = subprocess.run(
+            ["git", "log", "-1", "--format=%cd", "--date=format-local:%Y-%m-%dT%H:%M:%SZ", "--", name],
+            cwd=directory, capture_output=True, text=True, env=dict(os.environ, TZ="UTC"),
+        )
+    except OSError:
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip() or None
+
+
+def summarize_page(page, title, date, texts, source=None):
+    """
+    Summarizes a rendered page for the site-wide outputs.
+
+    Args:
+        page (str): The page's output path relative to the output root.
+        title (str): The page title.
+        date (str): The page's ISO date from its front matter, if any.
+        texts (list): The plain text of each block, from the TextNodes.
+        source (str): The Markdown file, whose last commit date stands in
+            for the date of an undated page in the feed.
+
+    Returns:
+        dict: The page's URL path, title, date, excerpt and search terms.
+    """
+    # The title heading would open every excerpt
+    body = [text for text in texts if text != title]
+    summary = {
+        "page": page,
+        "path": page_url(page),
+        "title": title,
+        "date": date,
+        "excerpt": excerpt(body),
+        "terms": search_terms(texts),
+    }
+    if not date and source is not None and summary["path"].startswith(f"/{FEED_SECTION}/"):
+        # Only posts that go into the feed need a date
+        summary["date"] = commit_date(source) or UNDATED
+        summary["undated"] = True
+    return summary
+
+
+def timestamp(date):
+    """Returns an Atom timestamp for an ISO date or datetime string."""
+    if "T" in date:
+        return date
+    return f"{date}T00:00:00Z"
+
+
+class SitemapWriter:
+    """Streams sitemap.xml, one url element per page as it comes."""
+    def __init__(self, path, site_url):
+        self.path = path
+        self.site_url = site_url.rstrip("/")
+        self.file = open(f"{path}.tmp", 'w', encoding="utf-8")
+        self.file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        self.file.write('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+
+    def add(self, path, date=None):
+        self.file.write(f"  <url><loc>{escape(self.site_url + path)}</loc>")
+        if date:
+            self.file.write(f"<lastmod>{escape(date)}</lastmod>")
+        self.file.write("</url>\n")
+
+    def close(self):
+        self.file.write("</urlset>\n")
+        self.file.close()
+        os.replace(f"{self.path}.tmp", self.path)
+
+
+class AtomFeedWriter:
+    """
+    Keeps the newest entries of a section, with their excerpts, and writes
+    them as an Atom feed. Only feed_size entries are held at any time.
+    """
+    def __init__(self, path, site_url, title, author=None, section=FEED_SECTION, feed_size=FEED_SIZE):
+        self.path = path
+        self.site_url = site_url.rstrip("/")
+        self.title = title
+        # Atom requires an author; the site's host name stands in for one
+        self.author = author or urlsplit(self.site_url).hostname or self.site_url
+        self.prefix = f"/{section}/"
+        self.feed_size = feed_size
+        # A min-heap on (updated, path), so the oldest entry is dropped first
+        self.entries = []
+
+    def add(self, summary, updated):
+        if not summary["path"].startswith(self.prefix) or summary["path"] == self.prefix:
+            return
+        entry = (timestamp(updated), summary["path"], summary["title"], summary["excerpt"])
+        if len(self.entries) < self.feed_size:
+            heapq.heappush(self.entries, entry)
+        else:
+            heapq.heappushpop(self.entries, entry)
+
+    def close(self):
+        entries = sorted(self.entries, reverse=True)
+        feed_url = self.site_url + self.prefix
+        with open(f"{self.path}.tmp", 'w', encoding="utf-8") as f:
+            f.write('<?xml version="1.0" encoding="utf-8"?>\n')
+            f.write('<feed xmlns="http://www.w3.org/2005/Atom">\n')
+            f.write(f"  <title>{escape(self.title)}</title>\n")
+            f.write(f"  <id>{escape(feed_url)}</id>\n")
+            f.write(f"  <link href={quoteattr(feed_url)} />\n")
+            f.write(f"  <updated>{entries[0][0] if entries else timestamp(UNDATED)}</updated>\n")
+            f.write(f"  <author><name>{escape(self.author)}</name></author>\n")
+            for updated, path, title, summary in entries:
+                url = escape(self.site_url + path)
+                f.write("  <entry>\n")
+                f.write(f"    <title>{escape(title)}</title>\n")
+                f.write(f"    <id>{url}</id>\n")
+                f.write(f"    <link href={quoteattr(self.site_url + path)} />\n")
+                f.write(f"    <updated>{updated}</updated>\n")
+                f.write(f"    <summary>{escape(summary)}</summary>\n")
+                f.write("  </entry>\n")
+            f.write("</feed>\n")
+        os.replace(f"{self.path}.tmp", self.path)
+
+
+class SearchIndexWriter:
+    """
+    Writes a client-side search index into a directory:
+
+    - documents.json: a list of [url, title, excerpt], one per page, indexed
+      by document number;
+    - <prefix>.json: for every term starting with prefix, the sorted
+      numbers of the documents containing it;
+    - index.json: the prefix length and the list of shards.
+
+    Documents are streamed out as they come and term postings are spooled to
+    one file per shard, so only one shard is ever in memory, when it is
+    finally written out.
+    """
+    def __init__(self, directory, basepath="/", prefix_length=SHARD_PREFIX_LENGTH):
+        self.directory = directory
+        self.basepath = basepath.rstrip("/")
+        self.prefix_length = prefix_length
+        self.spool_dir = os.path.join(directory, ".spool")
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(self.spool_dir)
+        self.documents = open(os.path.join(directory, "documents.json"), 'w', encoding="utf-8")
+        self.documents.write("[")
+        self.spools = {}
+        self.count = 0
+
+    def add(self, summary):
+        number = self.count
+        self.count += 1
+        document = [self.basepath + summary["path"], summary["title"], summary["excerpt"]]
+        self.documents.write(("\n" if number == 0 else ",\n") + json.dumps(document, ensure_ascii=False))
+        for term in summary["terms"]:
+            prefix = term[:self.prefix_length]
+            spool = self.spools.get(prefix)
+            if spool is None:
+                spool = self.spools[prefix] = open(os.path.join(self.spool_dir, prefix), 'w')
+            spool.write(f"{term} {number}\n")
+
+    def close(self):
+        self.documents.write("\n]\n")
+        self.documents.close()
+        for prefix, spool in sorted(self.spools.items()):
+            spool.close()
+            postings = {}
+            with open(spool.name, 'r') as f:
+                for line in f:
+                    term, number = line.split()
+                    postings.setdefault(term, []).append(int(number))
+            with open(os.path.join(self.directory, f"{prefix}.json"), 'w') as f:
+                json.dump({term: postings[term] for term in sorted(postings)}, f, separators=(",", ":"))
+        shutil.rmtree(self.spool_dir)
+        with open(os.path.join(self.directory, "index.json"), 'w') as f:
+            json.dump({"prefix_length": self.prefix_length, "documents": self.count,
+                       "shards": sorted(self.spools)}, f, separators=(",", ":"))
+
+
+class SiteFeeds:
+    """
+    The site-wide outputs of one build, fed a summary of each page as soon
+    as it is rendered.
+    """
+    def __init__(self, destination, site_url, basepath="/", feed_title="Blog", feed_author=None):
+        self.root = os.path.abspath(destination)
+        os.makedirs(self.root, exist_ok=True)
+        self.sitemap = SitemapWriter(os.path.join(self.root, SITEMAP_NAME), site_url)
+        self.feed = AtomFeedWriter(os.path.join(self.root, FEED_NAME), site_url, feed_title, feed_author)
+        self.search = SearchIndexWriter(os.path.join(self.root, SEARCH_DIR), basepath)
+        # Set to a dict to also keep every summary, keyed on page
+        self.recorded = None
+
+    def relative(self, path):
+        return os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, "/")
+
+    def add_page(self, page, title, date, texts, source=None):
+        """Summarizes a rendered page and adds it to every output, see summarize_page."""
+        self.add_summary(summarize_page(page, title, date, texts, source))
+
+    def add_summary(self, summary):
+        """Adds a page summary, e.g. one made in a worker process or kept from the last build."""
+        undated = summary.get("undated")
+        self.sitemap.add(summary["path"], None if undated else summary["date"])
+        self.feed.add(summary, summary["date"] or UNDATED)
+        self.search.add(summary)
+        if self.recorded is not None:
+            self.recorded[summary["page"]] = summary
+
+    def add_listing(self, page):
+        """Adds a generated listing page, which only goes into the sitemap."""
+        self.sitemap.add(page_url(page))
+
+    def flush(self):
+        """Flushes the open outputs, e.g. so a forked worker process inherits no buffered writes."""
+        self.sitemap.file.flush()
+        self.search.documents.flush()
+        for spool in self.search.spools.values():
+            spool.flush()
+
+    def close(self):
+        """Finishes every output and returns their paths relative to the output root."""
+        self.sitemap.close()
+        self.feed.close()
+        self.search.close()
+        outputs = [SITEMAP_NAME, FEED_NAME, f"{SEARCH_DIR}/documents.json", f"{SEARCH_DIR}/index.json"]
+        outputs.extend(f"{SEARCH_DIR}/{prefix}.json" for prefix in sorted(self.search.spools))
+        return outputs
+
+
+class FeedBuffer:
+    """
+    Stands in for SiteFeeds in a worker process: summarizes the pages it
+    renders so the parent can add them to its outputs.
+    """
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.pending = []
+
+    def relative(self, path):
+        return os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, "/")
+
+    def add_page(self, page, title, date, texts, source=None):
+        self.pending.append(summarize_page(page, title, date, texts, source))
+
+    def add_summary(self, summary):
+        """Keeps a summary made in a worker process, e.g. in a shard build."""
+        self.pending.append(summary)
+
+    def drain(self):
+        """Returns the summaries made so far and forgets them."""
+        pending, self.pending = self.pending, []
+        return pending
+
+
+def configure(destination, site_url, basepath="/", feed_author=None):
+    """
+    Starts writing the site-wide outputs into destination and returns the
+    SiteFeeds. The feed's author defaults to the site's host name.
+    """
+    global _active
+    _active = SiteFeeds(destination, site_url, basepath, feed_author=feed_author)
+    return _active
+
+
+def buffer(root):
+    """Starts summarizing pages into a FeedBuffer and returns it."""
+    global _active
+    _active = FeedBuffer(root)
+    return _active
+
+
+def disable():
+    global _active
+    _active = None
+
+
+def active():
+    """Returns the active SiteFeeds or FeedBuffer, or None when the site-wide outputs are off."""
+    return _active
+
+
+def _flush_before_fork():
+    # A forked child would otherwise write out the parent's buffered output
+    # again when it exits
+    if isinstance(_active, SiteFeeds):
+        _active.flush()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(before=_flush_before_fork)
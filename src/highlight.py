@@ -0,0 +1,154 @@
+"""
+Syntax highlighting for fenced code blocks. Each language is a single
+regex of comments, strings, numbers and words; words are then looked up in
+the language's keyword and builtin sets, which is much cheaper than one
+alternation per keyword. Tokens come out as spans with Pygments' short
+class names (k, nb, s, c, m), so its stylesheets work as they are.
+"""
+import functools
+import re
+from html import escape
+
+# Highlighted blocks kept in memory, keyed on (code, language)
+CACHE_SIZE = 4096
+
+_WORD = r"(?P<word>[A-Za-z_$][\w$]*)"
+_NUMBER = r"(?P<number>\b(?:0[xX][0-9a-fA-F_]+|\d[\d_]*\.?\d*(?:[eE][+-]?\d+)?)\b)"
+_DOUBLE_QUOTED = r'"(?:[^"\\\n]|\\.)*"'
+_SINGLE_QUOTED = r"'(?:[^'\\\n]|\\.)*'"
+
+# The language name at the start of a fence's info string
+INFO_LANGUAGE = re.compile(r"[`~]*\s*\{?\.?([\w+#-]*)")
+
+# Token group to the class of its span
+TOKEN_CLASSES = {"comment": "c", "string": "s", "number": "m", "keyword": "k", "builtin": "nb"}
+
+
+class Language:
+    """
+    A language the highlighter knows: the regex its comments and strings
+    are matched with, and its keywords and builtins.
+    """
+    def __init__(self, name, comment, string, keywords, builtins=()):
+        self.name = name
+        self.pattern = re.compile(f"(?P<comment>{comment})|(?P<string>{string})|{_NUMBER}|{_WORD}", re.S)
+        self.keywords = frozenset(keywords)
+        self.builtins = frozenset(builtins)
+
+    def word_class(self, word):
+        if word in self.keywords:
+            return TOKEN_CLASSES["keyword"]
+        if word in self.builtins:
+            return TOKEN_CLASSES["builtin"]
+        return None
+
+
+LANGUAGES = {
+    "python": Language(
+        "python",
+        comment=r"#[^\n]*",
+        string=r'[rRbBuUfF]{0,2}(?:"""(?:[^\\]|\\.)*?"""|' + r"'''(?:[^\\]|\\.)*?'''|" + f"{_DOUBLE_QUOTED}|{_SINGLE_QUOTED})",
+        keywords="False None True and as assert async await break class continue def del elif else except "
+                 "finally for from global if import in is lambda nonlocal not or pass raise return try while "
+                 "with yield match case".split(),
+        builtins="print len range open str int float list dict set tuple bool type isinstance super "
+                 "enumerate zip map filter sorted min max sum any all iter next self".split(),
+    ),
+    "javascript": Language(
+        "javascript",
+        comment=r"//[^\n]*|/\*.*?\*/",
+        string=f"{_DOUBLE_QUOTED}|{_SINGLE_QUOTED}|`(?:[^`\\\\]|\\\\.)*`",
+        keywords="async await break case catch class const continue debugger default delete do else export "
+                 "extends finally for function if import in instanceof let new of return static super switch "
+                 "this throw try typeof var void while with yield true false null undefined".split(),
+        builtins="console document window Array Object String Number Boolean Promise Map Set JSON Math "
+                 "Error".split(),
+    ),
+    "go": Language(
+        "go",
+        comment=r"//[^\n]*|/\*.*?\*/",
+        string=f"{_DOUBLE_QUOTED}|{_SINGLE_QUOTED}|`[^`]*`",
+        keywords="break case chan const continue default defer else fallthrough for func go goto if import "
+                 "interface map package range return select struct switch type var true false nil".split(),
+        builtins="append cap close copy delete len make new panic print println recover string int int64 "
+                 "float64 bool byte rune error fmt".split(),
+    ),
+    "bash": Language(
+        "bash",
+        comment=r"(?<![\w$])#[^\n]*",
+        string=f"{_DOUBLE_QUOTED}|'[^']*'",
+        keywords="if then else elif fi for while until do done case esac in function return local export "
+                 "select".split(),
+        builtins="echo cd ls cat grep sed awk printf read set unset source test exit pwd mkdir rm cp mv".split(),
+    ),
+    "json": Language(
+        "json",
+        comment=r"(?!)",
+        string=_DOUBLE_QUOTED,
+        keywords="true false null".split(),
+    ),
+}
+
+ALIASES = {"py": "python", "python3": "python", "js": "javascript", "mjs": "javascript", "golang": "go",
+           "sh": "bash", "shell": "bash", "console": "bash"}
+
+
+def info_language(info):
+    """
+    Returns the language named by a fence's info string, e.g. "python" for
+    "```python title=x.py", or "" if there is none.
+    """
+    # Also takes attribute-style info strings, e.g. {.python}
+    name = INFO_LANGUAGE.match(info).group(1).lower()
+    return ALIASES.get(name, name)
+
+
+def tokenize(code, language):
+    """
+    Splits code into (class, text) pairs; class is None for plain text.
+
+    Args:
+        code (str): The code.
+        language (Language): The language to tokenize it as.
+
+    Yields:
+        tuple: The class and text of each token, covering all of code in order.
+    """
+    pos = 0
+    word_class = language.word_class
+    for match in language.pattern.finditer(code):
+        kind = match.lastgroup
+        css_class = word_class(match.group()) if kind == "word" else TOKEN_CLASSES[kind]
+        if css_class is None:
+            continue
+        if match.start() > pos:
+            yield None, code[pos:match.start()]
+        yield css_class, match.group()
+        pos = match.end()
+    if pos < len(code):
+        yield None, code[pos:]
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def highlight(code, lang=""):
+    """
+    Highlights code as HTML for the inside of a <code> element. Code in a
+    language the highlighter doesn't know is only escaped. Results are
+    cached on (code, lang), since the same snippet often recurs across a
+    site and across the pages of a watch session.
+
+    Args:
+        code (str): The code.
+        lang (str): The language, as returned by info_language.
+
+    Returns:
+        str: The escaped, highlighted HTML.
+    """
+    language = LANGUAGES.get(lang)
+    if language is None:
+        return escape(code, quote=False)
+    parts = []
+    for css_class, text in tokenize(code, language):
+        text = escape(text, quote=False)
+        parts.append(text if css_class is None else f'<span class="{css_class}">{text}</span>')
+    return "".join(parts)
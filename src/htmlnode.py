@@ -1,65 +1,185 @@
+from sys import intern
+
+
+class _EmptyChildren(list):
+    """
+    The empty children list shared by every node without children. It
+    compares and prints like [] but refuses to be modified.
+    """
+    __slots__ = ()
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("the shared empty children list cannot be modified")
+
+    append = extend = insert = remove = pop = clear = sort = reverse = _immutable
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _immutable
+
+    def __reduce__(self):
+        return (_empty_children, ())
+
+
+class _EmptyProps(dict):
+    """
+    The empty props dict shared by every node without props. It compares
+    and prints like {} but refuses to be modified.
+    """
+    __slots__ = ()
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("the shared empty props dict cannot be modified")
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _immutable
+
+    def __reduce__(self):
+        return (_empty_props, ())
+
+
+EMPTY_CHILDREN = _EmptyChildren()
+EMPTY_PROPS = _EmptyProps()
+
+# Elements written as a single <tag /> with no content
+SELF_CLOSING_TAGS = frozenset(("img", "br", "hr", "input", "meta", "link"))
+TEXT_ESCAPES = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+ATTRIBUTE_ESCAPES = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"})
+
+
+def escape_text(text):
+    """
+    Escapes text for element content: &, < and >, in one translate pass.
+    Most text has none of them, and the substring checks that find that out
+    are far cheaper than translating.
+    """
+    if "&" in text or "<" in text or ">" in text:
+        return text.translate(TEXT_ESCAPES)
+    return text
+
+
+def escape_attribute(value):
+    """Escapes a double-quoted attribute value: &, <, > and "."""
+    if "&" in value or "<" in value or ">" in value or '"' in value:
+        return value.translate(ATTRIBUTE_ESCAPES)
+    return value
+
+
+def props_html(props):
+    """Returns the attributes of a props dict as HTML, each with a leading space."""
+    return "".join([f' {key}="{escape_attribute(value)}"' for key, value in props.items()])
+
+
+def _empty_children():
+    return EMPTY_CHILDREN
+
+
+def _empty_props():
+    return EMPTY_PROPS
+
+
 class HTMLNode:
+    # Large pages create hundreds of thousands of nodes, so they carry no __dict__
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
-        self.tag = tag
+        # Tags repeat across the whole tree; interning keeps one copy of each
+        self.tag = intern(tag) if type(tag) is str else tag
         self.value = value
-        self.children = children or []
-        self.props = props or {}
+        # Only when left out: a list or dict passed in is the caller's to fill
+        self.children = EMPTY_CHILDREN if children is None else children
+        self.props = EMPTY_PROPS if props is None else props
 
     def to_html(self):
         raise NotImplementedError
 
+    def iter_html(self):
+        """
+        Yields the HTML of this node in chunks. A leaf is a single chunk.
+        """
+        yield self.to_html()
+
+    def write_html(self, sink):
+        """
+        Writes the HTML of this node chunk by chunk to a file-like sink.
+
+        Args:
+            sink: Any object with a writelines method, e.g. an open text file.
+        """
+        sink.writelines(self.iter_html())
+
     def props_to_html(self):
-        to_print = ""
         if not self.props:
             return ""
-        else:
-            for key in self.props:
-                to_print += " " + f'{key}="{self.props[key]}"'
-            return to_print
+        return props_html(self.props)
 
     def __repr__(self):
         return f"({self.tag}, {self.value}, {self.children}, {self.props})"
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
-        super().__init__(tag, value, [], props)
+        super().__init__(tag, value, None, props)
 
     def to_html(self):
-        self_closing_tags = ["img", "br", "hr", "input", "meta", "link"]
-
         if self.tag is None:
-            return self.value or ""
-        else:  
-            props_html = ""
-            if self.props:
-                for key, value in self.props.items():
-                    # Make sure we're not converting dictionaries to strings
-                    if isinstance(value, dict):
-                        # This should never happen, but just in case
-                        print(f"Warning: Found nested dict in props: {key}={value}")
-                    props_html += f' {key}="{value}"'
-
-            # Handle self-closing tags
-            if self.tag in self_closing_tags:
-                return f"<{self.tag}{props_html} />"
-            # For regular tags, require a value
-            elif not self.value and self.tag not in self_closing_tags:
-                raise ValueError(f"Leafnode: No value specified for {self.tag}")
-            else:
-                return f"<{self.tag}{props_html}>{self.value}</{self.tag}>"
+            return escape_text(self.value) if self.value else ""
+        props = props_html(self.props) if self.props else ""
+        if self.tag in SELF_CLOSING_TAGS:
+            return f"<{self.tag}{props} />"
+        # For regular tags, require a value
+        if not self.value:
+            raise ValueError(f"Leafnode: No value specified for {self.tag}")
+        return f"<{self.tag}{props}>{escape_text(self.value)}</{self.tag}>"
+
+class RawNode(HTMLNode):
+    """
+    HTML that has already been rendered, such as a cached fragment. It is
+    emitted as is, never escaped.
+    """
+    __slots__ = ()
+
+    def __init__(self, html):
+        super().__init__(None, html)
+
+    def to_html(self):
+        return self.value
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
 
 
-    def to_html(self):
+    def open_tag(self):
+        """
+        Returns the opening tag of this node, checking it can be rendered.
+        """
         if not self.tag:
             raise ValueError("No tag specified")
         elif not self.children:
             raise ValueError("No children specified")
-        else:
-            concatenated_strings = ""
-            for child in self.children:
-                concatenated_strings += child.to_html()
-            return f"<{self.tag}>{concatenated_strings}</{self.tag}>"
+        return f"<{self.tag}{self.props_to_html()}>"
+
+    def iter_html(self):
+        """
+        Yields the HTML of this node and its descendants in document order.
+
+        The tree is walked with an explicit stack of child iterators instead of
+        recursion, so deeply nested documents neither hit the recursion limit
+        nor copy the output of every subtree into its parent.
+        """
+        yield self.open_tag()
+        stack = [(self, iter(self.children))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if isinstance(child, ParentNode):
+                    yield child.open_tag()
+                    stack.append((child, iter(child.children)))
+                    break
+                yield child.to_html()
+            else:
+                stack.pop()
+                yield f"</{node.tag}>"
+
+    def to_html(self):
+        return "".join(self.iter_html())
@@ -0,0 +1,266 @@
+"""
+The image stage of the build: reads the size of every static image, makes
+resized variants of the large ones and tells the renderer which attributes
+to give each <img>.
+
+Variants are made with Pillow when it is installed, as WebP. Without it the
+sizes are still read, from the image headers, so every <img> gets width,
+height and lazy loading, just no srcset.
+"""
+import hashlib
+import json
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from manifest import file_hash
+from assets import sync_file
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+# The widths variants are made at, for images wider than that
+VARIANT_WIDTHS = (480, 960, 1440)
+VARIANT_QUALITY = 80
+DEFAULT_CACHE_DIR = ".image-cache"
+# Bump this whenever variants are made differently, so cached ones are not reused
+PIPELINE_VERSION = "1"
+
+# The ImageIndex the renderer looks images up in, or None when the image
+# stage is off
+_active = None
+
+
+def _png_size(head):
+    if head[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", head[16:24])
+
+
+def _gif_size(head):
+    return struct.unpack("<HH", head[6:10])
+
+
+def _webp_size(head):
+    chunk = head[12:16]
+    if chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L":
+        bits = int.from_bytes(head[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        return int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1
+    return None
+
+
+def _jpeg_size(f):
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        while byte and byte != b"\xff":
+            byte = f.read(1)
+        while byte == b"\xff":
+            byte = f.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        # Start-of-frame markers hold the size; C4, C8 and CC are other tables
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">xHH", frame)
+            return width, height
+        f.seek(struct.unpack(">H", length)[0] - 2, os.SEEK_CUR)
+
+
+def image_size(path):
+    """
+    Reads the pixel size of a PNG, JPEG, GIF or WebP image from its header,
+    without decoding it.
+
+    Args:
+        path (str): The path to the image.
+
+    Returns:
+        tuple: (width, height), or None if the format is not recognized or
+            the header is truncated.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(32)
+        try:
+            if head.startswith(b"\x89PNG\r\n\x1a\n"):
+                return _png_size(head)
+            if head[:6] in (b"GIF87a", b"GIF89a"):
+                return _gif_size(head)
+            if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+                return _webp_size(head)
+            if head[:2] == b"\xff\xd8":
+                return _jpeg_size(f)
+        except struct.error:
+            # A header cut short, e.g. a partly uploaded file
+            return None
+    return None
+
+
+def variant_name(rel_path, width):
+    """Returns the path of a variant next to its image, e.g. images/tom-480w.webp."""
+    return f"{os.path.splitext(rel_path)[0]}-{width}w.webp"
+
+
+def process_image(src_path, digest, cache_dir):
+    """
+    Reads an image's size and makes its variants into the cache, unless the
+    cache already has them for these contents. Runs in a worker process.
+
+    Args:
+        src_path (str): The path to the image.
+        digest (str): The hash of the image's contents and the pipeline version.
+        cache_dir (str): The cache directory.
+
+    Returns:
+        dict: The image's width and height, and the widths of its variants.
+    """
+    info_path = os.path.join(cache_dir, f"{digest}.json")
+    try:
+        with open(info_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+    size = image_size(src_path)
+    info = {"width": size[0], "height": size[1], "variants": []} if size else None
+    if info and Image is not None:
+        with Image.open(src_path) as image:
+            for width in VARIANT_WIDTHS:
+                if width >= info["width"]:
+                    break
+                height = round(info["height"] * width / info["width"])
+                tmp_path = os.path.join(cache_dir, f"{digest}-{width}.webp.tmp")
+                image.resize((width, height), Image.LANCZOS).save(tmp_path, "WEBP", quality=VARIANT_QUALITY)
+                os.replace(tmp_path, os.path.join(cache_dir, f"{digest}-{width}.webp"))
+                info["variants"].append(width)
+    tmp_path = f"{info_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(info, f)
+    os.replace(tmp_path, info_path)
+    return info
+
+
+class ImageIndex:
+    """
+    The size and variants of every static image, keyed on its root-relative
+    URL, e.g. "/images/tom.png".
+    """
+    def __init__(self, basepath="/", images=None):
+        self.basepath = basepath
+        self.images = images or {}
+        self._fingerprint = None
+
+    def fingerprint(self):
+        """A hash of everything the rendered <img> tags depend on, for cache keys."""
+        if self._fingerprint is None:
+            digest = hashlib.sha256(self.basepath.encode("utf-8"))
+            digest.update(json.dumps(self.images, sort_keys=True).encode("utf-8"))
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def props(self, url, alt):
+        """
+        Returns the attributes of the <img> for an image URL: width, height,
+        lazy loading and, when there are variants, a srcset. Images not in
+        the index, e.g. on other hosts, keep just src and alt.
+        """
+        props = {"src": url, "alt": alt}
+        info = self.images.get(url)
+        if info is None:
+            return props
+        props["width"] = str(info["width"])
+        props["height"] = str(info["height"])
+        props["loading"] = "lazy"
+        if info["variants"]:
+            # The basepath is applied here, as relocation only rewrites src and href
+            base = self.basepath.rstrip("/")
+            candidates = [f"{base}{variant_name(url, width)} {width}w" for width in info["variants"]]
+            candidates.append(f"{base}{url} {info['width']}w")
+            props["srcset"] = ", ".join(candidates)
+        return props
+
+
+def process_images(static_path, destination, basepath="/", cache_dir=DEFAULT_CACHE_DIR, jobs=None,
+                   link_mode="copy"):
+    """
+    Runs the image stage over every image under static_path: reads sizes,
+    makes missing variants in a process pool and copies the variants from
+    the cache into destination, next to their images.
+
+    Args:
+        static_path (str): The directory of static files.
+        destination (str): The destination directory.
+        basepath (str): The basepath the site is served from.
+        cache_dir (str): The directory variants are cached in, keyed on the
+            hash of the image contents.
+        jobs (int): The number of worker processes; None uses one per CPU.
+        link_mode (str): How variants are copied, see assets.sync_file.
+
+    Returns:
+        tuple: The ImageIndex and the list of variant paths relative to destination.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    sources = []
+    for dirpath, _, filenames in os.walk(static_path):
+        for filename in filenames:
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                sources.append(os.path.join(dirpath, filename))
+    sources.sort()
+    # Variants made without Pillow (i.e. none) are not reused once it is installed
+    backend = "pillow" if Image is not None else "header"
+    digests = [hashlib.sha256(f"{PIPELINE_VERSION}:{backend}:{file_hash(path)}".encode()).hexdigest() for path in sources]
+
+    results = None
+    if len(sources) > 1 and jobs != 1:
+        try:
+            executor = ProcessPoolExecutor(max_workers=jobs)
+        except (OSError, NotImplementedError) as e:
+            print(f"Process pool unavailable ({e}), processing images serially")
+        else:
+            with executor:
+                results = list(executor.map(process_image, sources, digests, [cache_dir] * len(sources)))
+    if results is None:
+        results = [process_image(path, digest, cache_dir) for path, digest in zip(sources, digests)]
+
+    index = ImageIndex(basepath)
+    variants = []
+    for path, digest, info in zip(sources, digests, results):
+        if info is None:
+            continue
+        rel_path = os.path.relpath(path, static_path).replace(os.sep, "/")
+        index.images["/" + rel_path] = info
+        for width in info["variants"]:
+            output = variant_name(rel_path, width)
+            sync_file(os.path.join(cache_dir, f"{digest}-{width}.webp"), os.path.join(destination, output), link_mode)
+            variants.append(output)
+    print(f"Processed {len(index.images)} images, {len(variants)} variants")
+    return index, variants
+
+
+def configure(index):
+    """Makes the renderer give images the attributes in an ImageIndex."""
+    global _active
+    _active = index
+    return _active
+
+
+def disable():
+    global _active
+    _active = None
+
+
+def active():
+    """Returns the active ImageIndex, or None when the image stage is off."""
+    return _active
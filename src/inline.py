@@ -1,6 +1,22 @@
 from textnode import TextType, TextNode
-from htmlnode import LeafNode
 import re
+import profiler
+
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_PATTERN = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+# Inline delimiters and the text type of the span they enclose
+INLINE_DELIMITERS = {"**": TextType.BOLD, "_": TextType.ITALIC, "`": TextType.CODE}
+# Any character that may start an inline element. A single character class
+# scans much faster than an alternation of the tokens themselves.
+INLINE_TOKEN_PATTERN = re.compile(r"[*_`\[]")
+
+
+def has_inline_markup(text):
+    """
+    Cheap pre-check: plain prose without any of the characters that can
+    start inline markup never needs to reach the regex engine.
+    """
+    return "[" in text or "*" in text or "_" in text or "`" in text
 
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
     result = []
@@ -36,20 +52,21 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
 
 def extract_markdown_images(text):
     #return a list of tuples containing the alt text and URL of the related images extracted
-    list_of_tuples = []
-    list_of_tuples = re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
-    return list_of_tuples
+    if "![" not in text:
+        return []
+    return IMAGE_PATTERN.findall(text)
 
 def extract_markdown_links(text):
     #extract markdown links and return tuples of anchor text and urls
-    list_of_tuples = []
-    list_of_tuples = re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
-    return list_of_tuples
+    if "[" not in text:
+        return []
+    return LINK_PATTERN.findall(text)
 
 def extract_title(markdown):
-    #extract the title from the markdown text
+    #extract the title from the markdown text, given as a string or as an iterable of lines (e.g. an open file)
+    #stops reading at the first title line
     title = ""
-    lines = markdown.split("\n")
+    lines = markdown.split("\n") if isinstance(markdown, str) else markdown
     for line in lines:
         if line.startswith("# "):
             # Remove the leading "# " or "<h1>" and trailing "#"
@@ -60,62 +77,99 @@ def extract_title(markdown):
 
     return title
 
-def split_nodes_image(old_nodes):
+def split_nodes_pattern(old_nodes, pattern, marker, text_type):
+    """
+    Splits TEXT nodes on every match of an image or link pattern, slicing
+    the text at the match offsets. Other nodes are kept as they are, and
+    text without the marker substring skips the regex engine entirely.
+    """
     result = []
     for node in old_nodes:
-        if not extract_markdown_images(node.text):
+        if node.text_type != TextType.TEXT or marker not in node.text:
             result.append(node)
-        else:
-            current_text = node.text
-            sections = []
-            while extract_markdown_images(current_text):
-                list_of_anchor_text_and_images = extract_markdown_images(current_text)
-                current_text = current_text.split(f"![{list_of_anchor_text_and_images[0][0]}]({list_of_anchor_text_and_images[0][1]})", 1)
-                before_text, after_text = current_text
-                current_text = after_text
-                if before_text:
-                    sections.append(TextNode(before_text, TextType.TEXT))
-                sections.append(TextNode(list_of_anchor_text_and_images[0][0], TextType.IMAGE, list_of_anchor_text_and_images[0][1]))
-            if current_text:
-                    sections.append(TextNode(current_text, TextType.TEXT))
-            result += sections    
-
+            continue
+        text = node.text
+        last_end = 0
+        for match in pattern.finditer(text):
+            if match.start() > last_end:
+                result.append(TextNode(text[last_end:match.start()], TextType.TEXT))
+            result.append(TextNode(match.group(1), text_type, match.group(2)))
+            last_end = match.end()
+        if last_end == 0:
+            result.append(node)
+        elif last_end < len(text):
+            result.append(TextNode(text[last_end:], TextType.TEXT))
     return result
 
-def split_nodes_link(old_nodes):
-    result = []
-    for node in old_nodes:
-        if not extract_markdown_links(node.text):
-            result.append(node)
-        else:
-            current_text = node.text
-            sections = []
-            while extract_markdown_links(current_text):
-                list_of_anchor_text_and_links = extract_markdown_links(current_text)
-                current_text = current_text.split(f"[{list_of_anchor_text_and_links[0][0]}]({list_of_anchor_text_and_links[0][1]})", 1)
-                before_text, after_text = current_text
-                current_text = after_text
-                if before_text:
-                    sections.append(TextNode(before_text, TextType.TEXT))
-                sections.append(TextNode(list_of_anchor_text_and_links[0][0], TextType.LINK, list_of_anchor_text_and_links[0][1]))
-            if current_text:
-                    sections.append(TextNode(current_text, TextType.TEXT))
-            result += sections    
+def split_nodes_image(old_nodes):
+    return split_nodes_pattern(old_nodes, IMAGE_PATTERN, "![", TextType.IMAGE)
 
-    return result
+def split_nodes_link(old_nodes):
+    return split_nodes_pattern(old_nodes, LINK_PATTERN, "[", TextType.LINK)
 
+@profiler.profiled("text_to_textnodes")
 def text_to_textnodes(text):
-    #initialize the text nodes
-    nodes = [TextNode(text, TextType.TEXT)]
-    # Split nodes by delimiters
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    # Split the nodes into text and image nodes
-    nodes = split_nodes_image(nodes)
-    # Split the nodes into text and link nodes
-    nodes = split_nodes_link(nodes)
-    
-        
-    return nodes
+    """
+    Splits a line of Markdown into TextNodes in a single left-to-right scan.
+
+    The scan jumps from one candidate token to the next; a delimiter consumes
+    everything up to its closing delimiter, and an image or link is matched in
+    place, so each character is looked at a bounded number of times. Text
+    inside a delimited span or a link is not parsed further.
+
+    Args:
+        text (str): The Markdown text.
+
+    Returns:
+        list: The TextNodes, in order.
+    """
+    if not has_inline_markup(text):
+        return [TextNode(text, TextType.TEXT)]
+    nodes = []
+    # text_start marks the beginning of literal text not yet emitted
+    text_start = pos = 0
+    search = INLINE_TOKEN_PATTERN.search
+    while True:
+        token_match = search(text, pos)
+        if token_match is None:
+            break
+        start = token_match.start()
+        token = text[start]
+
+        if token == "*":
+            if not text.startswith("**", start):
+                # A lone * is plain text
+                pos = start + 1
+                continue
+            token = "**"
+        if token in INLINE_DELIMITERS:
+            end = text.find(token, start + len(token))
+            if end == -1:
+                raise Exception(f"Invalid markdown syntax: unmatched {token}")
+            if start > text_start:
+                nodes.append(TextNode(text[text_start:start], TextType.TEXT))
+            inner = text[start + len(token):end]
+            if inner:
+                nodes.append(TextNode(inner, INLINE_DELIMITERS[token]))
+            pos = text_start = end + len(token)
+            continue
 
+        if start > pos and text[start - 1] == "!":
+            start -= 1
+            element = IMAGE_PATTERN.match(text, start)
+            text_type = TextType.IMAGE
+        else:
+            element = LINK_PATTERN.match(text, start)
+            text_type = TextType.LINK
+        if element is None:
+            # A bracket that opens nothing is plain text
+            pos = start + 1
+            continue
+        if start > text_start:
+            nodes.append(TextNode(text[text_start:start], TextType.TEXT))
+        nodes.append(TextNode(element.group(1), text_type, element.group(2)))
+        pos = text_start = element.end()
+
+    if text_start < len(text):
+        nodes.append(TextNode(text[text_start:], TextType.TEXT))
+    return nodes
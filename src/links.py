@@ -0,0 +1,180 @@
+import contextlib
+import os
+import posixpath
+from urllib.parse import unquote, urlsplit
+from textnode import TextType
+
+# The kind recorded for each TextType that references another file
+REFERENCE_KINDS = {TextType.LINK: "link", TextType.IMAGE: "image"}
+
+# The LinkIndex collecting the references of the pages rendered in this
+# process, or None when links are not being checked
+_active = None
+# The list collecting the ("link", url) and ("image", url) references of the
+# page or block being rendered, or None when nothing is being collected
+_current = None
+
+
+@contextlib.contextmanager
+def capture(enabled=True):
+    """
+    Collects the references made while the block runs into a new list. When
+    captures are nested, the inner references also count for the outer
+    capture, so a page sees the references of every block in it.
+
+    Args:
+        enabled (bool): Whether to collect at all, e.g. only when links are
+            being checked. When False, None is yielded and nothing is kept.
+
+    Yields:
+        list: The (kind, url) references, e.g. ("link", "/blog/tom").
+    """
+    global _current
+    if not enabled:
+        yield None
+        return
+    outer = _current
+    refs = _current = []
+    try:
+        yield refs
+    finally:
+        _current = outer
+        if outer is not None:
+            outer.extend(refs)
+
+
+def record(kind, url):
+    """Records a reference from the page being rendered, if collecting."""
+    if _current is not None:
+        _current.append((kind, url))
+
+
+def add(refs):
+    """Adds references gathered earlier, e.g. stored with a cached block."""
+    if _current is not None:
+        _current.extend(refs)
+
+
+def site_path(rel_path):
+    """Returns the root-relative URL path of a file relative to the output root."""
+    return "/" + rel_path.replace("\\", "/")
+
+
+def resolve(url, page):
+    """
+    Resolves a reference to the root-relative path it points at.
+
+    Args:
+        url (str): The reference as written in the Markdown.
+        page (str): The output path of the referencing page, relative to the
+            output root, e.g. "blog/tom/index.html".
+
+    Returns:
+        str: The root-relative path, or None for references outside the site
+            (other schemes or hosts) and same-page fragments.
+    """
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc:
+        return None
+    if not parts.path:
+        return None
+    path = unquote(parts.path)
+    if not path.startswith("/"):
+        path = posixpath.join(posixpath.dirname(site_path(page)), path)
+    resolved = posixpath.normpath(path)
+    # normpath drops the trailing slash that marks a directory
+    if path.endswith("/") and resolved != "/":
+        resolved += "/"
+    return resolved
+
+
+class LinkIndex:
+    """
+    Every page's outgoing links and images, checked at the end of the build
+    against the set of files the build produced.
+
+    Pages and files are keyed on their path relative to the output root.
+    """
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        # Page output path to its list of (kind, url) references
+        self.pages = {}
+        # Root-relative paths that resolve to a file of the site
+        self.targets = set()
+
+    def relative(self, path):
+        """Returns the path of an output file relative to the output root, with forward slashes."""
+        return os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, "/")
+
+    def add_page(self, page, refs):
+        """
+        Records the references of a generated page.
+
+        Args:
+            page (str): The page's output path relative to the output root.
+            refs (list): The page's (kind, url) references.
+        """
+        self.pages[page] = refs
+
+    def add_target(self, rel_path):
+        """Adds a file the build produced, a page or e.g. a copied static file."""
+        path = site_path(rel_path)
+        self.targets.add(path)
+        if posixpath.basename(path) == "index.html":
+            # A directory index answers for the directory, with or without the slash
+            directory = posixpath.dirname(path)
+            self.targets.add(directory)
+            self.targets.add(directory.rstrip("/") + "/")
+
+    def drain(self):
+        """
+        Returns the references collected so far and resets them, so a worker
+        process can hand them to the parent after each task.
+        """
+        pages, self.pages = self.pages, {}
+        return pages
+
+    def merge(self, pages):
+        """Adds references returned by drain, e.g. from a worker process."""
+        self.pages.update(pages)
+
+    def dangling(self):
+        """
+        Resolves every reference with set lookups.
+
+        Returns:
+            list: (page, kind, url) for each reference to a missing path.
+        """
+        missing = []
+        for page, refs in sorted(self.pages.items()):
+            for kind, url in refs:
+                target = resolve(url, page)
+                if target is not None and target not in self.targets:
+                    missing.append((page, kind, url))
+        return missing
+
+    def report(self):
+        """Prints the dangling references and returns how many there are."""
+        missing = self.dangling()
+        for page, kind, url in missing:
+            print(f"Dangling {kind} in {page}: {url}")
+        ref_count = sum(len(refs) for refs in self.pages.values())
+        print(f"Link check: {ref_count} references in {len(self.pages)} pages, {len(missing)} dangling")
+        return len(missing)
+
+
+def enable(root):
+    """Starts collecting the references of rendered pages and returns the LinkIndex."""
+    global _active
+    _active = LinkIndex(root)
+    return _active
+
+
+def disable():
+    global _active
+    _active = None
+
+
+def active():
+    """Returns the active LinkIndex, or None when links are not being checked."""
+    return _active
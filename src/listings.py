@@ -0,0 +1,135 @@
+import re
+from htmlnode import LeafNode, ParentNode
+
+# Top-level content directories that get a generated listing of their pages
+# when they have no index.md of their own
+LISTING_SECTIONS = ("blog",)
+# Pages per listing page; later pages go to /<section>/page/<n>/
+PAGE_SIZE = 10
+
+
+def slugify(text):
+    """Returns a URL path segment for a tag, e.g. "Middle Earth" gives "middle-earth"."""
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "tag"
+
+
+def tag_slugs(tags):
+    """
+    Returns each tag's URL path segment. Tags that slugify the same, e.g.
+    "C", "C#" and "C++", get numeric suffixes in tag order ("c", "c-2",
+    "c-3"), so no tag page overwrites another.
+
+    Args:
+        tags (iterable): The tags, in the order their suffixes are given.
+
+    Returns:
+        dict: Tag to its slug.
+    """
+    slugs = {}
+    used = set()
+    for tag in tags:
+        base = slug = slugify(tag)
+        number = 1
+        while slug in used:
+            number += 1
+            slug = f"{base}-{number}"
+        used.add(slug)
+        slugs[tag] = slug
+    return slugs
+
+
+def section_title(name):
+    return name.replace("-", " ").replace("_", " ").title()
+
+
+def page_link_node(page):
+    """Returns an li linking to a page, with its date when it has one."""
+    children = [LeafNode("a", page.title, {"href": page.path})]
+    if page.date:
+        children.append(LeafNode(None, " "))
+        children.append(LeafNode("time", page.date, {"datetime": page.date}))
+    return ParentNode("li", children)
+
+
+def nav_node(site_index, sections=LISTING_SECTIONS):
+    """
+    Builds the site navigation: the home page, the other top-level pages and
+    the listed sections, in path order.
+
+    Args:
+        site_index (SiteIndex): The metadata of every page.
+        sections (tuple): The sections that have a listing page.
+
+    Returns:
+        ParentNode: A nav holding a list of links.
+    """
+    entries = {page.path: page.title for page in site_index.top_level()}
+    for name in sections:
+        if site_index.section(name):
+            entries.setdefault(f"/{name}/", section_title(name))
+    items = [
+        ParentNode("li", [LeafNode("a", title, {"href": path})])
+        for path, title in sorted(entries.items(), key=lambda entry: (entry[0] != "/", entry[0]))
+    ]
+    return ParentNode("nav", [ParentNode("ul", items)])
+
+
+def pagination_node(base, number, count):
+    """Returns a nav linking to the previous and next pages of a listing."""
+    def page_path(n):
+        return base if n == 1 else f"{base}page/{n}/"
+
+    children = []
+    if number > 1:
+        children.append(LeafNode("a", "Newer", {"href": page_path(number - 1), "rel": "prev"}))
+    children.append(LeafNode("span", f"Page {number} of {count}"))
+    if number < count:
+        children.append(LeafNode("a", "Older", {"href": page_path(number + 1), "rel": "next"}))
+    return ParentNode("nav", children, {"class": "pagination"})
+
+
+def listing_content(title, items, pagination=None):
+    children = [LeafNode("h1", title), ParentNode("ul", items)]
+    if pagination is not None:
+        children.append(pagination)
+    return ParentNode("div", children)
+
+
+def listing_pages(site_index, sections=LISTING_SECTIONS, page_size=PAGE_SIZE):
+    """
+    Lists the generated pages built from the site index alone: a paginated
+    archive of each listed section, a page per tag and an index of tags.
+
+    Args:
+        site_index (SiteIndex): The metadata of every page.
+        sections (tuple): The top-level directories to list.
+        page_size (int): How many pages each listing page links to.
+
+    Yields:
+        tuple: (output path relative to the output root, title, content node).
+    """
+    for name in sections:
+        base = f"/{name}/"
+        pages = site_index.section(name)
+        # A section with an index.md of its own keeps it
+        if not pages or site_index.page(base) is not None:
+            continue
+        count = (len(pages) + page_size - 1) // page_size
+        for number in range(1, count + 1):
+            chunk = pages[(number - 1) * page_size:number * page_size]
+            title = section_title(name) if number == 1 else f"{section_title(name)}, page {number}"
+            pagination = pagination_node(base, number, count) if count > 1 else None
+            output = f"{name}/index.html" if number == 1 else f"{name}/page/{number}/index.html"
+            yield output, title, listing_content(title, [page_link_node(page) for page in chunk], pagination)
+
+    tags = site_index.tags()
+    if not tags:
+        return
+    slugs = tag_slugs(tags)
+    tag_items = []
+    for tag, pages in tags.items():
+        path = f"/tags/{slugs[tag]}/"
+        tag_items.append(ParentNode("li", [LeafNode("a", f"{tag} ({len(pages)})", {"href": path})]))
+        title = f"Tagged: {tag}"
+        yield f"tags/{slugs[tag]}/index.html", title, listing_content(title, [page_link_node(page) for page in pages])
+    yield "tags/index.html", "Tags", listing_content("Tags", tag_items)
@@ -2,9 +2,34 @@ from textnode import TextNode, TextType
 import os
 import shutil
 import sys
-from block import generate_page
+import argparse
+import hashlib
+import time
+from concurrent.futures import ProcessPoolExecutor
+from block import generate_page, write_page
+from manifest import BuildManifest, MANIFEST_NAME, file_hash
+from assets import prune_destination, sync_assets, sync_file, LINK_MODES
+from watch import DevServer, snapshot, diff_snapshots
+from metadata import read_site_index, page_url
+from listings import listing_pages, nav_node
+from template import RelocatableHTML, load_template
+from htmlnode import escape_text
+import feeds
+import images
+import links
+import metadata_cache
+import minify
+import precompress
+import profiler
+import render_cache
+import shards
+import targets
+import writer
 from pathlib import Path
 
+# Resolved destination to the navigation its pages were last rendered with,
+# so a rebuild knows when every page has to be rendered again
+_rendered_nav = {}
 
     #recursive function to copy the contents of the source directory to the destination directory
 def copy_source(source, destination):
@@ -32,13 +57,23 @@ def copy_source(source, destination):
         print(f"Copied file: {source} copied to {destination}")
 
 
-def copy_from_source_to_destination(source, destination):
+def copy_from_source_to_destination(source, destination, link_mode="copy", check_hash=False, prune=True):
     """
-    First deletes all the contents at destination then copies the contents of a source directory to the destination directory.
+    Makes destination an exact copy of a source directory. Files that are not in source are deleted,
+    and files already up to date at destination are left in place instead of being copied again.
     
     Args:
         source (str): The path to the source directory.
         destination (str): The path to the destination directory.
+        link_mode (str): "copy", "hardlink" or "reflink", see assets.sync_file.
+        check_hash (bool): Whether to compare hashes of files whose mtimes differ.
+        prune (bool): Whether to delete the files not in source now. A build
+            that renders into destination passes False and calls
+            prune_outputs once its outputs are written instead.
+
+    Returns:
+        dict: Path relative to destination to True if it was copied, False
+            if it was already up to date.
     """
     # Check if the source exists
     if not os.path.exists(source):
@@ -53,51 +88,890 @@ def copy_from_source_to_destination(source, destination):
         os.remove(destination)
         print(f"File deleted: {destination}")
 
-    if os.path.isdir(destination):
-        shutil.rmtree(destination)
-        print(f"Directory deleted: {destination}")
-
     if not os.path.exists(destination):
         os.makedirs(destination)
         print(f"Directory created: {destination}")
 
-    copy_source(source, destination)
+    with profiler.stage("sync_assets"):
+        synced = sync_assets(source, destination, link_mode, check_hash, prune=prune,
+                             transforms=minify.asset_minifiers())
+    link_index = links.active()
+    if link_index is not None:
+        for output in synced:
+            link_index.add_target(output)
+    return synced
 
-def generate_pages_recursive(content_path, template_path, content_root, destination_root, basepath="/"):
-    content_root = Path(content_root).resolve()
-    destination_root = Path(destination_root).resolve()
-    content_path = Path(content_path).resolve()
-    
-    for item in content_path.iterdir():
-        rel_path = item.relative_to(content_root)
-        out_path = destination_root / rel_path
-        
-        if item.is_dir():
-            generate_pages_recursive(item, template_path, content_root, destination_root, basepath)
-        elif item.suffix == ".md":
-            # For index.md files, place them directly in their parent directory
-            if item.stem == "index":
-                html_file_path = destination_root / rel_path.parent / "index.html"
-            else:
-                # For non-index.md files, create a directory with their name
-                dir_name = out_path.with_suffix("")
-                dir_name.mkdir(parents=True, exist_ok=True)
-                html_file_path = dir_name / "index.html"
-            
-            # Make sure parent directory exists
-            html_file_path.parent.mkdir(parents=True, exist_ok=True)
-            generate_page(item, template_path, html_file_path, basepath)
+def prune_outputs(destination, produced, keep_precompressed=False):
+    """
+    Deletes the files under destination that the build just made did not
+    produce, e.g. the pages of deleted sources. It runs once every output is
+    written, so the outputs of the last build are still there to compare
+    with and unchanged pages are not written again.
+
+    Args:
+        destination (str): The output directory.
+        produced (iterable): Paths relative to destination of every output
+            of the build, static files included.
+        keep_precompressed (bool): Also keep the precompressed siblings of
+            those outputs and the precompress state, which precompress then
+            brings up to date.
+
+    Returns:
+        list: The relative paths of the deleted files.
+    """
+    wanted = set(produced)
+    if keep_precompressed:
+        wanted.update(f"{output}{suffix}" for output in list(wanted) for suffix in precompress.ENCODING_SUFFIXES)
+        wanted.add(precompress.STATE_NAME)
+    with profiler.stage("prune"):
+        removed = prune_destination(destination, wanted)
+    for rel_path in removed:
+        print(f"File deleted: {os.path.join(destination, rel_path)}")
+    return removed
+
+def page_output_path(item, content_root, destination_root):
+    """
+    Returns the path of the HTML file generated from a Markdown file.
+
+    Args:
+        item (Path): The Markdown file.
+        content_root (Path): The resolved root of the content tree.
+        destination_root (Path): The resolved root of the output tree.
+    """
+    rel_path = item.relative_to(content_root)
+    # For index.md files, place them directly in their parent directory
+    if item.stem == "index":
+        return destination_root / rel_path.parent / "index.html"
+    # For non-index.md files, create a directory with their name
+    return (destination_root / rel_path).with_suffix("") / "index.html"
+
+def collect_pages(content_path, content_root, destination_root):
+    """
+    Walks the content tree and lists every page to generate.
+
+    Paths are resolved once, at the top, and every path is built and
+    returned as a plain string: a Path per page is most of the cost of
+    planning a site of tens of thousands of pages.
+
+    Args:
+        content_path (str): The directory to walk.
+        content_root (str): The root of the content tree.
+        destination_root (str): The root of the output tree.
+
+    Returns:
+        list: (markdown path, html path) pairs of strings, in walk order,
+            with each directory's entries sorted by name.
+    """
+    content_root = str(Path(content_root).resolve())
+    destination_root = str(Path(destination_root).resolve())
+    prefix = len(content_root) + len(os.sep)
+    pages = []
+
+    def walk(directory):
+        # Sorted, so the page order, and with it the sitemap and the search
+        # index numbering, is the same on every filesystem
+        with os.scandir(directory) as entries:
+            entries = sorted(entries, key=lambda entry: entry.name)
+        for entry in entries:
+            if entry.is_dir():
+                walk(entry.path)
+            elif entry.name.endswith(".md"):
+                # As page_output_path, on the path relative to content_root
+                rel_path = entry.path[prefix:]
+                if entry.name == "index.md":
+                    rel_path = os.path.dirname(rel_path)
+                else:
+                    rel_path = rel_path[:-len(".md")]
+                pages.append((entry.path, os.path.join(destination_root, rel_path, "index.html")))
+
+    walk(str(Path(content_path).resolve()))
+    return pages
+
+def render_page(page, template_path, basepath="/", values=None):
+    """
+    Renders a single (markdown path, html path) pair, naming the page in any
+    error raised so failures in a worker process can be traced back to it.
+    """
+    item, html_file_path = page
+    try:
+        # generate_page creates the parent directory, or leaves it to the output writer
+        generate_page(item, template_path, html_file_path, basepath, values)
+    except Exception as e:
+        raise RuntimeError(f"Failed to generate page {item}: {type(e).__name__}: {e}") from e
+
+def worker_settings():
+    """
+    Returns the per-process build settings a worker process must mirror.
+    """
+    link_index = links.active()
+    site_feeds = feeds.active()
+    image_index = images.active()
+    site_targets = targets.active()
+    return {
+        "profile": profiler.active() is not None,
+        "block_cache": render_cache.settings(),
+        "link_root": link_index.root if link_index else None,
+        "feeds_root": site_feeds.root if site_feeds else None,
+        "images": {"basepath": image_index.basepath, "images": image_index.images} if image_index else None,
+        "write_behind": writer.active() is not None,
+        "minify": minify.enabled(),
+        "targets": site_targets.settings() if site_targets else None,
+    }
+
+def init_worker(settings):
+    """
+    Worker process initializer: turns on what is turned on in the parent.
+    """
+    if settings["profile"]:
+        profiler.enable()
+    if settings["block_cache"]:
+        render_cache.configure(**settings["block_cache"])
+    if settings["link_root"]:
+        links.enable(settings["link_root"])
+    if settings["images"]:
+        images.configure(images.ImageIndex(**settings["images"]))
+    if settings["feeds_root"]:
+        # Pages are summarized here and added to the outputs by the parent
+        feeds.buffer(settings["feeds_root"])
+    if settings["write_behind"]:
+        # Pages go back to the parent, whose writer writes them
+        writer.buffer()
+    if settings["minify"]:
+        minify.enable()
+    if settings["targets"]:
+        targets.configure(**settings["targets"])
+
+def render_page_in_worker(page, template_path, basepath="/", values=None):
+    """
+    Worker process entry point: renders a page and hands back what was
+    collected while doing so, i.e. timings when profiling, cache counters
+    when caching, the page's references when checking links, its summary
+    for the site-wide outputs and the page itself when the parent writes
+    pages behind rendering.
+    """
+    render_page(page, template_path, basepath, values)
+    report = {}
+    worker_profiler = profiler.active()
+    if worker_profiler:
+        report["timings"] = worker_profiler.drain()
+    cache = render_cache.active()
+    if cache:
+        report["cache"] = cache.drain_counts()
+    link_index = links.active()
+    if link_index:
+        report["links"] = link_index.drain()
+    site_feeds = feeds.active()
+    if site_feeds:
+        report["feeds"] = site_feeds.drain()
+    output_writer = writer.active()
+    if output_writer:
+        report["outputs"] = output_writer.drain()
+    return report
+
+def merge_worker_report(report):
+    """Folds what a worker process collected into this process's state."""
+    if "timings" in report:
+        profiler.active().merge(report["timings"])
+    if "cache" in report:
+        cache = render_cache.active()
+        cache.hits += report["cache"][0]
+        cache.misses += report["cache"][1]
+    if "links" in report:
+        links.active().merge(report["links"])
+    if "feeds" in report:
+        site_feeds = feeds.active()
+        for summary in report["feeds"]:
+            site_feeds.add_summary(summary)
+    if "outputs" in report:
+        output_writer = writer.active()
+        for path, data in report["outputs"]:
+            output_writer.submit(path, data)
 
+def render_pages(pages, template_path, basepath="/", jobs=1, values=None):
+    """
+    Renders a list of pages, serially or across a pool of worker processes.
 
+    Args:
+        pages (list): (markdown path, html path) pairs, as from collect_pages.
+        template_path (str): The path to the HTML template file.
+        basepath (str): The basepath the site is served from.
+        jobs (int): The number of worker processes; 1 renders serially in
+            this process and 0 uses one worker per CPU.
+        values (dict): Values for the template's other slots, shared by every page.
+    """
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(pages))
+    if jobs > 1:
+        try:
+            executor = ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(worker_settings(),))
+        except (OSError, NotImplementedError) as e:
+            # Platforms without working process semaphores can't run a pool
+            print(f"Process pool unavailable ({e}), rendering serially")
+        else:
+            with executor:
+                chunksize = max(1, len(pages) // (jobs * 4))
+                n = len(pages)
+                # map re-raises the first failing page's error here
+                for report in executor.map(render_page_in_worker, pages, [template_path] * n, [basepath] * n,
+                                           [values] * n, chunksize=chunksize):
+                    merge_worker_report(report)
+            return
+    for page in pages:
+        render_page(page, template_path, basepath, values)
+
+def site_values(site_index, basepath="/"):
+    """
+    Returns the template values built from the site index and shared by
+    every page, i.e. the {{ Nav }} slot. When there are targets, their
+    values are set from the same serialized navigation.
+    """
+    nav = RelocatableHTML(nav_node(site_index).to_html())
+    site_targets = targets.active()
+    if site_targets is not None:
+        site_targets.values = {
+            target_basepath: {"Nav": nav.relocate(target_basepath)} for target_basepath, _ in site_targets.targets
+        }
+    return {"Nav": nav.relocate(basepath)}
+
+def generate_listing_pages(site_index, template_path, destination_root, basepath="/", values=None):
+    """
+    Writes the pages generated from the site index alone: section archives
+    and tag pages, see listings.listing_pages. A listing page already on disk
+    as rendered is left alone.
+
+    Returns:
+        dict: Output path relative to destination_root to True if it was
+            written, False if it was already up to date.
+    """
+    template = load_template(template_path, basepath, minify.enabled())
+    link_index = links.active()
+    site_feeds = feeds.active()
+    site_targets = targets.active()
+    outputs = {}
+    for output, title, content_node in listing_pages(site_index):
+        dest_path = os.path.join(destination_root, output)
+        body = RelocatableHTML(content_node.to_html())
+        title = escape_text(title)
+        page_values = dict(values or {}, Title=title, Content=body.relocate(basepath))
+        if site_targets is not None:
+            for target_basepath, target_path in site_targets.output_paths(dest_path):
+                target_values = dict(site_targets.values.get(target_basepath, {}), Title=title,
+                                     Content=body.relocate(target_basepath))
+                write_page(load_template(template_path, target_basepath, minify.enabled()), target_path, target_values)
+        try:
+            with open(dest_path, 'r') as f:
+                outputs[output] = f.read() != template.render(page_values)
+        except FileNotFoundError:
+            outputs[output] = True
+        if outputs[output]:
+            print(f"Generating listing page {dest_path}")
+            write_page(template, dest_path, page_values)
+        if link_index is not None:
+            link_index.add_target(output)
+        if site_feeds is not None:
+            site_feeds.add_listing(output)
+    return outputs
+
+def run_image_stage(static_path, destination, basepath="/", cache_dir=images.DEFAULT_CACHE_DIR, jobs=1,
+                    link_mode="copy"):
+    """
+    Runs the image stage and has the renderer use its ImageIndex.
+
+    Returns:
+        list: The variant paths written, relative to destination.
+    """
+    site_targets = targets.active()
+    if site_targets is not None:
+        # Pages are relocated to each target's basepath, srcset included
+        basepath = "/"
+    with profiler.stage("images"):
+        # jobs=0 means one worker per CPU here too
+        image_index, variants = images.process_images(static_path, destination, basepath, cache_dir,
+                                                      jobs or None, link_mode)
+        if site_targets is not None:
+            for output in variants:
+                variant_path = os.path.join(destination, output)
+                for _, target_path in site_targets.output_paths(variant_path):
+                    sync_file(variant_path, target_path, link_mode)
+    images.configure(image_index)
+    link_index = links.active()
+    if link_index is not None:
+        for output in variants:
+            link_index.add_target(output)
+    return variants
+
+def finish_site_feeds():
+    """
+    Finishes the sitemap, feed and search index once every page is in, if
+    they are being written.
+
+    Returns:
+        list: Their output paths relative to the output root.
+    """
+    site_feeds = feeds.active()
+    if site_feeds is None:
+        return []
+    feeds.disable()
+    outputs = site_feeds.close()
+    print(f"Wrote {len(outputs)} site-wide outputs: sitemap, feed and search index")
+    return outputs
+
+def generate_pages_recursive(content_path, template_path, content_root, destination_root, basepath="/", jobs=1):
+    """
+    Renders every page, the listing pages and, when they are on, the
+    site-wide outputs into destination_root.
+
+    Returns:
+        list: The paths of those outputs relative to destination_root.
+    """
+    with profiler.stage("collect_pages"):
+        pages = collect_pages(content_path, content_root, destination_root)
+    # One pass over the front matter and titles, before any page is rendered
+    with profiler.stage("metadata"):
+        site_index = read_site_index(pages, destination_root)
+    values = site_values(site_index, basepath)
+    link_index = links.active()
+    if link_index is not None:
+        for _, html_file_path in pages:
+            link_index.add_target(link_index.relative(html_file_path))
+    with profiler.stage("render_pages"):
+        render_pages(pages, template_path, basepath, jobs, values)
+        listings = generate_listing_pages(site_index, template_path, destination_root, basepath, values)
+    _rendered_nav[Path(destination_root).resolve()] = values["Nav"]
+    outputs = [os.path.relpath(html_file_path, Path(destination_root).resolve()) for _, html_file_path in pages]
+    outputs.extend(listings)
+    outputs.extend(finish_site_feeds())
+    return outputs
+
+def build_full(static_path, content_path, template_path, destination, basepath="/", jobs=1, link_mode="copy",
+               check_hash=False, image_cache=None, site_url=None, target_roots=(), keep_precompressed=False,
+               feed_author=None):
+    """
+    Builds the whole site into destination: syncs the static files, runs the
+    image stage if asked, renders every page, the listing pages and, given a
+    site URL, the site-wide outputs, then deletes whatever else is there.
+    Outputs of the last build are only deleted at the end, so the output
+    writer can leave the unchanged ones as they are.
+
+    Args:
+        static_path (str): The directory of static files to copy.
+        content_path (str): The directory of Markdown content.
+        template_path (str): The path to the HTML template file.
+        destination (str): The destination directory.
+        basepath (str): The basepath the site is served from.
+        jobs (int): The number of worker processes to render pages with.
+        link_mode (str): How static files are copied, see assets.sync_file.
+        check_hash (bool): Whether to compare hashes of static files whose mtimes differ.
+        image_cache (str): Run the image stage with this cache directory, if given.
+        site_url (str): Also write the sitemap, feed and search index for
+            this URL, if given.
+        target_roots (list): The output directories of the active targets.
+        keep_precompressed (bool): Whether precompressed siblings are kept
+            for precompress to bring up to date, see prune_outputs.
+        feed_author (str): The feed's author, see feeds.configure.
+
+    Returns:
+        list: The paths of the outputs relative to destination.
+    """
+    produced = set(copy_from_source_to_destination(static_path, destination, link_mode, check_hash, prune=False))
+    for target_root in target_roots:
+        copy_from_source_to_destination(static_path, target_root, link_mode, check_hash, prune=False)
+    if image_cache:
+        produced.update(run_image_stage(static_path, destination, basepath, image_cache, jobs, link_mode))
+    if site_url:
+        feeds.configure(destination, site_url, basepath, feed_author)
+    produced.update(generate_pages_recursive(content_path, template_path, content_path, destination, basepath, jobs))
+    output_writer = writer.active()
+    if output_writer is not None:
+        # Pages still queued count as produced, but have to be on disk first
+        output_writer.flush()
+    for root in [destination] + list(target_roots):
+        prune_outputs(root, produced, keep_precompressed)
+    return sorted(produced)
+
+def build_shard(content_path, template_path, content_root, destination_root, basepath="/", jobs=1,
+                index=0, count=1):
+    """
+    Renders one shard's slice of the pages into destination_root, which is
+    emptied first, and writes the shard manifest there. Every shard reads
+    the metadata of the whole site, so its pages get the same navigation as
+    in a single build; listing pages and the site-wide outputs are left to
+    merge_shards.
+
+    Args:
+        content_path (str): The directory of Markdown content.
+        template_path (str): The path to the HTML template file.
+        content_root (str): The root of the content tree.
+        destination_root (str): The shard's output directory.
+        basepath (str): The basepath the site is served from.
+        jobs (int): The number of worker processes to render pages with.
+        index (int): The shard index, from 0.
+        count (int): The number of shards.
+
+    Returns:
+        ShardManifest: The manifest written.
+    """
+    shutil.rmtree(destination_root, ignore_errors=True)
+    with profiler.stage("collect_pages"):
+        pages = collect_pages(content_path, content_root, destination_root)
+    with profiler.stage("metadata"):
+        site_index = read_site_index(pages, destination_root)
+    values = site_values(site_index, basepath)
+    shard = shards.shard_pages(pages, content_root, index, count)
+    print(f"Shard {index} of {count}: rendering {len(shard)} of {len(pages)} pages")
+    # The merge may be asked for the link check and the site-wide outputs, so
+    # every page's references and summary are kept whatever this build is asked
+    link_index = links.enable(destination_root)
+    page_summaries = feeds.buffer(destination_root)
+    try:
+        with profiler.stage("render_pages"):
+            render_pages(shard, template_path, basepath, jobs, values)
+        output_writer = writer.active()
+        if output_writer is not None:
+            # Pages are hashed for the manifest, so they have to be on disk
+            output_writer.flush()
+    finally:
+        links.disable()
+        feeds.disable()
+    summaries = {summary["page"]: summary for summary in page_summaries.drain()}
+    metas = {page.path: page for page in site_index.pages}
+    manifest = shards.ShardManifest(index, count, basepath, shards.nav_hash(values["Nav"]))
+    for _, html_file_path in shard:
+        output = link_index.relative(html_file_path)
+        manifest.add_page(output, file_hash(html_file_path), metas[page_url(output)],
+                          link_index.pages.get(output, []), summaries.get(output))
+    manifest.save(destination_root)
+    return manifest
+
+def merge_shards(shard_root, static_path, template_path, destination, basepath="/", link_mode="copy",
+                 check_hash=False, site_url=None, feed_author=None):
+    """
+    Assembles the output tree of a sharded build from the shard directories
+    under shard_root: the static files, every shard's pages, the listing
+    pages and, when they are on, the site-wide outputs and the link check,
+    all from the shard manifests rather than the content tree.
+
+    Args:
+        shard_root (str): The directory holding each shard's output directory.
+        static_path (str): The directory of static files to copy.
+        template_path (str): The path to the HTML template file.
+        destination (str): The destination directory.
+        basepath (str): The basepath the site is served from.
+        link_mode (str): How files are copied, see assets.sync_file.
+        check_hash (bool): Whether to compare hashes of static files whose mtimes differ.
+        site_url (str): Also write the sitemap, feed and search index for
+            this URL, if given.
+        feed_author (str): The feed's author, see feeds.configure.
+
+    Raises:
+        ValueError: If the shards don't make up one build of this site, see
+            shards.check_manifests, or a shard's pages changed since.
+
+    Returns:
+        list: The ShardManifest of each shard.
+    """
+    directories = shards.find_shards(shard_root)
+    manifests = [shards.ShardManifest.load(directory) for directory in directories]
+    shards.check_manifests(manifests)
+    if manifests[0].basepath != basepath:
+        raise ValueError(f"The shards were built for {manifests[0].basepath}, not {basepath}")
+    site_index = shards.site_index_of(manifests)
+    values = site_values(site_index, basepath)
+    if shards.nav_hash(values["Nav"]) != manifests[0].nav_hash:
+        # A page the shards saw is missing from every manifest
+        raise ValueError("The shards were built with navigation their pages don't add up to")
+
+    copy_from_source_to_destination(static_path, destination, link_mode, check_hash)
+    link_index = links.active()
+    with profiler.stage("merge_pages"):
+        for directory, manifest in zip(directories, manifests):
+            for output, page in sorted(manifest.pages.items()):
+                shards.verify_output(directory, output, page["hash"])
+                sync_file(os.path.join(directory, output), os.path.join(destination, output), link_mode)
+                if link_index is not None:
+                    link_index.add_target(output)
+                    link_index.add_page(output, [tuple(ref) for ref in page["refs"]])
+    if site_url:
+        # After the copy, which prunes whatever is not in static/
+        site_feeds = feeds.configure(destination, site_url, basepath, feed_author)
+        pages = sorted((output, page) for manifest in manifests for output, page in manifest.pages.items())
+        for _, page in pages:
+            site_feeds.add_summary(page["summary"])
+    with profiler.stage("render_pages"):
+        generate_listing_pages(site_index, template_path, destination, basepath, values)
+    finish_site_feeds()
+    print(f"Merged {len(site_index.pages)} pages from {len(manifests)} shards into {destination}")
+    return manifests
+
+def build_incremental(static_path, content_path, template_path, destination, basepath="/", jobs=1,
+                      link_mode="copy", check_hash=False, image_cache=None):
+    """
+    Builds the site into destination, re-copying and re-rendering only the
+    outputs whose source (or, for pages, template) changed since the last
+    build, and deleting outputs whose source no longer exists.
+
+    The hashes each output was built from are kept in a manifest at the root
+    of destination. When links are being checked or the site-wide outputs
+    written, the manifest also keeps each page's references and summary, so
+    pages left as they are still count.
+
+    Args:
+        static_path (str): The directory of static files to copy.
+        content_path (str): The directory of Markdown content.
+        template_path (str): The path to the HTML template file.
+        destination (str): The destination directory.
+        basepath (str): The basepath the site is served from.
+        jobs (int): The number of worker processes to render pages with.
+        link_mode (str): How static files are copied, see assets.sync_file.
+        check_hash (bool): Whether to compare hashes of static files whose mtimes differ.
+        image_cache (str): Run the image stage with this cache directory, if given.
+    """
+    if not os.path.isdir(static_path):
+        raise FileNotFoundError(f"Source directory {static_path} does not exist.")
+    manifest = BuildManifest.load(os.path.join(destination, MANIFEST_NAME), basepath)
+    produced = set()
+
+    with profiler.stage("sync_assets"):
+        synced = sync_assets(static_path, destination, link_mode, check_hash, transforms=minify.asset_minifiers())
+    link_index = links.active()
+    for output in synced:
+        src_path = os.path.join(static_path, output)
+        manifest.record(output, src_path, manifest.source_hash(output, src_path))
+        produced.add(output)
+        if link_index is not None:
+            link_index.add_target(output)
+    copied = sum(synced.values())
+    if image_cache:
+        for output in run_image_stage(static_path, destination, basepath, image_cache, jobs, link_mode):
+            manifest.record_generated(output)
+            produced.add(output)
+
+    pages = collect_pages(content_path, content_path, destination)
+    with profiler.stage("metadata"):
+        site_index = read_site_index(pages, destination)
+    values = site_values(site_index, basepath)
+    # Every page embeds the navigation and the image attributes, and is
+    # minified or not, so they count as part of the template
+    image_index = images.active()
+    image_fingerprint = image_index.fingerprint() if image_index is not None else ""
+    minified = "minified" if minify.enabled() else ""
+    template_hash = hashlib.sha256(
+        (file_hash(template_path) + values["Nav"] + image_fingerprint + minified).encode("utf-8")).hexdigest()
+    site_feeds = feeds.active()
+    if site_feeds is not None:
+        site_feeds.recorded = {}
+    # What the manifest keeps of each page for what this build collects
+    collected = [key for key, collector in (("links", link_index), ("summary", site_feeds)) if collector is not None]
+    stale_pages = []
+    for item, html_file_path in pages:
+        output = os.path.relpath(html_file_path, Path(destination).resolve())
+        source_hash = manifest.source_hash(output, item)
+        fresh = manifest.is_fresh(output, html_file_path, source_hash, template_hash)
+        kept = {}
+        if fresh:
+            kept = {key: value for key, value in manifest.entries[output].items() if key in ("links", "summary")}
+        if fresh and any(key not in kept for key in collected):
+            # A page built without collecting these has nothing recorded, so
+            # it is rendered again to collect them
+            fresh, kept = False, {}
+        if not fresh:
+            stale_pages.append((item, html_file_path))
+        else:
+            if link_index is not None:
+                link_index.add_page(output, [tuple(ref) for ref in kept["links"]])
+            if site_feeds is not None:
+                site_feeds.add_summary(kept["summary"])
+        manifest.record(output, item, source_hash, template_hash, kept)
+        produced.add(output)
+        if link_index is not None:
+            link_index.add_target(output)
+    with profiler.stage("render_pages"):
+        render_pages(stale_pages, template_path, basepath, jobs, values)
+        # Listing pages depend on every page's metadata, so they are always written
+        for output in generate_listing_pages(site_index, template_path, destination, basepath, values):
+            manifest.record_generated(output)
+            produced.add(output)
+    _rendered_nav[Path(destination).resolve()] = values["Nav"]
+    rendered = len(stale_pages)
+    for _, html_file_path in stale_pages:
+        entry = manifest.entries[os.path.relpath(html_file_path, Path(destination).resolve())]
+        if link_index is not None:
+            entry["links"] = link_index.pages.get(link_index.relative(html_file_path), [])
+        if site_feeds is not None:
+            entry["summary"] = site_feeds.recorded[site_feeds.relative(html_file_path)]
+    for output in finish_site_feeds():
+        manifest.record_generated(output)
+        produced.add(output)
+
+    output_writer = writer.active()
+    if output_writer is not None:
+        # Never record pages in the manifest before they are on disk
+        output_writer.flush()
+    removed = manifest.remove_stale(destination, produced)
+    manifest.save()
+    print(f"Incremental build: {copied} files copied, {rendered} pages generated, {len(removed)} outputs deleted.")
+
+def rebuild_changes(changed, removed, static_path, content_path, template_path, destination, basepath="/", jobs=1,
+                    link_mode="copy", check_hash=False):
+    """
+    Brings the output up to date with a set of changed and removed source
+    files. A template change re-renders every page, as does a Markdown
+    change that alters the navigation; any other Markdown change re-renders
+    only its own page, and a static file change re-copies only that file.
+    Listing pages are always written again.
+
+    Args:
+        changed (set): Paths of added or modified source files.
+        removed (set): Paths of deleted source files.
+        static_path (str): The directory of static files.
+        content_path (str): The directory of Markdown content.
+        template_path (str): The path to the HTML template file.
+        destination (str): The destination directory.
+        basepath (str): The basepath the site is served from.
+        jobs (int): The number of worker processes to render pages with.
+        link_mode (str): How static files are copied, see assets.sync_file.
+        check_hash (bool): Whether to compare hashes of static files whose mtimes differ.
+
+    Returns:
+        list: Paths of the outputs written or deleted.
+    """
+    content_root = Path(content_path).resolve()
+    destination_root = Path(destination).resolve()
+    outputs = []
+
+    all_pages = collect_pages(content_path, content_path, destination)
+    site_index = read_site_index(all_pages, destination)
+    values = site_values(site_index, basepath)
+    if template_path in changed or _rendered_nav.get(destination_root) != values["Nav"]:
+        pages = all_pages
+    else:
+        pages = [
+            (str(Path(path).resolve()), str(page_output_path(Path(path).resolve(), content_root, destination_root)))
+            for path in sorted(changed) if Path(path).resolve().is_relative_to(content_root) and path.endswith(".md")
+        ]
+    render_pages(pages, template_path, basepath, jobs, values)
+    _rendered_nav[destination_root] = values["Nav"]
+    outputs.extend(str(html_file_path) for _, html_file_path in pages)
+    for output, written in generate_listing_pages(site_index, template_path, destination, basepath, values).items():
+        if written:
+            outputs.append(os.path.join(destination, output))
+
+    for path in sorted(changed):
+        if Path(path).resolve().is_relative_to(Path(static_path).resolve()):
+            dst_path = os.path.join(destination, os.path.relpath(path, static_path))
+            transform = minify.asset_minifiers().get(os.path.splitext(path)[1].lower())
+            if sync_file(path, dst_path, link_mode, check_hash, transform):
+                outputs.append(dst_path)
+
+    for path in sorted(removed):
+        resolved = Path(path).resolve()
+        if resolved.is_relative_to(content_root) and path.endswith(".md"):
+            dst_path = page_output_path(resolved, content_root, destination_root)
+        elif resolved.is_relative_to(Path(static_path).resolve()):
+            dst_path = os.path.join(destination, os.path.relpath(path, static_path))
+        else:
+            continue
+        if os.path.isfile(dst_path):
+            os.remove(dst_path)
+            print(f"File deleted: {dst_path}")
+            outputs.append(str(dst_path))
+    return outputs
+
+def watch(basepath="/", port=8000, interval=0.5, live_reload=False, on_rebuild=None, jobs=1, link_mode="copy",
+          check_hash=False):
+    """
+    Builds the site, serves docs/ over HTTP and keeps it up to date by
+    polling content/, static/ and template.html for changes until interrupted.
+
+    Args:
+        basepath (str): The basepath the site is built for and served under.
+        port (int): The port to serve on.
+        interval (float): Seconds between polls for changes.
+        live_reload (bool): Whether served pages reload themselves after a rebuild.
+        on_rebuild (callable): Optional hook called with the list of outputs
+            written or deleted by each rebuild.
+        jobs (int): The number of worker processes to render pages with.
+        link_mode (str): How static files are copied, see assets.sync_file.
+        check_hash (bool): Whether to compare hashes of static files whose mtimes differ.
+    """
+    static_path, content_path, template_path, destination = "static", "content", "template.html", "docs"
+    build_incremental(static_path, content_path, template_path, destination, basepath, jobs, link_mode, check_hash)
+    watched = [static_path, content_path, template_path]
+    previous = snapshot(watched)
+
+    server = DevServer(destination, port, basepath, live_reload)
+    server.start()
+    try:
+        while True:
+            time.sleep(interval)
+            current = snapshot(watched)
+            changed, removed = diff_snapshots(previous, current)
+            if not changed and not removed:
+                continue
+            previous = current
+            try:
+                outputs = rebuild_changes(changed, removed, static_path, content_path, template_path,
+                                          destination, basepath, jobs, link_mode, check_hash)
+            except Exception as e:
+                # Keep watching: the next save will usually fix it
+                print(f"Rebuild failed: {e}")
+                continue
+            server.notify_reload()
+            if on_rebuild:
+                on_rebuild(outputs)
+    except KeyboardInterrupt:
+        print("Stopping watch mode.")
+    finally:
+        server.stop()
 
 def main():
-    # Something like this would be better
-    basepath = "/" # default value
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
-    copy_from_source_to_destination("static", "docs")
-    generate_pages_recursive("content", "template.html", "content", "docs", basepath)
+    parser = argparse.ArgumentParser(description="Generate the site from content/ and static/ into docs/.")
+    parser.add_argument("basepath", nargs="?", default="/", help="the path the site is served from")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only rebuild outputs whose sources changed since the last build")
+    parser.add_argument("--jobs", "-j", type=int, default=1, metavar="N",
+                        help="render pages in N worker processes (1 renders serially, 0 uses every CPU)")
+    parser.add_argument("--link-mode", choices=LINK_MODES, default="copy",
+                        help="copy static files, hardlink them, or reflink them where the filesystem allows")
+    parser.add_argument("--hash-assets", action="store_true",
+                        help="compare static files by hash, not only size and mtime, before copying them")
+    parser.add_argument("--watch", action="store_true",
+                        help="serve docs/ locally and rebuild affected outputs whenever sources change")
+    parser.add_argument("--port", type=int, default=8000, help="the port to serve on in watch mode")
+    parser.add_argument("--live-reload", action="store_true",
+                        help="in watch mode, make served pages reload themselves after a rebuild")
+    parser.add_argument("--profile", nargs="?", const="build-profile.json", metavar="REPORT",
+                        help="time each build stage and page and write a JSON report (default: build-profile.json)")
+    parser.add_argument("--block-cache", type=int, nargs="?", const=4096, default=None, metavar="SIZE",
+                        help="reuse the rendered HTML of identical blocks, keeping up to SIZE in memory")
+    parser.add_argument("--block-cache-db", metavar="PATH",
+                        help="also keep rendered blocks in this sqlite file, shared across builds")
+    parser.add_argument("--metadata-cache", nargs="?", const=metadata_cache.DEFAULT_PATH, metavar="PATH",
+                        help="keep every page's title, date and tags in this sqlite file, so unchanged pages "
+                             "aren't read to plan the next build (default: .metadata-cache.db)")
+    parser.add_argument("--write-threads", type=int, default=4, metavar="N",
+                        help="write pages from N background threads while rendering (0 writes synchronously)")
+    parser.add_argument("--site-url", metavar="URL",
+                        help="the absolute URL the site is published at; also writes sitemap.xml, "
+                             "an Atom feed of blog/ and a search index")
+    parser.add_argument("--feed-author", metavar="NAME",
+                        help="the author named in the Atom feed (default: the host name of --site-url)")
+    parser.add_argument("--images", action="store_true",
+                        help="give images their size and lazy loading, and responsive variants where Pillow is installed")
+    parser.add_argument("--image-cache", default=images.DEFAULT_CACHE_DIR, metavar="DIR",
+                        help="where image variants are cached between builds (default: .image-cache)")
+    parser.add_argument("--minify", action="store_true",
+                        help="minify the generated pages and the copied CSS")
+    parser.add_argument("--precompress", action="store_true",
+                        help="write .gz (and, with brotli installed, .br) siblings of every text output")
+    parser.add_argument("--target", action="append", default=[], metavar="BASEPATH=DIR",
+                        help="also build the site for BASEPATH into DIR, from the same render; repeatable. "
+                             "The sitemap, feed and search index are only written to docs/")
+    parser.add_argument("--shard", metavar="I/N",
+                        help="render only shard I of N (from 0) of the pages, split by a hash of their path, "
+                             "into SHARD_DIR/I-of-N with a shard manifest")
+    parser.add_argument("--merge-shards", action="store_true",
+                        help="assemble docs/, its listing pages and site-wide outputs from every shard under SHARD_DIR")
+    parser.add_argument("--shard-dir", default="shards", metavar="SHARD_DIR",
+                        help="where shards are built and merged from (default: shards)")
+    parser.add_argument("--check-links", action="store_true",
+                        help="report links and images that point at no generated page or static file, "
+                             "and exit with status 1 if there are any")
+    args = parser.parse_args()
+    if args.jobs < 0:
+        parser.error("--jobs must be 0 or more")
+    if args.write_threads < 0:
+        parser.error("--write-threads must be 0 or more")
+    target_list = []
+    for target in args.target:
+        target_basepath, _, target_root = target.partition("=")
+        if not target_root:
+            parser.error(f"--target {target}: expected BASEPATH=DIR")
+        target_list.append((target_basepath, target_root))
+    if target_list and (args.incremental or args.watch):
+        parser.error("--target is only supported by full builds")
+    if args.shard or args.merge_shards:
+        if args.shard and args.merge_shards:
+            parser.error("--shard and --merge-shards are separate steps")
+        if args.incremental or args.watch or target_list or args.images:
+            parser.error("sharded builds don't support --incremental, --watch, --target or --images")
+        if args.shard and (args.site_url or args.check_links or args.precompress):
+            parser.error("--site-url, --check-links and --precompress apply when merging the shards")
+    if args.shard:
+        try:
+            shard_index, shard_count = shards.parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(f"--shard: {e}")
+
+    if args.watch:
+        watch(args.basepath, args.port, live_reload=args.live_reload, jobs=args.jobs, link_mode=args.link_mode,
+              check_hash=args.hash_assets)
+        return
+
+    if args.profile:
+        build_profiler = profiler.enable()
+    if args.block_cache is not None or args.block_cache_db:
+        block_cache = render_cache.configure(args.block_cache or 4096, args.block_cache_db)
+    if args.check_links:
+        link_index = links.enable("docs")
+    if args.metadata_cache:
+        page_cache = metadata_cache.configure(args.metadata_cache)
+    if args.write_threads:
+        output_writer = writer.configure(args.write_threads)
+    if args.minify:
+        minify.enable()
+    if target_list:
+        try:
+            targets.configure("docs", target_list)
+        except ValueError as e:
+            parser.error(f"--target: {e}")
+
+    if args.shard:
+        build_shard("content", "template.html", "content",
+                    shards.shard_directory(args.shard_dir, shard_index, shard_count), args.basepath, args.jobs,
+                    shard_index, shard_count)
+    elif args.merge_shards:
+        merge_shards(args.shard_dir, "static", "template.html", "docs", args.basepath, args.link_mode,
+                     args.hash_assets, args.site_url, args.feed_author)
+    elif args.incremental:
+        if args.site_url:
+            feeds.configure("docs", args.site_url, args.basepath, args.feed_author)
+        build_incremental("static", "content", "template.html", "docs", args.basepath, args.jobs,
+                          args.link_mode, args.hash_assets, args.image_cache if args.images else None)
+    else:
+        build_full("static", "content", "template.html", "docs", args.basepath, args.jobs, args.link_mode,
+                   args.hash_assets, args.image_cache if args.images else None, args.site_url,
+                   [target_root for _, target_root in target_list], args.precompress, args.feed_author)
+    if writer.active():
+        writer.disable()
+        stats = output_writer.stats()
+        print(f"Output writer: {stats['written']} pages written, {stats['unchanged']} unchanged")
+    if args.precompress:
+        # Once every output is on disk
+        with profiler.stage("precompress"):
+            for root in ["docs"] + [target_root for _, target_root in target_list]:
+                precompress.precompress(root)
+    minify.disable()
+    targets.disable()
     print("All files copied and HTML pages generated successfully.")
+    if render_cache.active():
+        stats = block_cache.stats()
+        print(f"Block cache: {stats['hits']} hits, {stats['misses']} misses")
+        render_cache.disable()
+    if metadata_cache.active():
+        stats = page_cache.stats()
+        print(f"Metadata cache: {stats['hits']} hits, {stats['misses']} misses")
+        metadata_cache.disable()
+    images.disable()
+    dangling = 0
+    if args.check_links:
+        dangling = link_index.report()
+        links.disable()
+    if args.profile:
+        build_profiler.write_report(args.profile)
+    if dangling:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
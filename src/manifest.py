@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+from render_cache import PARSER_VERSION
+
+MANIFEST_NAME = ".build-manifest.json"
+# Bump this whenever a change to the generator alters its output, so that
+# incremental builds made by an older version are thrown away. The block
+# renderer's version is part of it, so bumping PARSER_VERSION for a change
+# to the rendered HTML also throws them away.
+MANIFEST_VERSION = f"4.{PARSER_VERSION}"
+
+
+def file_hash(path):
+    """
+    Computes the SHA-256 hex digest of a file's contents.
+
+    Args:
+        path (str): The path to the file.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """
+    Records, for every output file of a build, the source it came from and the
+    hashes it was built with, so the next build can skip unchanged outputs.
+
+    Entries are keyed on the output path relative to the destination root.
+    """
+    def __init__(self, path, basepath="/", entries=None):
+        self.path = path
+        self.basepath = basepath
+        self.entries = entries or {}
+
+    @classmethod
+    def load(cls, path, basepath="/"):
+        """
+        Loads a manifest from disk. A missing or unreadable manifest, or one
+        written by another generator version or for another basepath, loads
+        as empty so that everything is rebuilt.
+
+        Args:
+            path (str): The path to the manifest file.
+            basepath (str): The basepath of the current build.
+
+        Returns:
+            BuildManifest: The loaded manifest.
+        """
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path, basepath)
+        if data.get("version") != MANIFEST_VERSION or data.get("basepath") != basepath:
+            return cls(path, basepath)
+        return cls(path, basepath, data.get("entries", {}))
+
+    def save(self):
+        """Writes the manifest to disk atomically."""
+        data = {"version": MANIFEST_VERSION, "basepath": self.basepath, "entries": self.entries}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def source_hash(self, output, source):
+        """
+        Returns the hash of a source file, reusing the recorded hash when the
+        file's size and mtime have not changed since it was recorded.
+
+        Args:
+            output (str): The output path relative to the destination root.
+            source (str): The path to the source file.
+
+        Returns:
+            str: The hex digest of the source file.
+        """
+        stat = os.stat(source)
+        entry = self.entries.get(output)
+        if entry and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+            return entry["source_hash"]
+        return file_hash(source)
+
+    def is_fresh(self, output, output_path, source_hash, template_hash=None):
+        """
+        Checks whether an output was built from the given source and template
+        hashes and is still present on disk.
+
+        Args:
+            output (str): The output path relative to the destination root.
+            output_path (str): The actual path of the output file.
+            source_hash (str): The current hash of the source file.
+            template_hash (str): The current hash of the template, if any.
+
+        Returns:
+            bool: True if the output can be left as is.
+        """
+        entry = self.entries.get(output)
+        if not entry or not os.path.exists(output_path):
+            return False
+        return entry["source_hash"] == source_hash and entry.get("template_hash") == template_hash
+
+    def record(self, output, source, source_hash, template_hash=None, extra=None):
+        """
+        Records the source and hashes an output was built from.
+
+        Args:
+            output (str): The output path relative to the destination root.
+            source (str): The path to the source file.
+            source_hash (str): The hash of the source file.
+            template_hash (str): The hash of the template, if any.
+            extra (dict): Other data to keep with the entry, e.g. a page's
+                references for the link index.
+        """
+        stat = os.stat(source)
+        self.entries[output] = {
+            "source": os.path.relpath(source),
+            "source_hash": source_hash,
+            "template_hash": template_hash,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+        if extra:
+            self.entries[output].update(extra)
+
+    def record_generated(self, output):
+        """
+        Records an output generated from the whole site rather than from one
+        source file, e.g. a listing page, so it is deleted once no longer
+        produced.
+
+        Args:
+            output (str): The output path relative to the destination root.
+        """
+        self.entries[output] = {"source": None, "source_hash": None}
+
+    def remove_stale(self, destination, produced):
+        """
+        Deletes outputs recorded in the manifest that were not produced by the
+        current build, along with any directories left empty by that.
+
+        Args:
+            destination (str): The destination root directory.
+            produced (set): Output paths, relative to the destination root,
+                produced by the current build.
+
+        Returns:
+            list: The relative paths of the deleted outputs.
+        """
+        removed = []
+        for output in sorted(set(self.entries) - set(produced)):
+            output_path = os.path.join(destination, output)
+            if os.path.isfile(output_path):
+                os.remove(output_path)
+                print(f"File deleted: {output_path}")
+            del self.entries[output]
+            removed.append(output)
+            # Prune directories emptied by the removal, up to the destination root
+            parent = os.path.dirname(output_path)
+            while os.path.abspath(parent) != os.path.abspath(destination):
+                try:
+                    os.rmdir(parent)
+                except OSError:
+                    break
+                parent = os.path.dirname(parent)
+        return removed
@@ -0,0 +1,239 @@
+import datetime
+import io
+import os
+from pathlib import Path
+from inline import extract_title
+import metadata_cache
+
+# The line opening and closing a front matter block at the top of a page
+FRONT_MATTER_FENCE = "---"
+# How much of a page is read for its front matter and title in one go
+HEAD_SIZE = 8192
+
+
+def parse_value(value):
+    """
+    Parses a front matter value: a [bracketed, comma-separated] list, a
+    quoted string or a bare string.
+    """
+    if value.startswith("[") and value.endswith("]"):
+        return [parse_value(item.strip()) for item in value[1:-1].split(",") if item.strip()]
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+
+def read_front_matter(f):
+    """
+    Reads the front matter block at the start of an open Markdown file:
+    "key: value" lines between two "---" lines. Only those lines are read,
+    and the file is left at the first line of the body, so the body can be
+    rendered straight from it.
+
+    Args:
+        f: The Markdown file, open for reading in text mode.
+
+    Returns:
+        dict: Lowercased key to value; empty if the file has no front matter.
+    """
+    start = f.tell()
+    if f.readline().strip() != FRONT_MATTER_FENCE:
+        f.seek(start)
+        return {}
+    meta = {}
+    for line in iter(f.readline, ""):
+        stripped = line.strip()
+        if stripped == FRONT_MATTER_FENCE:
+            return meta
+        if not stripped or stripped.startswith("#"):
+            continue
+        key, sep, value = stripped.partition(":")
+        if not sep:
+            raise ValueError(f"Invalid front matter line: {stripped}")
+        meta[key.strip().lower()] = parse_value(value.strip())
+    raise ValueError("Invalid front matter: closing --- not found")
+
+
+def page_url(output):
+    """
+    Returns the root-relative URL of a page from its output path relative to
+    the output root, e.g. "blog/tom/index.html" gives "/blog/tom/".
+    """
+    directory = os.path.dirname(output).replace(os.sep, "/")
+    return f"/{directory}/" if directory else "/"
+
+
+class PageMeta:
+    """
+    What the site index knows about a page: read from its front matter and
+    title line, without rendering its body.
+    """
+    __slots__ = ("title", "path", "date", "tags", "source")
+
+    def __init__(self, title, path, date=None, tags=(), source=None):
+        self.title = title
+        self.path = path
+        self.date = date
+        self.tags = list(tags)
+        self.source = source
+
+    def __repr__(self):
+        return f"PageMeta({self.title}, {self.path}, {self.date}, {self.tags})"
+
+
+def read_metadata(f):
+    """
+    Reads a page's front matter and title from an open Markdown file, leaving
+    the file at the start of the body.
+
+    Args:
+        f: The Markdown file, open for reading in text mode.
+
+    Returns:
+        tuple: The front matter dict and the page title. The title comes
+            from the front matter if it sets one, otherwise from the first
+            "# " heading, and only the lines up to it are read.
+    """
+    meta = read_front_matter(f)
+    body = f.tell()
+    title = meta.get("title")
+    if not title:
+        title = extract_title(iter(f.readline, ""))
+        f.seek(body)
+    return meta, title
+
+
+def read_head(source):
+    """
+    Reads a page's front matter and title with one bounded read of the head
+    of the file, and parses them from memory. Only a page whose title is
+    not within the head is read further, line by line up to the title.
+
+    Args:
+        source (str): The path to the Markdown file.
+
+    Returns:
+        tuple: The front matter dict and the page title, as for read_metadata.
+    """
+    with open(source, 'r') as f:
+        head = f.read(HEAD_SIZE)
+        if len(head) < HEAD_SIZE:
+            return read_metadata(io.StringIO(head))
+        try:
+            # The last line may be cut short, so it is left out
+            return read_metadata(io.StringIO(head[:head.rfind("\n") + 1]))
+        except ValueError:
+            f.seek(0)
+            return read_metadata(f)
+
+
+def read_page_meta(source, output):
+    """
+    Reads the PageMeta of a Markdown file, from the metadata cache when it
+    is on and the file is unchanged since it was cached.
+
+    Args:
+        source (str): The path to the Markdown file.
+        output (str): The page's output path relative to the output root.
+
+    Returns:
+        PageMeta: The page's metadata.
+    """
+    source = str(source)
+    cache = metadata_cache.active()
+    if cache is not None:
+        stat = os.stat(source)
+        cached = cache.get(source, stat)
+        if cached is not None:
+            title, date, tags = cached
+            return PageMeta(title, page_url(output), date, tags, source)
+    meta, title = read_head(source)
+    date = meta.get("date")
+    if date is not None:
+        # Dates sort as strings, so only accept the ISO format
+        date = datetime.date.fromisoformat(date).isoformat()
+    tags = meta.get("tags", [])
+    if isinstance(tags, str):
+        tags = [tag.strip() for tag in tags.split(",") if tag.strip()]
+    if cache is not None:
+        cache.put(source, stat, title, date, tags)
+    return PageMeta(title, page_url(output), date, tags, source)
+
+
+class SiteIndex:
+    """
+    The metadata of every page of the site, gathered in one pass before
+    rendering, for navigation and listing pages.
+    """
+    def __init__(self, pages=()):
+        self.pages = list(pages)
+
+    def add(self, page):
+        self.pages.append(page)
+
+    @staticmethod
+    def newest_first(pages):
+        # Undated pages go last, in path order
+        pages = list(pages)
+        dated = sorted((page for page in pages if page.date), key=lambda page: (page.date, page.path), reverse=True)
+        return dated + sorted((page for page in pages if not page.date), key=lambda page: page.path)
+
+    def page(self, path):
+        """Returns the page at a root-relative URL, or None."""
+        for page in self.pages:
+            if page.path == path:
+                return page
+        return None
+
+    def section(self, name):
+        """
+        Returns the pages below a top-level directory, newest first.
+
+        Args:
+            name (str): The directory, e.g. "blog".
+        """
+        prefix = f"/{name}/"
+        return self.newest_first(page for page in self.pages if page.path.startswith(prefix) and page.path != prefix)
+
+    def tags(self):
+        """Returns tag to its pages, newest first, in tag order."""
+        tagged = {}
+        for page in self.pages:
+            for tag in page.tags:
+                tagged.setdefault(tag, []).append(page)
+        return {tag: self.newest_first(tagged[tag]) for tag in sorted(tagged)}
+
+    def top_level(self):
+        """Returns the home page and the pages directly below it, in path order."""
+        return sorted((page for page in self.pages if page.path.count("/") <= 2), key=lambda page: page.path)
+
+
+def read_site_index(pages, destination_root):
+    """
+    Builds the SiteIndex of a list of pages, reading only the front matter
+    and title of each.
+
+    Args:
+        pages (list): (markdown path, html path) pairs, as from collect_pages.
+        destination_root (str): The root of the output tree.
+
+    Returns:
+        SiteIndex: The index of every page.
+    """
+    destination_root = str(Path(destination_root).resolve())
+    prefix = destination_root + os.sep
+    site_index = SiteIndex()
+    for item, html_file_path in pages:
+        # Slicing is far cheaper than relpath, for the usual page under the root
+        if html_file_path.startswith(prefix):
+            output = html_file_path[len(prefix):]
+        else:
+            output = os.path.relpath(html_file_path, destination_root)
+        try:
+            site_index.add(read_page_meta(item, output))
+        except Exception as e:
+            raise RuntimeError(f"Failed to read metadata of {item}: {type(e).__name__}: {e}") from e
+    cache = metadata_cache.active()
+    if cache is not None:
+        cache.save()
+    return site_index
@@ -0,0 +1,118 @@
+"""
+A cache of every page's metadata across builds, so planning a build, i.e.
+finding every page's title, date, tags and output path, doesn't open a
+single page that hasn't changed since. Entries are keyed on the Markdown
+file's path, checked against its mtime and size, and kept in an sqlite file.
+"""
+import sqlite3
+
+# Bump this whenever what is read from a page's head changes, so metadata
+# read by an older version is never reused
+METADATA_VERSION = 1
+DEFAULT_PATH = ".metadata-cache.db"
+
+# The MetadataCache read_page_meta goes through in this process, or None when off
+_active = None
+
+
+class MetadataCache:
+    """
+    Page metadata keyed on the source path. The whole table is loaded with
+    one query when opened, and what changed is written back in one
+    transaction, so a build costs a stat per page and two round trips.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=30)
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != METADATA_VERSION:
+            self.connection.execute("DROP TABLE IF EXISTS pages")
+            self.connection.execute(f"PRAGMA user_version = {METADATA_VERSION}")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS pages (source TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, "
+            "size INTEGER NOT NULL, title TEXT NOT NULL, date TEXT, tags TEXT NOT NULL)"
+        )
+        self.connection.commit()
+        # Source path to (mtime_ns, size, title, date, tags). Tags each come
+        # from a single front matter line, so they are stored newline-separated
+        self.entries = {row[0]: row[1:] for row in self.connection.execute("SELECT * FROM pages")}
+        # The entries to write on the next save
+        self.changed = {}
+        # The pages looked up since the last save, i.e. the pages of this walk
+        self.seen = set()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, source, stat):
+        """
+        Returns the cached metadata of a page if the file is unchanged.
+
+        Args:
+            source (str): The path to the Markdown file.
+            stat (os.stat_result): The file's current stat.
+
+        Returns:
+            tuple: The title, date and tags, or None if not cached or stale.
+        """
+        self.seen.add(source)
+        entry = self.entries.get(source)
+        if entry is None or entry[0] != stat.st_mtime_ns or entry[1] != stat.st_size:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[2], entry[3], entry[4].split("\n") if entry[4] else []
+
+    def put(self, source, stat, title, date, tags):
+        """Records the metadata read from a page, as of the given stat."""
+        entry = (stat.st_mtime_ns, stat.st_size, title, date, "\n".join(tags))
+        self.seen.add(source)
+        self.entries[source] = entry
+        self.changed[source] = entry
+
+    def save(self):
+        """
+        Writes the entries recorded since the last save, and deletes those of
+        pages not looked up since, e.g. deleted or moved pages, so the cache
+        doesn't grow with every page the site ever had. Each save is meant to
+        follow a walk of the whole content tree.
+        """
+        # Nothing looked up, e.g. a second save, says nothing of what is gone
+        gone = [source for source in self.entries if source not in self.seen] if self.seen else []
+        self.seen = set()
+        if not self.changed and not gone:
+            return
+        for source in gone:
+            del self.entries[source]
+        with self.connection:
+            self.connection.executemany("DELETE FROM pages WHERE source = ?", [(source,) for source in gone])
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                [(source,) + entry for source, entry in self.changed.items()],
+            )
+        self.changed = {}
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self.save()
+        self.connection.close()
+
+
+def configure(path=DEFAULT_PATH):
+    """Starts caching page metadata in an sqlite file and returns the MetadataCache."""
+    global _active
+    disable()
+    _active = MetadataCache(path)
+    return _active
+
+
+def disable():
+    global _active
+    if _active is not None:
+        _active.close()
+    _active = None
+
+
+def active():
+    """Returns the active MetadataCache, or None when page metadata is not cached."""
+    return _active
@@ -0,0 +1,114 @@
+"""
+Minifiers for the build's text outputs. Generated markup is already
+compact, so HTML minification only has to touch the template's static
+segments, once, when the template is compiled.
+"""
+import re
+
+# Whitespace next to these tags never renders, so it is dropped entirely;
+# elsewhere a run of whitespace still renders as one space
+BLOCK_TAGS = frozenset((
+    "!doctype", "html", "head", "body", "meta", "link", "title", "script", "style", "base",
+    "article", "aside", "header", "footer", "main", "nav", "section", "div", "p", "pre", "blockquote",
+    "ul", "ol", "li", "h1", "h2", "h3", "h4", "h5", "h6", "hr", "table", "thead", "tbody", "tr", "td", "th",
+))
+# An element whose contents are kept exactly as written, a tag, a run of
+# whitespace, or other text
+HTML_TOKENS = re.compile(
+    r"<(pre|textarea|script|style)\b.*?</\1\s*>|<[^<>]*>|\s+|[^<\s]+|<", re.S | re.I)
+TAG_NAME = re.compile(r"</?(!?[a-zA-Z][a-zA-Z0-9]*)")
+WHITESPACE = re.compile(r"\s+")
+
+CSS_TOKENS = re.compile(r"(\"(?:[^\"\\]|\\.)*\"|'(?:[^'\\]|\\.)*')|/\*.*?\*/", re.S)
+CSS_PUNCTUATION = re.compile(r"\s*([{};,>])\s*")
+
+
+def _is_block_tag(token):
+    match = TAG_NAME.match(token)
+    return match is not None and match.group(1).lower() in BLOCK_TAGS
+
+
+def minify_html(html):
+    """
+    Collapses insignificant whitespace in HTML: whitespace next to a
+    block-level tag is dropped and any other run becomes a single space.
+    The contents of pre, textarea, script and style are left alone.
+
+    Args:
+        html (str): The HTML, e.g. a static segment of a template.
+
+    Returns:
+        str: The minified HTML.
+    """
+    tokens = [match.group() for match in HTML_TOKENS.finditer(html)]
+    out = []
+    for i, token in enumerate(tokens):
+        if not token.isspace():
+            out.append(token)
+            continue
+        previous = out[-1] if out else ""
+        following = tokens[i + 1] if i + 1 < len(tokens) else ""
+        if not (_is_block_tag(previous) or _is_block_tag(following)):
+            out.append(" ")
+    return "".join(out)
+
+
+def minify_css(css):
+    """
+    Strips comments and insignificant whitespace from a stylesheet, leaving
+    strings as they are.
+
+    Args:
+        css (str): The stylesheet.
+
+    Returns:
+        str: The minified stylesheet.
+    """
+    out = []
+    pos = 0
+    for match in CSS_TOKENS.finditer(css):
+        out.append(_minify_css_code(css[pos:match.start()]))
+        # Strings are kept; comments are dropped
+        if match.group(1):
+            out.append(match.group(1))
+        pos = match.end()
+    out.append(_minify_css_code(css[pos:]))
+    return "".join(out).strip()
+
+
+def _minify_css_code(code):
+    code = WHITESPACE.sub(" ", code)
+    code = CSS_PUNCTUATION.sub(r"\1", code)
+    code = code.replace(": ", ":").replace(";}", "}")
+    return code
+
+
+def minify_css_bytes(data):
+    """minify_css for the raw bytes of a UTF-8 stylesheet, as used when syncing assets."""
+    return minify_css(data.decode("utf-8")).encode("utf-8")
+
+
+# File extension to the function minifying the raw bytes of such a file
+ASSET_MINIFIERS = {".css": minify_css_bytes}
+
+# Whether generated pages are minified in this process
+_enabled = False
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def enabled():
+    return _enabled
+
+
+def asset_minifiers():
+    """Returns the minifiers static files are synced through: ASSET_MINIFIERS when minifying, else none."""
+    return ASSET_MINIFIERS if _enabled else {}
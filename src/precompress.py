@@ -0,0 +1,113 @@
+"""
+Writes a precompressed .gz sibling, and a .br one when the brotli package is
+installed, next to every text output, so a static server can serve them as
+they are (e.g. nginx's gzip_static) instead of compressing on each request.
+"""
+import gzip
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from manifest import file_hash
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".mjs", ".json", ".xml", ".svg", ".txt")
+ENCODING_SUFFIXES = (".gz", ".br")
+# The content hash each output's siblings were made from, kept at the root of the output
+STATE_NAME = ".precompress.json"
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+
+def encodings():
+    """Returns the suffixes of the siblings written next to each output."""
+    return (".gz", ".br") if brotli is not None else (".gz",)
+
+
+def _write(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def compress_file(path):
+    """
+    Writes the precompressed siblings of a file. zlib and brotli release the
+    GIL while compressing, so this runs well from a thread pool.
+
+    Args:
+        path (str): The path to the file.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    # No timestamp in the header, so unchanged files compress to the same bytes
+    _write(f"{path}.gz", gzip.compress(data, GZIP_LEVEL, mtime=0))
+    if brotli is not None:
+        _write(f"{path}.br", brotli.compress(data, quality=BROTLI_QUALITY))
+
+
+def precompress(destination, jobs=None):
+    """
+    Precompresses every text output under destination, skipping outputs
+    whose contents hash the same as when their siblings were last written,
+    and deletes siblings whose output is gone.
+
+    Args:
+        destination (str): The output directory.
+        jobs (int): The number of compression threads; None picks a default.
+
+    Returns:
+        dict: Output path relative to destination to True if it was
+            compressed, False if its siblings were already up to date.
+    """
+    state_path = os.path.join(destination, STATE_NAME)
+    try:
+        with open(state_path, 'r') as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+    suffixes = encodings()
+
+    outputs = []
+    siblings = []
+    for dirpath, _, filenames in os.walk(destination):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            if filename.endswith(ENCODING_SUFFIXES):
+                siblings.append(path)
+            elif filename.lower().endswith(COMPRESSIBLE_EXTENSIONS) and not filename.startswith("."):
+                outputs.append(os.path.relpath(path, destination).replace(os.sep, "/"))
+    outputs.sort()
+
+    def up_to_date(output, digest):
+        path = os.path.join(destination, output)
+        return previous.get(output) == digest and all(os.path.isfile(path + suffix) for suffix in suffixes)
+
+    def compress(output):
+        path = os.path.join(destination, output)
+        digest = file_hash(path)
+        if up_to_date(output, digest):
+            return digest, False
+        compress_file(path)
+        return digest, True
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = dict(zip(outputs, executor.map(compress, outputs)))
+
+    # Siblings written for outputs since deleted, or .br files once brotli is
+    # gone, are stale; any other .gz or .br file is an output of its own
+    wanted = {os.path.join(destination, output) + suffix for output in outputs for suffix in suffixes}
+    for path in siblings:
+        output = os.path.relpath(os.path.splitext(path)[0], destination).replace(os.sep, "/")
+        if output in previous and path not in wanted:
+            os.remove(path)
+
+    _write(state_path, json.dumps({output: digest for output, (digest, _) in results.items()},
+                                  sort_keys=True).encode("utf-8"))
+    compressed = sum(written for _, written in results.values())
+    print(f"Precompressed {compressed} outputs as {', '.join(suffixes)}, {len(results) - compressed} unchanged")
+    return {output: written for output, (_, written) in results.items()}
@@ -0,0 +1,188 @@
+import contextlib
+import functools
+import json
+import time
+
+# The Profiler collecting timings in this process, or None when profiling is off
+_active = None
+
+
+class Profiler:
+    """
+    Collects wall time and call counts per build stage, overall and per page.
+
+    Stage times are inclusive: a stage that runs inside another (e.g.
+    text_to_textnodes inside markdown_to_html_node) is counted in both.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        # Stage name to [calls, seconds]
+        self.stages = {}
+        # Page path to {"seconds": float, "stages": {name: [calls, seconds]}}
+        self.pages = {}
+        self.current_page = None
+
+    def add(self, stage, seconds):
+        totals = self.stages.setdefault(stage, [0, 0.0])
+        totals[0] += 1
+        totals[1] += seconds
+        if self.current_page is not None:
+            page_totals = self.current_page["stages"].setdefault(stage, [0, 0.0])
+            page_totals[0] += 1
+            page_totals[1] += seconds
+
+    @contextlib.contextmanager
+    def page(self, path):
+        """Attributes the stages run inside the block to a page."""
+        self.current_page = self.pages.setdefault(str(path), {"seconds": 0.0, "stages": {}})
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.current_page["seconds"] += time.perf_counter() - start
+            self.current_page = None
+
+    def drain(self):
+        """
+        Returns the timings collected so far and resets them, so a worker
+        process can hand its timings to the parent after each task.
+        """
+        data = {"stages": self.stages, "pages": self.pages}
+        self.stages, self.pages = {}, {}
+        return data
+
+    def merge(self, data):
+        """Adds timings returned by drain, e.g. from a worker process."""
+        for stage, (calls, seconds) in data["stages"].items():
+            totals = self.stages.setdefault(stage, [0, 0.0])
+            totals[0] += calls
+            totals[1] += seconds
+        self.pages.update(data["pages"])
+
+    def report(self, slowest=20):
+        """
+        Builds a JSON-serializable report of the collected timings.
+
+        Args:
+            slowest (int): How many of the slowest pages to list.
+
+        Returns:
+            dict: The report.
+        """
+        def stage_summary(stages):
+            return {
+                name: {"calls": calls, "seconds": round(seconds, 6), "mean_ms": round(seconds * 1000 / calls, 4)}
+                for name, (calls, seconds) in sorted(stages.items(), key=lambda item: -item[1][1])
+            }
+
+        slowest_pages = sorted(self.pages.items(), key=lambda item: -item[1]["seconds"])[:slowest]
+        return {
+            "wall_seconds": round(time.perf_counter() - self.started, 6),
+            "page_count": len(self.pages),
+            "page_seconds": round(sum(page["seconds"] for page in self.pages.values()), 6),
+            "stages": stage_summary(self.stages),
+            "slowest_pages": [
+                {"page": path, "seconds": round(page["seconds"], 6), "stages": stage_summary(page["stages"])}
+                for path, page in slowest_pages
+            ],
+        }
+
+    def write_report(self, path, slowest=20):
+        with open(path, 'w') as f:
+            json.dump(self.report(slowest), f, indent=2)
+        print(f"Profile report written to {path}")
+
+
+def enable():
+    """Starts profiling in this process and returns the Profiler."""
+    global _active
+    _active = Profiler()
+    return _active
+
+
+def disable():
+    global _active
+    _active = None
+
+
+def active():
+    """Returns the active Profiler, or None when profiling is off."""
+    return _active
+
+
+def stage(name):
+    """
+    Context manager timing a block as a stage; does nothing when profiling
+    is off.
+    """
+    if _active is None:
+        return contextlib.nullcontext()
+    return _timed(_active, name)
+
+
+@contextlib.contextmanager
+def _timed(profiler, name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.add(name, time.perf_counter() - start)
+
+
+def page(path):
+    """
+    Context manager attributing the stages run inside it to a page; does
+    nothing when profiling is off.
+    """
+    if _active is None:
+        return contextlib.nullcontext()
+    return _active.page(path)
+
+
+def profiled(name):
+    """
+    Decorator timing every call of a function as a stage. When profiling is
+    off the only cost is one global lookup per call.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _active
+            if profiler is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.add(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def profiled_generator(name):
+    """
+    Decorator timing a generator function as a stage, one call per item it
+    yields. Only the time spent producing each item is counted, not the
+    time the consumer holds the generator suspended between items.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _active
+            items = func(*args, **kwargs)
+            if profiler is None:
+                return items
+            return _timed_items(profiler, name, items)
+        return wrapper
+    return decorator
+
+
+def _timed_items(profiler, name, items):
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(items)
+        except StopIteration:
+            return
+        profiler.add(name, time.perf_counter() - start)
+        yield item
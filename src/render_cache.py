@@ -0,0 +1,160 @@
+import hashlib
+import json
+import sqlite3
+from collections import OrderedDict
+
+# Bump this whenever block rendering changes, so cached fragments rendered by
+# an older version are never reused.
+PARSER_VERSION = "7"
+
+# Bump this whenever the fragments table changes, so an older table is
+# replaced rather than written to
+STORE_VERSION = 2
+
+# The BlockCache used by the block renderer in this process, or None when off
+_active = None
+
+
+class DiskStore:
+    """
+    An sqlite database of rendered block fragments, shared across builds and
+    across the processes of one build.
+    """
+    def __init__(self, path):
+        self.path = path
+        # Autocommit, so fragments written by worker processes are never lost
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != STORE_VERSION:
+            self.connection.execute("DROP TABLE IF EXISTS fragments")
+            self.connection.execute(f"PRAGMA user_version = {STORE_VERSION}")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS fragments (key TEXT PRIMARY KEY, html TEXT NOT NULL, refs TEXT NOT NULL, "
+            "texts TEXT NOT NULL)"
+        )
+
+    def get(self, key):
+        row = self.connection.execute("SELECT html, refs, texts FROM fragments WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return row[0], [tuple(ref) for ref in json.loads(row[1])], json.loads(row[2])
+
+    def put(self, key, html, refs, texts):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO fragments (key, html, refs, texts) VALUES (?, ?, ?, ?)",
+            (key, html, json.dumps(refs), json.dumps(texts)),
+        )
+
+    def close(self):
+        self.connection.close()
+
+
+class BlockCache:
+    """
+    Rendered HTML fragments keyed on a hash of the parser version and the
+    block's text, kept in memory with least-recently-used eviction and
+    optionally backed by a DiskStore. Each fragment is stored with the
+    references links.capture and the text feeds.capture collected while
+    rendering it, so a cache hit still feeds the link index and the feeds.
+    """
+    def __init__(self, max_entries=4096, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.entries = OrderedDict()
+        self.store = DiskStore(path) if path else None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(lines, context=""):
+        """
+        Returns the cache key of a block given as a list of lines. The
+        context stands for anything else the rendered block depends on, e.g.
+        the image index.
+        """
+        digest = hashlib.sha256(PARSER_VERSION.encode())
+        digest.update(b"\0")
+        digest.update(context.encode())
+        digest.update(b"\0")
+        digest.update("\n".join(lines).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Returns the cached (html, refs, texts) entry for a key, or None,
+        counting the lookup as a hit or a miss.
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        elif self.store is not None:
+            entry = self.store.get(key)
+            if entry is not None:
+                self._remember(key, entry)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def put(self, key, html, refs=(), texts=()):
+        self._remember(key, (html, list(refs), list(texts)))
+        if self.store is not None:
+            self.store.put(key, html, list(refs), list(texts))
+
+    def _remember(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        """Returns the hit and miss counters."""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+
+    def drain_counts(self):
+        """
+        Returns (hits, misses) and resets them, so a worker process can hand
+        its counters to the parent after each task.
+        """
+        counts = (self.hits, self.misses)
+        self.hits = self.misses = 0
+        return counts
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+
+
+def configure(max_entries=4096, path=None):
+    """
+    Turns on block caching in this process and returns the BlockCache.
+
+    Args:
+        max_entries (int): How many fragments to keep in memory.
+        path (str): An sqlite file to share fragments across builds, if any.
+    """
+    global _active
+    disable()
+    _active = BlockCache(max_entries, path)
+    return _active
+
+
+def disable():
+    global _active
+    if _active is not None:
+        _active.close()
+    _active = None
+
+
+def active():
+    """Returns the active BlockCache, or None when caching is off."""
+    return _active
+
+
+def settings():
+    """Returns the arguments to configure() the active cache again, e.g. in a worker process."""
+    if _active is None:
+        return None
+    return {"max_entries": _active.max_entries, "path": _active.path}
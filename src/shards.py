@@ -0,0 +1,218 @@
+"""
+Sharded builds, for sites too large to render on one machine in time. The
+pages are split across N shards by a stable hash of their source path; each
+shard renders its slice into its own output directory along with a shard
+manifest of what it produced, and a merge step assembles the final output
+tree and the site-wide outputs from the manifests alone.
+"""
+import hashlib
+import json
+import os
+from manifest import file_hash
+from metadata import PageMeta, SiteIndex
+
+SHARD_MANIFEST_NAME = ".shard-manifest.json"
+# Bump this whenever the shard manifest changes, so shards built by an older
+# version are not merged with newer ones
+SHARD_MANIFEST_VERSION = 2
+
+
+def parse_shard(spec):
+    """
+    Parses a shard specification such as "0/4", the first of four shards.
+
+    Args:
+        spec (str): The shard index and shard count, as "i/N" with 0 <= i < N.
+
+    Returns:
+        tuple: The shard index and the shard count.
+    """
+    index, _, count = spec.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"Invalid shard {spec}, expected i/N") from None
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard {spec}, expected 0 <= i < N")
+    return index, count
+
+
+def shard_of(source, count):
+    """
+    Returns the shard a page belongs to. The hash of the source path is the
+    same on every machine and in every process, unlike hash(), so each shard
+    agrees on the partition without talking to the others.
+
+    Args:
+        source (str): The Markdown file's path relative to the content root,
+            with forward slashes.
+        count (int): The number of shards.
+    """
+    digest = hashlib.sha256(source.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+def shard_pages(pages, content_root, index, count):
+    """
+    Returns the pages of one shard.
+
+    Args:
+        pages (list): (markdown path, html path) pairs, as from collect_pages.
+        content_root (str): The root of the content tree.
+        index (int): The shard index.
+        count (int): The number of shards.
+
+    Returns:
+        list: The pairs belonging to the shard, in the order given.
+    """
+    content_root = os.path.abspath(content_root)
+    return [
+        (item, html_file_path) for item, html_file_path in pages
+        if shard_of(os.path.relpath(item, content_root).replace(os.sep, "/"), count) == index
+    ]
+
+
+def nav_hash(nav):
+    """Returns the hash of a site's rendered navigation, which every page of a build embeds."""
+    return hashlib.sha256(nav.encode("utf-8")).hexdigest()
+
+
+def shard_directory(root, index, count):
+    """Returns the output directory of a shard under root, e.g. shards/0-of-4."""
+    return os.path.join(root, f"{index}-of-{count}")
+
+
+class ShardManifest:
+    """
+    What one shard produced: the hash of each page it rendered, and what the
+    merge needs of each page for the global outputs, i.e. its metadata for
+    navigation and listings, its references for the link check and its
+    summary for the sitemap, feed and search index.
+
+    Pages are keyed on their output path relative to the output root.
+    """
+    def __init__(self, index, count, basepath="/", nav_hash=None, pages=None):
+        self.index = index
+        self.count = count
+        self.basepath = basepath
+        # The hash of the navigation the shard rendered its pages with
+        self.nav_hash = nav_hash
+        self.pages = pages or {}
+
+    def add_page(self, output, output_hash, meta, refs=(), summary=None):
+        """
+        Records a page the shard rendered.
+
+        Args:
+            output (str): The page's output path relative to the output root.
+            output_hash (str): The hash of the rendered page.
+            meta (PageMeta): The page's metadata.
+            refs (list): The page's (kind, url) references.
+            summary (dict): The page's summary, see feeds.summarize_page.
+        """
+        self.pages[output] = {
+            "hash": output_hash,
+            "meta": {"title": meta.title, "path": meta.path, "date": meta.date, "tags": meta.tags,
+                     "source": os.path.relpath(meta.source) if meta.source else None},
+            "refs": [list(ref) for ref in refs],
+            "summary": summary,
+        }
+
+    def save(self, directory):
+        """Writes the manifest into the shard's output directory atomically."""
+        data = {"version": SHARD_MANIFEST_VERSION, "index": self.index, "count": self.count,
+                "basepath": self.basepath, "nav_hash": self.nav_hash, "pages": self.pages}
+        path = os.path.join(directory, SHARD_MANIFEST_NAME)
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Loads the manifest of a shard's output directory. Unlike a build
+        manifest, a missing or outdated one is an error: the shard has to be
+        built again before it can be merged.
+
+        Args:
+            directory (str): The shard's output directory.
+
+        Returns:
+            ShardManifest: The loaded manifest.
+        """
+        path = os.path.join(directory, SHARD_MANIFEST_NAME)
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ValueError(f"No readable shard manifest at {path}: {e}") from e
+        if data.get("version") != SHARD_MANIFEST_VERSION:
+            raise ValueError(f"Shard manifest {path} was written by another version")
+        return cls(data["index"], data["count"], data["basepath"], data["nav_hash"], data["pages"])
+
+
+def find_shards(root):
+    """Returns the output directories under root that hold a shard manifest, sorted."""
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        os.path.join(root, name) for name in os.listdir(root)
+        if os.path.isfile(os.path.join(root, name, SHARD_MANIFEST_NAME))
+    )
+
+
+def check_manifests(manifests):
+    """
+    Checks that a set of shard manifests make up exactly one build: every
+    shard of the same partition, for the same basepath and navigation, and
+    no page produced by two shards.
+
+    Args:
+        manifests (list): The ShardManifest of each shard directory.
+
+    Raises:
+        ValueError: Naming the first conflict found.
+    """
+    if not manifests:
+        raise ValueError("No shards to merge")
+    first = manifests[0]
+    for manifest in manifests[1:]:
+        if manifest.count != first.count:
+            raise ValueError(f"Shard {manifest.index} is one of {manifest.count}, shard {first.index} one of {first.count}")
+        if manifest.basepath != first.basepath:
+            raise ValueError(f"Shard {manifest.index} was built for {manifest.basepath}, shard {first.index} for {first.basepath}")
+        if manifest.nav_hash != first.nav_hash:
+            # The shards read different versions of the content tree
+            raise ValueError(f"Shards {first.index} and {manifest.index} were built with different navigation")
+    indexes = sorted(manifest.index for manifest in manifests)
+    if indexes != list(range(first.count)):
+        missing = sorted(set(range(first.count)) - set(indexes))
+        duplicated = sorted({index for index in indexes if indexes.count(index) > 1})
+        raise ValueError(f"Expected shards 0 to {first.count - 1}; missing {missing}, duplicated {duplicated}")
+    owners = {}
+    for manifest in manifests:
+        for output in manifest.pages:
+            if output in owners:
+                raise ValueError(f"{output} was produced by both shard {owners[output]} and shard {manifest.index}")
+            owners[output] = manifest.index
+
+
+def site_index_of(manifests):
+    """Rebuilds the SiteIndex of the whole site from the pages of every shard, in output order."""
+    pages = sorted((output, page) for manifest in manifests for output, page in manifest.pages.items())
+    return SiteIndex(PageMeta(**page["meta"]) for _, page in pages)
+
+
+def verify_output(directory, output, expected_hash):
+    """
+    Checks a page in a shard's output directory is still the one its
+    manifest recorded, e.g. not overwritten by another run since.
+
+    Raises:
+        ValueError: If the page is missing or its contents changed.
+    """
+    path = os.path.join(directory, output)
+    if not os.path.isfile(path):
+        raise ValueError(f"{path} is in the shard manifest but missing")
+    if file_hash(path) != expected_hash:
+        raise ValueError(f"{path} changed since its shard was built")
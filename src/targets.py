@@ -0,0 +1,64 @@
+"""
+Extra output trees built from the same render as the main one, each for its
+own basepath, e.g. a staging prefix and an archived versioned prefix next to
+the production root. Every page is parsed and serialized once, then
+relocated to each target's basepath, see template.RelocatableHTML.
+"""
+import os
+
+# The SiteTargets pages are also written to, or None when there are none
+_active = None
+
+
+def _contains(parent, path):
+    return path == parent or path.startswith(parent.rstrip(os.sep) + os.sep)
+
+
+class SiteTargets:
+    """
+    The extra output trees of a build, as (basepath, output root) pairs, and
+    the template values of each, such as its relocated navigation.
+    """
+    def __init__(self, root, targets, values=None):
+        self.root = os.path.abspath(root)
+        self.targets = [(basepath, os.path.abspath(target_root)) for basepath, target_root in targets]
+        roots = [self.root] + [target_root for _, target_root in self.targets]
+        for i, first in enumerate(roots):
+            for second in roots[i + 1:]:
+                # Syncing static files into one tree would prune the other
+                if _contains(first, second) or _contains(second, first):
+                    raise ValueError(f"Output trees {first} and {second} overlap")
+        for basepath, _ in self.targets:
+            if not (basepath.startswith("/") and basepath.endswith("/")):
+                raise ValueError(f"Basepath {basepath} must start and end with /")
+        # Basepath to the values of the template's other slots
+        self.values = values or {}
+
+    def output_paths(self, dest_path):
+        """
+        Returns the (basepath, path) of the copy of an output in every target,
+        given its path in the main output tree.
+        """
+        rel_path = os.path.relpath(os.path.abspath(dest_path), self.root)
+        return [(basepath, os.path.join(target_root, rel_path)) for basepath, target_root in self.targets]
+
+    def settings(self):
+        """The arguments that rebuild these targets in a worker process."""
+        return {"root": self.root, "targets": self.targets, "values": self.values}
+
+
+def configure(root, targets, values=None):
+    """Starts writing every output under root into each target as well, and returns the SiteTargets."""
+    global _active
+    _active = SiteTargets(root, targets, values)
+    return _active
+
+
+def disable():
+    global _active
+    _active = None
+
+
+def active():
+    """Returns the active SiteTargets, or None when only the main output tree is built."""
+    return _active
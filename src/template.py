@@ -0,0 +1,167 @@
+import functools
+import os
+import re
+from minify import minify_html
+
+# A placeholder such as {{ Title }} or {{ Content }}
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+def relocate(html, basepath="/"):
+    """
+    Points root-relative href and src attributes at the basepath.
+
+    Args:
+        html (str): The HTML to rewrite.
+        basepath (str): The path the site is served from.
+
+    Returns:
+        str: The rewritten HTML.
+    """
+    if basepath == "/":
+        return html
+    return html.replace('href="/', f'href="{basepath}').replace('src="/', f'src="{basepath}')
+
+
+# A root-relative href or src value, and a whole srcset attribute value
+URL_ATTRIBUTE = re.compile(r'(?:href|src)="(?=/)')
+SRCSET_ATTRIBUTE = re.compile(r'srcset="([^"]*)"')
+
+
+class RelocatableHTML:
+    """
+    Serialized HTML with the offsets of its root-relative URLs found once,
+    so it can be relocated to any number of basepaths by splicing the
+    basepath in at those offsets, without searching or parsing it again.
+
+    The URLs are those relocate rewrites, i.e. href and src values starting
+    with "/", plus the candidates of srcset values starting with "/".
+    """
+    __slots__ = ("html", "offsets", "_pieces")
+
+    def __init__(self, html):
+        self.html = html
+        offsets = [match.end() for match in URL_ATTRIBUTE.finditer(html)]
+        for match in SRCSET_ATTRIBUTE.finditer(html):
+            pos = match.start(1)
+            for candidate in match.group(1).split(","):
+                stripped = len(candidate) - len(candidate.lstrip())
+                if candidate[stripped:stripped + 1] == "/":
+                    offsets.append(pos + stripped)
+                pos += len(candidate) + 1
+        offsets.sort()
+        # The offset of each URL's leading "/", in document order
+        self.offsets = offsets
+        # The HTML between those slashes, so relocating is a single join
+        self._pieces = []
+        start = 0
+        for offset in offsets:
+            self._pieces.append(html[start:offset])
+            start = offset + 1
+        self._pieces.append(html[start:])
+
+    def relocate(self, basepath="/"):
+        """Returns the HTML with every recorded URL pointed at the basepath."""
+        if basepath == "/":
+            return self.html
+        return basepath.join(self._pieces)
+
+
+class Template:
+    """
+    A template compiled into alternating static segments and placeholder
+    slots, so rendering a page is a single join rather than one full-page
+    str.replace per placeholder.
+
+    The static segments are relocated to the basepath, and minified if
+    asked, once, at compile time. Rendered content is compact already, so a
+    minified template gives a minified page without a pass over its output.
+    """
+    def __init__(self, source, basepath="/", minify=False):
+        self.basepath = basepath
+        # Even indexes hold static text, odd indexes hold slot names
+        self.segments = []
+        # The original text of each slot, emitted when no value is given
+        self.placeholders = {}
+        pos = 0
+        for match in PLACEHOLDER_PATTERN.finditer(source):
+            self.segments.append(relocate(source[pos:match.start()], basepath))
+            self.segments.append(match.group(1))
+            self.placeholders[match.group(1)] = match.group()
+            pos = match.end()
+        self.segments.append(relocate(source[pos:], basepath))
+        if minify:
+            self.segments[0::2] = [minify_html(segment) for segment in self.segments[0::2]]
+            self.segments[0] = self.segments[0].lstrip()
+            self.segments[-1] = self.segments[-1].rstrip()
+
+    @property
+    def slots(self):
+        """The names of the placeholders in the template, in order."""
+        return self.segments[1::2]
+
+    def iter_render(self, values):
+        """
+        Yields the rendered template in chunks.
+
+        Args:
+            values (dict): Slot name to value. A value is either a string or an
+                iterable of string chunks, e.g. HTMLNode.iter_html(). Slots
+                without a value are left as written in the template.
+        """
+        for i, segment in enumerate(self.segments):
+            if i % 2 == 0:
+                yield segment
+                continue
+            value = values.get(segment)
+            if value is None:
+                yield self.placeholders[segment]
+            elif isinstance(value, str):
+                yield value
+            else:
+                yield from value
+
+    def render(self, values):
+        """
+        Renders the template to a string.
+
+        Args:
+            values (dict): Slot name to value, as for iter_render.
+
+        Returns:
+            str: The rendered page.
+        """
+        return "".join(self.iter_render(values))
+
+    def write(self, sink, values):
+        """
+        Renders the template chunk by chunk into a file-like sink.
+
+        Args:
+            sink: Any object with a writelines method, e.g. an open text file.
+            values (dict): Slot name to value, as for iter_render.
+        """
+        sink.writelines(self.iter_render(values))
+
+
+@functools.lru_cache(maxsize=32)
+def _compile_template(path, basepath, minify, mtime_ns, size):
+    with open(path, 'r') as f:
+        return Template(f.read(), basepath, minify)
+
+
+def load_template(path, basepath="/", minify=False):
+    """
+    Loads and compiles a template file, reusing the compiled template for as
+    long as the file is unchanged on disk.
+
+    Args:
+        path (str): The path to the template file.
+        basepath (str): The path the site is served from.
+        minify (bool): Whether to minify the template's markup.
+
+    Returns:
+        Template: The compiled template.
+    """
+    stat = os.stat(path)
+    return _compile_template(os.path.abspath(path), basepath, minify, stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+from assets import sync_assets, sync_file, is_up_to_date
+
+class TestAssetSync(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "static")
+        self.destination = os.path.join(self.tmp.name, "docs")
+        self.write(os.path.join(self.source, "index.css"), "body {}")
+        self.write(os.path.join(self.source, "images", "a.png"), "png bytes")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_sync_copies_then_skips(self):
+        first = sync_assets(self.source, self.destination)
+        self.assertEqual(first, {"index.css": True, os.path.join("images", "a.png"): True})
+        self.assertEqual(self.read(os.path.join(self.destination, "images", "a.png")), "png bytes")
+        second = sync_assets(self.source, self.destination)
+        self.assertFalse(any(second.values()))
+
+    def test_changed_file_is_recopied(self):
+        sync_assets(self.source, self.destination)
+        css = os.path.join(self.source, "index.css")
+        self.write(css, "body { color: red }")
+        results = sync_assets(self.source, self.destination)
+        self.assertTrue(results["index.css"])
+        self.assertEqual(self.read(os.path.join(self.destination, "index.css")), "body { color: red }")
+
+    def test_hash_check_skips_touched_file(self):
+        src = os.path.join(self.source, "index.css")
+        dst = os.path.join(self.destination, "index.css")
+        sync_file(src, dst)
+        os.utime(src, ns=(0, 0))
+        self.assertFalse(is_up_to_date(src, dst))
+        self.assertTrue(is_up_to_date(src, dst, check_hash=True))
+        self.assertFalse(sync_file(src, dst))
+
+    def test_hardlink_mode(self):
+        sync_assets(self.source, self.destination, link_mode="hardlink")
+        src = os.path.join(self.source, "index.css")
+        dst = os.path.join(self.destination, "index.css")
+        self.assertTrue(os.path.samefile(src, dst))
+
+    def test_prune_removes_extra_files(self):
+        extra = os.path.join(self.destination, "old", "index.html")
+        self.write(extra, "stale")
+        sync_assets(self.source, self.destination, prune=True)
+        self.assertFalse(os.path.exists(os.path.dirname(extra)))
+
+    def test_transform_writes_on_content_change(self):
+        transforms = {".css": lambda data: data.replace(b" ", b"")}
+        first = sync_assets(self.source, self.destination, transforms=transforms)
+        self.assertTrue(first["index.css"])
+        self.assertEqual(self.read(os.path.join(self.destination, "index.css")), "body{}")
+        second = sync_assets(self.source, self.destination, transforms=transforms)
+        self.assertFalse(any(second.values()))
+        # Without the transform the plain copy differs, so it is written again
+        self.assertTrue(sync_assets(self.source, self.destination)["index.css"])
+
+    def test_unknown_link_mode(self):
+        with self.assertRaises(ValueError):
+            sync_assets(self.source, self.destination, link_mode="symlink")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,8 @@
+import io
+import random
+import sys
 import unittest
-from block import markdown_to_blocks, block_to_block_type, BlockType, markdown_to_html_node
+from block import markdown_to_blocks, block_to_block_type, BlockType, markdown_to_html_node, iter_blocks, iter_markdown_html
 from htmlnode import HTMLNode, LeafNode, ParentNode
 from inline import text_to_textnodes
 
@@ -146,4 +149,105 @@ the **same** even with inline stuff
         self.assertEqual(
         html,
         "<div><pre><code>This is text that _should_ remain\nthe **same** even with inline stuff\n</code></pre></div>",
-    )
\ No newline at end of file
+    )
+
+    def test_codeblock_language_and_escaping(self):
+        md = "```python\nif a < b:\n    pass\n```"
+        self.assertEqual(
+            markdown_to_html_node(md).to_html(),
+            '<div><pre><code class="language-python"><span class="k">if</span> a &lt; b:\n'
+            '    <span class="k">pass</span>\n</code></pre></div>',
+        )
+
+    def test_fenced_code_keeps_blank_lines(self):
+        md = "```\na = 1\n\nb = 2\n```\n\nafter"
+        self.assertEqual(markdown_to_blocks(md), ["```\na = 1\n\nb = 2\n```", "after"])
+        self.assertEqual(markdown_to_html_node(md).to_html(),
+                         "<div><pre><code>a = 1\n\nb = 2\n</code></pre><p>after</p></div>")
+
+    def test_nested_lists(self):
+        md = "- a\n  - b\n    - c\n  - d\n- e\n\n1. one\n2. two\n   1. sub"
+        self.assertEqual(
+            markdown_to_html_node(md).to_html(),
+            "<div><ul><li>a<ul><li>b<ul><li>c</li></ul></li><li>d</li></ul></li><li>e</li></ul>"
+            "<ol><li>one</li><li>two<ol><li>sub</li></ol></li></ol></div>",
+        )
+
+    def test_sublists_indented_less_than_the_item_content(self):
+        self.assertEqual(
+            markdown_to_html_node("1. a\n  - b\n2. c").to_html(),
+            "<div><ol><li>a<ul><li>b</li></ul></li><li>c</li></ol></div>",
+        )
+        self.assertEqual(
+            markdown_to_html_node("1. one\n2. two\n  - sub\n3. three").to_html(),
+            "<div><ol><li>one</li><li>two<ul><li>sub</li></ul></li><li>three</li></ol></div>",
+        )
+        self.assertEqual(
+            markdown_to_html_node("- a\n    - b\n  - c\n- d").to_html(),
+            "<div><ul><li>a<ul><li>b</li><li>c</li></ul></li><li>d</li></ul></div>",
+        )
+
+    def test_no_list_item_is_dropped(self):
+        rng = random.Random(21)
+        for _ in range(200):
+            lines, markers = [], []
+            for number in range(rng.randint(1, 12)):
+                # Any marker column from the outermost list to past the
+                # content of the item before
+                indent = rng.randint(0, markers[-1][1] + 1) if markers else 0
+                marker = rng.choice(["- ", f"{number + 1}. "])
+                markers.append((indent, indent + len(marker)))
+                lines.append(" " * indent + f"{marker}item{number}z")
+            md = "\n".join(lines)
+            html = markdown_to_html_node(md).to_html()
+            for number in range(len(lines)):
+                self.assertIn(f"item{number}z", html, md)
+
+    def test_lazy_continuation_lines_stay_in_the_list(self):
+        self.assertEqual(
+            markdown_to_html_node("- a\n- b\n  continued\nlazy").to_html(),
+            "<div><ul><li>a</li><li>b continued lazy</li></ul></div>",
+        )
+        self.assertEqual(markdown_to_html_node("1. a\n2. b\nlazy").to_html(),
+                         "<div><ol><li>a</li><li>b lazy</li></ol></div>")
+
+    def test_list_items_with_blocks(self):
+        md = "- first\n\n  more **first**\n\n  ```\n  x\n\n  y\n  ```\n- second\n\nafter"
+        self.assertEqual(markdown_to_blocks(md)[1], "after")
+        self.assertEqual(
+            markdown_to_html_node(md).to_html(),
+            "<div><ul><li><p>first</p><p>more <b>first</b></p><pre><code>x\n\ny\n</code></pre></li>"
+            "<li><p>second</p></li></ul><p>after</p></div>",
+        )
+
+    def test_deep_nesting_is_not_recursive(self):
+        depth = 2 * sys.getrecursionlimit()
+        md = "\n".join("  " * level + f"- item {level}" for level in range(depth))
+        html = markdown_to_html_node(md).to_html()
+        self.assertEqual(html.count("<ul>"), depth)
+        self.assertTrue(html.endswith("<li>item %d</li>" % (depth - 1) + "</ul></li>" * (depth - 1) + "</ul></div>"))
+
+    def test_iter_blocks_from_lines(self):
+        source = io.StringIO("# Title\n\n  Some text\nmore text  \n\n\n- a\n- b\n   \n")
+        blocks = iter_blocks(source)
+        first = next(blocks)
+        self.assertEqual((first.block_type, first.level, first.lines), (BlockType.HEADING, 1, ["# Title"]))
+        rest = [(block.block_type, block.lines) for block in blocks]
+        self.assertEqual(rest, [
+            (BlockType.PARAGRAPH, ["Some text", "more text"]),
+            (BlockType.UNORDERED_LIST, ["- a", "- b"]),
+        ])
+
+    def test_streamed_html_matches_tree(self):
+        md = "# Title\n\nSome **bold** text\n\n```\ncode\n```\n\n> quote\n\n1. one\n2. two"
+        self.assertEqual("".join(iter_markdown_html(io.StringIO(md))), markdown_to_html_node(md).to_html())
+
+    def test_ordered_list_past_nine(self):
+        md = "\n".join(f"{i}. item {i}" for i in range(1, 12))
+        html = markdown_to_html_node(md).to_html()
+        self.assertIn("<li>item 10</li><li>item 11</li></ol>", html)
+
+    def test_heading_level_ignores_hashes_in_text(self):
+        html = markdown_to_html_node("## C# and F#").to_html()
+        self.assertEqual(html, "<div><h2>C# and F#</h2></div>")
+        self.assertEqual(block_to_block_type("#"), BlockType.PARAGRAPH)
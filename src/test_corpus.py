@@ -0,0 +1,27 @@
+import os
+import tempfile
+import unittest
+from corpus import CorpusSpec, generate_corpus, page_markdown
+from block import markdown_to_html_node
+from inline import extract_markdown_links, extract_markdown_images
+
+class TestCorpus(unittest.TestCase):
+    def test_page_is_deterministic_and_parses(self):
+        spec = CorpusSpec(pages=10, paragraphs=4, links=3, images=2)
+        markdown = page_markdown(3, spec)
+        self.assertEqual(markdown, page_markdown(3, spec))
+        self.assertTrue(markdown.startswith("# Page 3"))
+        self.assertEqual(len(extract_markdown_links(markdown)), 4 * 3)
+        self.assertEqual(len(extract_markdown_images(markdown)), 4 * 2)
+        self.assertTrue(markdown_to_html_node(markdown).to_html().startswith("<div><h1>"))
+
+    def test_generate_corpus(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = generate_corpus(tmp, CorpusSpec(pages=5, paragraphs=2))
+            self.assertEqual(len(paths), 5)
+            self.assertTrue(os.path.exists(os.path.join(tmp, "index.md")))
+            self.assertTrue(os.path.exists(os.path.join(tmp, "pages", "page-4", "index.md")))
+
+
+if __name__ == "__main__":
+    unittest.main()
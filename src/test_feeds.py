@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+import feeds
+from feeds import AtomFeedWriter, SearchIndexWriter, excerpt, search_terms, summarize_page
+from main import generate_pages_recursive
+
+
+class TestSummaries(unittest.TestCase):
+    def test_excerpt(self):
+        self.assertEqual(excerpt(["Short  text", "here"]), "Short text here")
+        self.assertEqual(excerpt(["one two three four"], length=12), "one two…")
+
+    def test_search_terms(self):
+        self.assertEqual(search_terms(["The Elf, the elf!", "A ring 42"]), ["42", "elf", "ring", "the"])
+
+    def test_summary_skips_title(self):
+        summary = summarize_page("blog/tom/index.html", "Tom", "2024-01-01", ["Tom", "Old Tom"])
+        self.assertEqual((summary["path"], summary["excerpt"]), ("/blog/tom/", "Old Tom"))
+
+
+class TestWriters(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        feeds.disable()
+        self.tmp.cleanup()
+
+    def test_search_index_shards(self):
+        search = SearchIndexWriter(str(self.root / "search"), "/base/")
+        search.add({"path": "/a/", "title": "A", "excerpt": "x", "terms": ["elf", "ring"]})
+        search.add({"path": "/b/", "title": "B", "excerpt": "y", "terms": ["elves", "sword"]})
+        search.close()
+        read = lambda name: json.loads((self.root / "search" / name).read_text())
+        self.assertEqual(read("index.json"), {"prefix_length": 1, "documents": 2, "shards": ["e", "r", "s"]})
+        self.assertEqual(read("documents.json"), [["/base/a/", "A", "x"], ["/base/b/", "B", "y"]])
+        self.assertEqual(read("e.json"), {"elf": [0], "elves": [1]})
+        self.assertFalse((self.root / "search" / ".spool").exists())
+
+    def test_feed_keeps_newest(self):
+        feed = AtomFeedWriter(str(self.root / "feed.xml"), "https://example.org/", "Blog", feed_size=2)
+        for day in (3, 1, 2):
+            feed.add({"path": f"/blog/{day}/", "title": f"Post {day}", "excerpt": "..."}, f"2024-01-0{day}")
+        feed.add({"path": "/about/", "title": "About", "excerpt": "..."}, "2024-02-01")
+        feed.close()
+        xml = (self.root / "feed.xml").read_text()
+        self.assertLess(xml.index("Post 3"), xml.index("Post 2"))
+        self.assertNotIn("Post 1", xml)
+        self.assertNotIn("About", xml)
+        self.assertIn("<updated>2024-01-03T00:00:00Z</updated>", xml)
+
+    def test_feed_names_an_author(self):
+        for author, expected in ((None, "example.org"), ("Bilbo & Co", "Bilbo &amp; Co")):
+            feed = AtomFeedWriter(str(self.root / "feed.xml"), "https://example.org/", "Blog", author)
+            feed.close()
+            self.assertIn(f"<author><name>{expected}</name></author>", (self.root / "feed.xml").read_text())
+
+    def test_undated_post_date_does_not_follow_mtime(self):
+        source = self.root / "post.md"
+        source.write_text("# Post")
+        summary = summarize_page("blog/post/index.html", "Post", None, ["Post"], str(source))
+        os.utime(source, (0, 2000000000))
+        self.assertEqual(summarize_page("blog/post/index.html", "Post", None, ["Post"], str(source)), summary)
+        # Not committed anywhere, so it gets the fixed date
+        self.assertEqual((summary["date"], summary["undated"]), (feeds.UNDATED, True))
+        self.assertIsNone(summarize_page("about/index.html", "About", None, [], str(source))["date"])
+
+    def test_parallel_build_matches_serial(self):
+        content = self.root / "content"
+        (content / "blog" / "post").mkdir(parents=True)
+        (content / "index.md").write_text("# Home\n\nWelcome to the **shire**")
+        (content / "blog" / "post" / "index.md").write_text("---\ndate: 2024-03-01\n---\n# Post\n\nA [ring](/) story")
+        template = self.root / "template.html"
+        template.write_text("<title>{{ Title }}</title>{{ Content }}")
+        outputs = {}
+        for jobs in (1, 2):
+            out = self.root / f"out-{jobs}"
+            feeds.configure(out, "https://example.org")
+            generate_pages_recursive(content, template, content, out, jobs=jobs)
+            self.assertIsNone(feeds.active())
+            outputs[jobs] = {
+                name: (out / name).read_text()
+                for name in ("sitemap.xml", "feed.xml", "search/documents.json", "search/r.json")
+            }
+        self.assertEqual(outputs[1], outputs[2])
+        self.assertIn("<loc>https://example.org/blog/post/</loc><lastmod>2024-03-01</lastmod>", outputs[1]["sitemap.xml"])
+        self.assertIn("<summary>A ring story</summary>", outputs[1]["feed.xml"])
+        paths = [document[0] for document in json.loads(outputs[1]["search/documents.json"])]
+        self.assertEqual(json.loads(outputs[1]["search/r.json"]), {"ring": [paths.index("/blog/post/")]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+from highlight import highlight, info_language, tokenize, LANGUAGES
+
+
+class TestHighlight(unittest.TestCase):
+    def test_info_language(self):
+        self.assertEqual(info_language("```"), "")
+        self.assertEqual(info_language("```Python title=app.py"), "python")
+        self.assertEqual(info_language("``` {.js}"), "javascript")
+
+    def test_tokens_cover_code(self):
+        code = 'def f(x):\n    return "x" + 1  # done\n'
+        tokens = list(tokenize(code, LANGUAGES["python"]))
+        self.assertEqual("".join(text for _, text in tokens), code)
+        self.assertEqual([(css_class, text) for css_class, text in tokens if css_class], [
+            ("k", "def"), ("k", "return"), ("s", '"x"'), ("m", "1"), ("c", "# done"),
+        ])
+
+    def test_escapes(self):
+        self.assertEqual(highlight("if (a < b && c)\n", "javascript"),
+                         '<span class="k">if</span> (a &lt; b &amp;&amp; c)\n')
+        self.assertEqual(highlight('<p class="x">\n', "unknown"), '&lt;p class="x"&gt;\n')
+
+    def test_strings_hide_keywords(self):
+        self.assertEqual(highlight("'if' // for\n", "javascript"),
+                         '<span class="s">\'if\'</span> <span class="c">// for</span>\n')
+
+    def test_cached(self):
+        highlight.cache_clear()
+        highlight("x = 1\n", "python")
+        highlight("x = 1\n", "python")
+        self.assertEqual(highlight.cache_info().hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
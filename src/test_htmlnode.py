@@ -1,6 +1,7 @@
+import io
 import unittest
 
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import HTMLNode, LeafNode, ParentNode, RawNode
 
 class TestHTMLNode(unittest.TestCase):
     def test_one(self):
@@ -45,3 +46,58 @@ class TestHTMLNode(unittest.TestCase):
         child_node = ParentNode("span", [grandchild_node])
         parent_node = ParentNode("div", [child_node])
         self.assertEqual(parent_node.to_html(),"<div><span><b>grandchild</b></span></div>",)
+
+    def test_iter_html_chunks(self):
+        node = ParentNode("p", [LeafNode(None, "Hi "), ParentNode("b", [LeafNode("i", "there")])])
+        self.assertEqual(list(node.iter_html()), ["<p>", "Hi ", "<b>", "<i>there</i>", "</b>", "</p>"])
+
+    def test_write_html_to_sink(self):
+        node = ParentNode("div", [LeafNode("span", "child"), LeafNode("a", "link", {"href": "/x"})])
+        sink = io.StringIO()
+        node.write_html(sink)
+        self.assertEqual(sink.getvalue(), node.to_html())
+        self.assertEqual(sink.getvalue(), '<div><span>child</span><a href="/x">link</a></div>')
+
+    def test_deeply_nested_to_html(self):
+        node = LeafNode("b", "deep")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span>" * 5000 + "<b>deep</b>"))
+        self.assertTrue(html.endswith("</span>" * 5000))
+
+    def test_parent_without_children_raises(self):
+        with self.assertRaises(ValueError):
+            ParentNode("div", []).to_html()
+        with self.assertRaises(ValueError):
+            list(ParentNode("div", [ParentNode("p", [])]).iter_html())
+
+    def test_nodes_are_slotted_and_share_empty_containers(self):
+        first, second = LeafNode("b", "one"), LeafNode("b", "two")
+        self.assertFalse(hasattr(first, "__dict__"))
+        self.assertIs(first.children, second.children)
+        self.assertIs(first.props, second.props)
+        self.assertEqual(first.children, [])
+        self.assertEqual(first.props, {})
+        self.assertEqual(repr(first), "(b, one, [], {})")
+        with self.assertRaises(TypeError):
+            first.children.append(second)
+        with self.assertRaises(TypeError):
+            first.props["class"] = "x"
+
+    def test_passed_containers_stay_mutable(self):
+        node = ParentNode("ul", [])
+        node.children.append(LeafNode("li", "one"))
+        link = LeafNode("a", "x", {})
+        link.props["href"] = "/"
+        self.assertEqual(node.to_html(), "<ul><li>one</li></ul>")
+        self.assertEqual(link.to_html(), '<a href="/">x</a>')
+
+    def test_leaf_escapes_text_and_attributes(self):
+        node = LeafNode("a", "Fish & <Chips>", {"href": '/menu?a=1&b="2"'})
+        self.assertEqual(node.to_html(), '<a href="/menu?a=1&amp;b=&quot;2&quot;">Fish &amp; &lt;Chips&gt;</a>')
+        self.assertEqual(LeafNode(None, "it's \"fine\"").to_html(), "it's \"fine\"")
+
+    def test_raw_node_is_not_escaped(self):
+        node = ParentNode("p", [RawNode("<b>&amp;</b>"), LeafNode(None, " & more")])
+        self.assertEqual(node.to_html(), "<p><b>&amp;</b> &amp; more</p>")
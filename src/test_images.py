@@ -0,0 +1,85 @@
+import os
+import struct
+import tempfile
+import unittest
+import images
+from images import ImageIndex, image_size, process_images
+from textnode import TextNode, TextType, text_node_to_html_node
+
+
+def png_header(width, height):
+    return b"\x89PNG\r\n\x1a\n" + b"\x00\x00\x00\x0dIHDR" + struct.pack(">II", width, height) + b"\x08\x06\x00\x00\x00"
+
+
+class TestImageSize(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def size_of(self, data):
+        path = os.path.join(self.tmp.name, "image")
+        with open(path, 'wb') as f:
+            f.write(data)
+        return image_size(path)
+
+    def test_png(self):
+        self.assertEqual(self.size_of(png_header(1344, 896)), (1344, 896))
+
+    def test_gif(self):
+        self.assertEqual(self.size_of(b"GIF89a" + struct.pack("<HH", 40, 30) + b"\x00" * 20), (40, 30))
+
+    def test_jpeg(self):
+        app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+        sof = b"\xff\xc0" + struct.pack(">HBHH", 17, 8, 600, 800) + b"\x00" * 10
+        self.assertEqual(self.size_of(b"\xff\xd8" + app0 + sof), (800, 600))
+
+    def test_truncated(self):
+        sof = b"\xff\xd8\xff\xc0" + struct.pack(">HB", 17, 8) + b"\x02"
+        self.assertIsNone(self.size_of(sof))
+        self.assertIsNone(self.size_of(png_header(1344, 896)[:20]))
+
+    def test_webp(self):
+        vp8x = b"RIFF\x00\x00\x00\x00WEBPVP8X" + b"\x0a\x00\x00\x00" + b"\x00" * 4
+        vp8x += (1919).to_bytes(3, "little") + (1079).to_bytes(3, "little")
+        self.assertEqual(self.size_of(vp8x), (1920, 1080))
+
+    def test_unknown(self):
+        self.assertIsNone(self.size_of(b"not an image at all"))
+
+
+class TestImageIndex(unittest.TestCase):
+    def tearDown(self):
+        images.disable()
+
+    def test_props(self):
+        index = ImageIndex("/base/", {"/images/a.png": {"width": 1000, "height": 500, "variants": [480, 960]}})
+        self.assertEqual(index.props("/images/a.png", "A"), {
+            "src": "/images/a.png", "alt": "A", "width": "1000", "height": "500", "loading": "lazy",
+            "srcset": "/base/images/a-480w.webp 480w, /base/images/a-960w.webp 960w, /base/images/a.png 1000w",
+        })
+        self.assertEqual(index.props("https://example.org/b.png", "B"), {"src": "https://example.org/b.png", "alt": "B"})
+
+    def test_img_tag_uses_active_index(self):
+        images.configure(ImageIndex("/", {"/a.png": {"width": 10, "height": 20, "variants": []}}))
+        html_node = text_node_to_html_node(TextNode("A", TextType.IMAGE, "/a.png"))
+        self.assertEqual(html_node.to_html(), '<img src="/a.png" alt="A" width="10" height="20" loading="lazy" />')
+
+    def test_process_images_is_cached(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            static, cache = os.path.join(tmp, "static"), os.path.join(tmp, "cache")
+            os.makedirs(os.path.join(static, "images"))
+            for name, size in (("a.png", (1200, 600)), ("b.png", (300, 200))):
+                with open(os.path.join(static, "images", name), 'wb') as f:
+                    f.write(png_header(*size))
+            index, _ = process_images(static, os.path.join(tmp, "docs"), cache_dir=cache, jobs=1)
+            self.assertEqual(index.images["/images/b.png"]["width"], 300)
+            cached = sorted(os.listdir(cache))
+            again, _ = process_images(static, os.path.join(tmp, "docs"), cache_dir=cache, jobs=2)
+            self.assertEqual(again.images, index.images)
+            self.assertEqual(sorted(os.listdir(cache)), cached)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -128,6 +128,47 @@ class TestInlineMarkdown(unittest.TestCase):
         self.assertEqual(nodes[5].text, "code")
         self.assertEqual(nodes[5].text_type, TextType.CODE)
        
+    def test_text_to_textnodes_images_and_links(self):
+        text = "An ![image](/img.png) then a [link](https://a.dev) and **bold**"
+        self.assertListEqual(
+            text_to_textnodes(text),
+            [
+                TextNode("An ", TextType.TEXT),
+                TextNode("image", TextType.IMAGE, "/img.png"),
+                TextNode(" then a ", TextType.TEXT),
+                TextNode("link", TextType.LINK, "https://a.dev"),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("bold", TextType.BOLD),
+            ],
+        )
+
+    def test_text_to_textnodes_single_pass_precedence(self):
+        # Delimiters inside a link URL or a code span are not split
+        self.assertListEqual(
+            text_to_textnodes("[docs](/my_page_name) and `a**b`"),
+            [
+                TextNode("docs", TextType.LINK, "/my_page_name"),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("a**b", TextType.CODE),
+            ],
+        )
+        # Brackets that open nothing stay in the surrounding text
+        self.assertListEqual(text_to_textnodes("a [b] c!"), [TextNode("a [b] c!", TextType.TEXT)])
+        self.assertListEqual(text_to_textnodes(""), [TextNode("", TextType.TEXT)])
+
+    def test_text_to_textnodes_unmatched(self):
+        with self.assertRaises(Exception):
+            text_to_textnodes("an **unclosed bold")
+
+    def test_split_nodes_skip_non_text_and_plain_text(self):
+        code = TextNode("[not](a_link)", TextType.CODE)
+        plain = TextNode("no markup here", TextType.TEXT)
+        self.assertEqual(split_nodes_link([code, plain]), [code, plain])
+        self.assertEqual(split_nodes_image([code, plain]), [code, plain])
+        self.assertIs(split_nodes_link([plain])[0], plain)
+        self.assertListEqual(extract_markdown_links("no brackets at all"), [])
+        self.assertListEqual(extract_markdown_images("a [link](/x) only"), [])
+
     def test_extract_title(self):
     # Test with a valid markdown
         assert extract_title("# Hello World") == "Hello World"
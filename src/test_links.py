@@ -0,0 +1,46 @@
+import unittest
+import links
+from links import LinkIndex, resolve
+
+
+class TestResolve(unittest.TestCase):
+    def test_root_relative(self):
+        self.assertEqual(resolve("/blog/tom", "index.html"), "/blog/tom")
+        self.assertEqual(resolve("/blog/tom/#intro", "index.html"), "/blog/tom/")
+
+    def test_relative_to_page(self):
+        self.assertEqual(resolve("../majesty/", "blog/tom/index.html"), "/blog/majesty/")
+        self.assertEqual(resolve("cover%20art.png", "blog/tom/index.html"), "/blog/tom/cover art.png")
+
+    def test_outside_the_site(self):
+        self.assertIsNone(resolve("https://example.com/x", "index.html"))
+        self.assertIsNone(resolve("mailto:me@example.com", "index.html"))
+        self.assertIsNone(resolve("#top", "index.html"))
+
+
+class TestLinkIndex(unittest.TestCase):
+    def tearDown(self):
+        links.disable()
+
+    def test_dangling(self):
+        index = LinkIndex("docs")
+        for target in ("index.html", "blog/tom/index.html", "images/tom.png"):
+            index.add_target(target)
+        index.add_page("index.html", [("link", "/blog/tom"), ("link", "/blog/gone"), ("image", "/images/tom.png")])
+        index.add_page("blog/tom/index.html", [("link", "/"), ("image", "tom.png"), ("link", "https://x.org")])
+        self.assertEqual(index.dangling(), [
+            ("blog/tom/index.html", "image", "tom.png"),
+            ("index.html", "link", "/blog/gone"),
+        ])
+
+    def test_nested_capture(self):
+        with links.capture() as page:
+            links.record("link", "/a")
+            with links.capture() as block:
+                links.record("image", "/b.png")
+        self.assertEqual(block, [("image", "/b.png")])
+        self.assertEqual(page, [("link", "/a"), ("image", "/b.png")])
+
+
+if __name__ == "__main__":
+    unittest.main()
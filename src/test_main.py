@@ -0,0 +1,219 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+import links
+import precompress
+import targets
+import writer
+from main import build_full, build_shard, main, collect_pages, generate_pages_recursive, merge_shards, rebuild_changes
+
+TEMPLATE = "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>"
+
+class TestPageGeneration(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.content = self.root / "content"
+        pages = {
+            "index.md": "# Home\n\n[About](/about)",
+            "about.md": "# About\n\nSome **bold** text",
+            "blog/post/index.md": "# Post\n\n- one\n- two",
+        }
+        for rel, text in pages.items():
+            path = self.content / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(text)
+        self.template = self.root / "template.html"
+        self.template.write_text(TEMPLATE)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read_tree(self, root):
+        return {
+            str(path.relative_to(root)): path.read_bytes()
+            for path in sorted(Path(root).rglob("*")) if path.is_file()
+        }
+
+    def test_collect_pages(self):
+        pages = collect_pages(self.content, self.content, self.root / "out")
+        outputs = sorted(str(Path(html).relative_to((self.root / "out").resolve())) for _, html in pages)
+        self.assertEqual(outputs, ["about/index.html", "blog/post/index.html", "index.html"])
+
+    def test_collect_pages_is_sorted(self):
+        for name in ("zeta.md", "alpha.md", "blog/b.md", "blog/a.md"):
+            (self.content / name).write_text("# Page")
+        pages = collect_pages(self.content, self.content, self.root / "out")
+        sources = [str(Path(item).relative_to(self.content.resolve())) for item, _ in pages]
+        self.assertEqual(sources, ["about.md", "alpha.md", "blog/a.md", "blog/b.md", "blog/post/index.md",
+                                   "index.md", "zeta.md"])
+
+    def test_parallel_matches_serial(self):
+        serial, parallel = self.root / "serial", self.root / "parallel"
+        generate_pages_recursive(self.content, self.template, self.content, serial, "/base/", jobs=1)
+        generate_pages_recursive(self.content, self.template, self.content, parallel, "/base/", jobs=2)
+        self.assertEqual(self.read_tree(serial), self.read_tree(parallel))
+
+    def test_link_check_collects_from_workers(self):
+        out = self.root / "out"
+        (self.content / "broken-link.md").write_text("# Broken\n\n[Gone](/gone) and [Post](/blog/post)")
+        link_index = links.enable(out)
+        try:
+            generate_pages_recursive(self.content, self.template, self.content, out, jobs=2)
+        finally:
+            links.disable()
+        self.assertEqual(len(link_index.pages), 4)
+        self.assertEqual(link_index.dangling(), [("broken-link/index.html", "link", "/gone")])
+
+    def test_front_matter_nav_and_listings(self):
+        out = self.root / "out"
+        (self.content / "blog" / "older.md").write_text("---\ndate: 2020-01-01\ntags: [news]\n---\n# Older\n\nText")
+        self.template.write_text("<title>{{ Title }}</title>{{ Nav }}{{ Content }}")
+        generate_pages_recursive(self.content, self.template, self.content, out, "/base/")
+        older = (out / "blog" / "older" / "index.html").read_text()
+        self.assertNotIn("date:", older)
+        self.assertIn('<nav><ul><li><a href="/base/">Home</a></li><li><a href="/base/about/">About</a></li>', older)
+        self.assertIn('<li><a href="/base/blog/">Blog</a></li>', older)
+        listing = (out / "blog" / "index.html").read_text()
+        self.assertIn('<a href="/base/blog/older/">Older</a> <time datetime="2020-01-01">2020-01-01</time>', listing)
+        self.assertIn("Older", (out / "tags" / "news" / "index.html").read_text())
+
+    def test_titles_are_escaped(self):
+        out = self.root / "out"
+        (self.content / "about.md").write_text("---\ntags: [R&D]\n---\n# A <b> & C\n\nText")
+        generate_pages_recursive(self.content, self.template, self.content, out)
+        self.assertIn("<title>A &lt;b&gt; &amp; C</title>", (out / "about" / "index.html").read_text())
+        self.assertIn("<title>Tagged: R&amp;D</title>", (out / "tags" / "r-d" / "index.html").read_text())
+
+    def test_targets_match_separate_builds(self):
+        out, staging, archive = self.root / "out", self.root / "staging", self.root / "archive"
+        (self.content / "blog" / "older.md").write_text("---\ndate: 2020-01-01\n---\n# Older\n\n![x](/x.png)")
+        self.template.write_text('<link href="/index.css" />{{ Nav }}{{ Content }}')
+        targets.configure(out, [("/staging/", staging), ("/v1/", archive)])
+        try:
+            generate_pages_recursive(self.content, self.template, self.content, out, "/base/", jobs=2)
+        finally:
+            targets.disable()
+        for tree, basepath in ((out, "/base/"), (staging, "/staging/"), (archive, "/v1/")):
+            expected = self.root / "expected" / basepath.strip("/")
+            generate_pages_recursive(self.content, self.template, self.content, expected, basepath)
+            self.assertEqual(self.read_tree(tree), self.read_tree(expected))
+        self.assertIn('<link href="/v1/index.css" />', (archive / "index.html").read_text())
+
+    def test_overlapping_targets_are_rejected(self):
+        with self.assertRaises(ValueError):
+            targets.configure(self.root / "out", [("/staging/", self.root / "out" / "staging")])
+        with self.assertRaises(ValueError):
+            targets.configure(self.root / "out", [("staging", self.root / "staging")])
+        targets.disable()
+
+    def test_merged_shards_match_single_build(self):
+        (self.content / "blog" / "older.md").write_text("---\ndate: 2020-01-01\ntags: [news]\n---\n# Older\n\nText")
+        self.template.write_text("<title>{{ Title }}</title>{{ Nav }}{{ Content }}")
+        static = self.root / "static"
+        static.mkdir()
+        (static / "index.css").write_text("p {}")
+        single, merged = self.root / "single", self.root / "merged"
+        generate_pages_recursive(self.content, self.template, self.content, single, "/base/")
+        (single / "index.css").write_text("p {}")
+        for index in range(3):
+            build_shard(self.content, self.template, self.content, self.root / "shards" / str(index), "/base/",
+                        index=index, count=3)
+        manifests = merge_shards(self.root / "shards", static, self.template, merged, "/base/")
+        self.assertEqual(sum(len(manifest.pages) for manifest in manifests), 4)
+        self.assertEqual(self.read_tree(merged), self.read_tree(single))
+
+        # A shard rebuilt after the content changed no longer fits the others
+        (self.content / "new.md").write_text("# New")
+        build_shard(self.content, self.template, self.content, self.root / "shards" / "0", "/base/", index=0, count=3)
+        with self.assertRaisesRegex(ValueError, "different navigation"):
+            merge_shards(self.root / "shards", static, self.template, merged, "/base/")
+
+    def test_second_full_build_leaves_unchanged_pages(self):
+        out = self.root / "out"
+        static = self.root / "static"
+        static.mkdir()
+        (static / "index.css").write_text("p {}")
+        build_full(static, self.content, self.template, out)
+        (out / "stale.html").write_text("from an older build")
+        output_writer = writer.configure()
+        try:
+            produced = build_full(static, self.content, self.template, out)
+        finally:
+            writer.disable()
+        self.assertEqual(output_writer.stats(), {"written": 0, "unchanged": 3})
+        self.assertIn("index.css", produced)
+        self.assertEqual(sorted(self.read_tree(out)),
+                         ["about/index.html", "blog/index.html", "blog/post/index.html", "index.css", "index.html"])
+
+    def test_second_full_build_keeps_precompressed_siblings(self):
+        out = self.root / "out"
+        static = self.root / "static"
+        static.mkdir()
+        (static / "index.css").write_text("p {}")
+        build_full(static, self.content, self.template, out, keep_precompressed=True)
+        first = precompress.precompress(out)
+        self.assertTrue(all(first.values()))
+        build_full(static, self.content, self.template, out, keep_precompressed=True)
+        self.assertTrue((out / "index.html.gz").exists())
+        self.assertTrue((out / precompress.STATE_NAME).exists())
+        second = precompress.precompress(out)
+        self.assertEqual(sorted(second), sorted(first))
+        self.assertFalse(any(second.values()))
+
+    def test_dangling_link_fails_the_build(self):
+        (self.root / "static").mkdir()
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        try:
+            with mock.patch.object(sys, "argv", ["main.py", "--check-links"]):
+                main()
+                (self.content / "broken-link.md").write_text("# Broken\n\n[Gone](/gone)")
+                with self.assertRaises(SystemExit) as cm:
+                    main()
+        finally:
+            os.chdir(cwd)
+        self.assertEqual(cm.exception.code, 1)
+
+    def test_rebuild_changes_links_static_files(self):
+        out = self.root / "out"
+        static = self.root / "static"
+        static.mkdir()
+        generate_pages_recursive(self.content, self.template, self.content, out)
+        css = static / "index.css"
+        css.write_text("p {}")
+        outputs = rebuild_changes({str(css)}, set(), str(static), str(self.content), str(self.template), str(out),
+                                  link_mode="hardlink")
+        self.assertIn(os.path.join(str(out), "index.css"), outputs)
+        self.assertTrue(os.path.samefile(css, out / "index.css"))
+
+    def test_failing_page_is_named(self):
+        (self.content / "broken.md").write_text("# Broken\n\nan **unclosed bold")
+        with self.assertRaises(RuntimeError) as cm:
+            generate_pages_recursive(self.content, self.template, self.content, self.root / "out", jobs=2)
+        self.assertIn("broken.md", str(cm.exception))
+
+    def test_rebuild_changes_only_touches_affected_pages(self):
+        out = self.root / "out"
+        static = self.root / "static"
+        static.mkdir()
+        generate_pages_recursive(self.content, self.template, self.content, out)
+        about = self.content / "about.md"
+        about.write_text("# About\n\nEdited")
+        outputs = rebuild_changes({str(about)}, set(), str(static), str(self.content), str(self.template), str(out))
+        self.assertEqual(outputs, [str((out / "about" / "index.html").resolve())])
+        self.assertIn("Edited", (out / "about" / "index.html").read_text())
+
+        outputs = rebuild_changes({str(self.template)}, set(), str(static), str(self.content), str(self.template), str(out))
+        self.assertEqual(len(outputs), 3)
+
+        about.unlink()
+        rebuild_changes(set(), {str(about)}, str(static), str(self.content), str(self.template), str(out))
+        self.assertFalse((out / "about" / "index.html").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
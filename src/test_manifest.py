@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+import unittest
+from manifest import BuildManifest, MANIFEST_VERSION, file_hash
+from render_cache import PARSER_VERSION
+
+class TestBuildManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.source = os.path.join(self.root, "page.md")
+        with open(self.source, 'w') as f:
+            f.write("# Page")
+        self.destination = os.path.join(self.root, "out")
+        self.output_path = os.path.join(self.destination, "page", "index.html")
+        os.makedirs(os.path.dirname(self.output_path))
+        with open(self.output_path, 'w') as f:
+            f.write("<p>page</p>")
+        self.manifest_path = os.path.join(self.destination, "manifest.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_fresh_after_record(self):
+        manifest = BuildManifest(self.manifest_path)
+        source_hash = manifest.source_hash("page/index.html", self.source)
+        self.assertFalse(manifest.is_fresh("page/index.html", self.output_path, source_hash, "t1"))
+        manifest.record("page/index.html", self.source, source_hash, "t1")
+        self.assertTrue(manifest.is_fresh("page/index.html", self.output_path, source_hash, "t1"))
+        # A template change invalidates the output
+        self.assertFalse(manifest.is_fresh("page/index.html", self.output_path, source_hash, "t2"))
+
+    def test_round_trip_and_basepath_change(self):
+        manifest = BuildManifest(self.manifest_path, "/")
+        manifest.record("page/index.html", self.source, file_hash(self.source), "t1")
+        manifest.save()
+        self.assertIn("page/index.html", BuildManifest.load(self.manifest_path, "/").entries)
+        self.assertEqual(BuildManifest.load(self.manifest_path, "/other/").entries, {})
+
+    def test_older_renderer_version_discarded(self):
+        self.assertTrue(MANIFEST_VERSION.endswith(f".{PARSER_VERSION}"))
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record("page/index.html", self.source, file_hash(self.source), "t1")
+        manifest.save()
+        with open(self.manifest_path, 'r') as f:
+            data = json.load(f)
+        data["version"] = 1
+        with open(self.manifest_path, 'w') as f:
+            json.dump(data, f)
+        self.assertEqual(BuildManifest.load(self.manifest_path).entries, {})
+
+    def test_source_change_detected(self):
+        manifest = BuildManifest(self.manifest_path)
+        old_hash = file_hash(self.source)
+        manifest.record("page/index.html", self.source, old_hash, "t1")
+        with open(self.source, 'w') as f:
+            f.write("# Page, edited")
+        new_hash = manifest.source_hash("page/index.html", self.source)
+        self.assertNotEqual(old_hash, new_hash)
+        self.assertFalse(manifest.is_fresh("page/index.html", self.output_path, new_hash, "t1"))
+
+    def test_remove_stale(self):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record("page/index.html", self.source, file_hash(self.source), "t1")
+        removed = manifest.remove_stale(self.destination, set())
+        self.assertEqual(removed, ["page/index.html"])
+        self.assertFalse(os.path.exists(self.output_path))
+        self.assertFalse(os.path.exists(os.path.dirname(self.output_path)))
+        self.assertEqual(manifest.entries, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
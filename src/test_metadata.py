@@ -0,0 +1,108 @@
+import io
+import os
+import tempfile
+import unittest
+import metadata
+from metadata import PageMeta, SiteIndex, read_front_matter, read_head, read_metadata
+from listings import listing_pages, nav_node
+
+
+class TestFrontMatter(unittest.TestCase):
+    def test_front_matter_is_read_and_skipped(self):
+        f = io.StringIO('---\ntitle: "A Post"\ndate: 2024-05-01\ntags: [elves, songs]\n---\n# Heading\n\nBody\n')
+        meta, title = read_metadata(f)
+        self.assertEqual(meta, {"title": "A Post", "date": "2024-05-01", "tags": ["elves", "songs"]})
+        self.assertEqual(title, "A Post")
+        self.assertEqual(f.read(), "# Heading\n\nBody\n")
+
+    def test_title_from_heading(self):
+        f = io.StringIO("---\ndate: 2024-05-01\n---\n\n# Heading\n\nBody\n")
+        meta, title = read_metadata(f)
+        self.assertEqual(title, "Heading")
+        self.assertEqual(f.read(), "\n# Heading\n\nBody\n")
+
+    def test_no_front_matter(self):
+        f = io.StringIO("# Heading\n\n---\n")
+        self.assertEqual(read_front_matter(f), {})
+        self.assertEqual(f.read(), "# Heading\n\n---\n")
+
+    def test_unclosed_front_matter(self):
+        with self.assertRaises(ValueError):
+            read_front_matter(io.StringIO("---\ntitle: x\n# Heading\n"))
+
+
+class TestReadHead(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "page.md")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, text):
+        with open(self.path, 'w') as f:
+            f.write(text)
+        return read_head(self.path)
+
+    def test_title_in_head(self):
+        body = "\n\n".join(["para " * 40] * 200)
+        self.assertEqual(self.read(f"---\ntags: [a, b]\n---\n# Title\n\n{body}"), ({"tags": ["a", "b"]}, "Title"))
+
+    def test_title_past_head(self):
+        # A line cut at the end of the head is never taken for the title
+        padding = "x" * (metadata.HEAD_SIZE - 4)
+        self.assertEqual(self.read(f"{padding}\n# Title continues\n"), ({}, "Title continues"))
+        self.assertEqual(self.read(f"{padding}\n\n" + "text\n" * 5000 + "# Late\n"), ({}, "Late"))
+
+    def test_missing_title(self):
+        with self.assertRaises(ValueError):
+            self.read("text\n" * 5000)
+
+
+class TestSiteIndex(unittest.TestCase):
+    def setUp(self):
+        self.site_index = SiteIndex([
+            PageMeta("Home", "/"),
+            PageMeta("Contact", "/contact/"),
+            PageMeta("Old", "/blog/old/", "2023-01-01", ["elves"]),
+            PageMeta("New", "/blog/new/", "2024-01-01", ["elves", "songs"]),
+            PageMeta("Undated", "/blog/undated/"),
+        ])
+
+    def test_section_newest_first(self):
+        self.assertEqual([page.title for page in self.site_index.section("blog")], ["New", "Old", "Undated"])
+
+    def test_tags(self):
+        tags = self.site_index.tags()
+        self.assertEqual(list(tags), ["elves", "songs"])
+        self.assertEqual([page.title for page in tags["elves"]], ["New", "Old"])
+
+    def test_nav(self):
+        self.assertEqual(
+            nav_node(self.site_index).to_html(),
+            '<nav><ul><li><a href="/">Home</a></li><li><a href="/blog/">Blog</a></li>'
+            '<li><a href="/contact/">Contact</a></li></ul></nav>',
+        )
+
+    def test_listing_pages(self):
+        outputs = [output for output, _, _ in listing_pages(self.site_index, page_size=2)]
+        self.assertEqual(outputs, [
+            "blog/index.html", "blog/page/2/index.html",
+            "tags/elves/index.html", "tags/songs/index.html", "tags/index.html",
+        ])
+        _, title, content = next(listing_pages(self.site_index, page_size=2))
+        self.assertEqual(title, "Blog")
+        self.assertIn('<a href="/blog/page/2/" rel="next">Older</a>', content.to_html())
+
+    def test_colliding_tag_slugs_are_told_apart(self):
+        site_index = SiteIndex([PageMeta("One", "/blog/one/", None, ["C", "C++", "C#", "c-2"])])
+        pages = {output: title for output, title, _ in listing_pages(site_index)}
+        self.assertEqual(pages["tags/c/index.html"], "Tagged: C")
+        self.assertEqual(pages["tags/c-2/index.html"], "Tagged: C#")
+        self.assertEqual(pages["tags/c-3/index.html"], "Tagged: C++")
+        self.assertEqual(pages["tags/c-2-2/index.html"], "Tagged: c-2")
+        self.assertEqual(len([output for output in pages if output.startswith("tags/")]), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+import metadata_cache
+from metadata import read_site_index
+
+class TestMetadataCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, "metadata.db")
+        self.source = os.path.join(self.tmp.name, "post.md")
+        self.write("---\ndate: 2024-05-01\ntags: [elves, songs]\n---\n# Post\n")
+        self.pages = [(self.source, os.path.join(self.tmp.name, "out", "post", "index.html"))]
+
+    def tearDown(self):
+        metadata_cache.disable()
+        self.tmp.cleanup()
+
+    def write(self, text):
+        with open(self.source, 'w') as f:
+            f.write(text)
+
+    def read(self):
+        cache = metadata_cache.configure(self.db)
+        page = read_site_index(self.pages, os.path.join(self.tmp.name, "out")).pages[0]
+        stats = cache.stats()
+        metadata_cache.disable()
+        return (page.title, page.path, page.date, page.tags), stats
+
+    def test_unchanged_page_is_not_read(self):
+        expected = ("Post", "/post/", "2024-05-01", ["elves", "songs"])
+        self.assertEqual(self.read(), (expected, {"hits": 0, "misses": 1}))
+        self.assertEqual(self.read(), (expected, {"hits": 1, "misses": 0}))
+
+    def test_changed_page_is_read_again(self):
+        self.read()
+        self.write("# Renamed post\n")
+        self.assertEqual(self.read(), (("Renamed post", "/post/", None, []), {"hits": 0, "misses": 1}))
+
+    def test_pages_gone_from_the_walk_are_deleted(self):
+        other = os.path.join(self.tmp.name, "other.md")
+        with open(other, 'w') as f:
+            f.write("# Other\n")
+        self.pages.append((other, os.path.join(self.tmp.name, "out", "other", "index.html")))
+        self.read()
+        os.remove(other)
+        del self.pages[1]
+        self.read()
+        connection = sqlite3.connect(self.db)
+        sources = [row[0] for row in connection.execute("SELECT source FROM pages")]
+        connection.close()
+        self.assertEqual(sources, [self.source])
+
+    def test_other_version_is_discarded(self):
+        self.read()
+        connection = sqlite3.connect(self.db)
+        connection.execute(f"PRAGMA user_version = {metadata_cache.METADATA_VERSION + 1}")
+        connection.close()
+        self.assertEqual(self.read()[1], {"hits": 0, "misses": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,27 @@
+import unittest
+from minify import minify_css, minify_html
+
+
+class TestMinifyHtml(unittest.TestCase):
+    def test_block_whitespace_dropped(self):
+        self.assertEqual(minify_html("<ul>\n  <li>a</li>\n  <li>b</li>\n</ul>"), "<ul><li>a</li><li>b</li></ul>")
+
+    def test_inline_whitespace_collapsed(self):
+        self.assertEqual(minify_html("<b>one</b>\n   <i>two</i>  three"), "<b>one</b> <i>two</i> three")
+
+    def test_preformatted_kept(self):
+        html = "<div>\n  <pre>  a\n    b</pre>\n</div>"
+        self.assertEqual(minify_html(html), "<div><pre>  a\n    b</pre></div>")
+
+
+class TestMinifyCss(unittest.TestCase):
+    def test_whitespace_and_comments(self):
+        css = "/* site */\nbody {\n  color: #fff;\n  margin: 0 auto;\n}\n\nh1, h2 > a {\n  color: red;\n}\n"
+        self.assertEqual(minify_css(css), "body{color:#fff;margin:0 auto}h1,h2>a{color:red}")
+
+    def test_strings_kept(self):
+        self.assertEqual(minify_css('a::after { content: "  /* x */ ; " ; }'), 'a::after{content:"  /* x */ ; "}')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import gzip
+import os
+import tempfile
+import unittest
+from precompress import precompress
+
+
+class TestPrecompress(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.write("index.html", "<p>hello</p>" * 50)
+        self.write(os.path.join("blog", "index.html"), "<p>blog</p>")
+        self.write("logo.png", "not text")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, rel_path, text):
+        path = os.path.join(self.root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def test_writes_gzip_siblings(self):
+        results = precompress(self.root, jobs=2)
+        self.assertEqual(results, {"blog/index.html": True, "index.html": True})
+        with gzip.open(os.path.join(self.root, "index.html.gz"), 'rt') as f:
+            self.assertEqual(f.read(), "<p>hello</p>" * 50)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "logo.png.gz")))
+
+    def test_unchanged_outputs_skipped(self):
+        precompress(self.root)
+        self.write("index.html", "<p>changed</p>")
+        self.assertEqual(precompress(self.root), {"blog/index.html": False, "index.html": True})
+
+    def test_siblings_of_deleted_outputs_removed(self):
+        precompress(self.root)
+        os.remove(os.path.join(self.root, "blog", "index.html"))
+        self.write("archive.tar.gz", "a download, not a sibling")
+        precompress(self.root)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "blog", "index.html.gz")))
+        self.assertTrue(os.path.exists(os.path.join(self.root, "archive.tar.gz")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import time
+import unittest
+import profiler
+from block import markdown_to_html_node
+
+class TestProfiler(unittest.TestCase):
+    def tearDown(self):
+        profiler.disable()
+
+    def test_disabled_records_nothing(self):
+        self.assertIsNone(profiler.active())
+        with profiler.stage("read"), profiler.page("a.md"):
+            markdown_to_html_node("# Title\n\nSome **text**")
+        self.assertIsNone(profiler.active())
+
+    def test_stages_and_pages(self):
+        build_profiler = profiler.enable()
+        with profiler.page("a.md"):
+            markdown_to_html_node("# Title\n\nSome **text**\n\n- a\n- b")
+        report = build_profiler.report()
+        self.assertEqual(report["page_count"], 1)
+        # Blocks are split off one at a time, so each one counts as a call
+        self.assertEqual(report["stages"]["markdown_to_blocks"]["calls"], 3)
+        self.assertEqual(report["stages"]["block_to_block_type"]["calls"], 3)
+        self.assertEqual(report["stages"]["text_to_textnodes"]["calls"], 4)
+        self.assertEqual(report["slowest_pages"][0]["page"], "a.md")
+        self.assertIn("text_to_textnodes", report["slowest_pages"][0]["stages"])
+
+    def test_generator_stage_leaves_out_the_consumer(self):
+        @profiler.profiled_generator("split")
+        def split(text):
+            yield from text.split()
+
+        build_profiler = profiler.enable()
+        for _ in split("a b"):
+            time.sleep(0.05)
+        calls, seconds = build_profiler.stages["split"]
+        self.assertEqual(calls, 2)
+        self.assertLess(seconds, 0.05)
+
+    def test_drain_and_merge(self):
+        worker = profiler.Profiler()
+        worker.add("read", 0.5)
+        with worker.page("b.md"):
+            worker.add("write", 0.25)
+        parent = profiler.Profiler()
+        parent.add("read", 0.5)
+        parent.merge(worker.drain())
+        self.assertEqual(worker.stages, {})
+        self.assertEqual(parent.stages["read"], [2, 1.0])
+        self.assertEqual(parent.pages["b.md"]["stages"]["write"], [1, 0.25])
+
+
+if __name__ == "__main__":
+    unittest.main()
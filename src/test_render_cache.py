@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+import feeds
+import links
+import render_cache
+from render_cache import BlockCache
+from block import markdown_to_html_node
+
+MARKDOWN = "# Title\n\nShared **notice** with a [link](/x)\n\n- a\n- b\n\nShared **notice** with a [link](/x)"
+
+class TestBlockCache(unittest.TestCase):
+    def tearDown(self):
+        render_cache.disable()
+
+    def test_lru_eviction(self):
+        cache = BlockCache(max_entries=2)
+        for key in ("a", "b", "c"):
+            cache.put(key, f"<p>{key}</p>")
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), ("<p>c</p>", [], []))
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1, "entries": 2})
+
+    def test_key_depends_on_text(self):
+        self.assertEqual(BlockCache.key(["a", "b"]), BlockCache.key(["a", "b"]))
+        self.assertNotEqual(BlockCache.key(["a", "b"]), BlockCache.key(["a b"]))
+
+    def test_rendering_with_cache_matches(self):
+        expected = markdown_to_html_node(MARKDOWN).to_html()
+        cache = render_cache.configure()
+        self.assertEqual(markdown_to_html_node(MARKDOWN).to_html(), expected)
+        # The repeated paragraph is served from the cache
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+        self.assertEqual(markdown_to_html_node(MARKDOWN).to_html(), expected)
+        self.assertEqual((cache.hits, cache.misses), (5, 3))
+
+    def test_disk_store_shared_across_builds(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "blocks.db")
+            render_cache.configure(path=path)
+            expected = markdown_to_html_node(MARKDOWN).to_html()
+            cache = render_cache.configure(path=path)
+            self.assertEqual(markdown_to_html_node(MARKDOWN).to_html(), expected)
+            self.assertEqual(cache.misses, 0)
+            render_cache.disable()
+
+    def test_hits_replay_references(self):
+        render_cache.configure()
+        with links.capture() as first, feeds.capture() as first_texts:
+            markdown_to_html_node(MARKDOWN)
+        with links.capture() as second, feeds.capture() as second_texts:
+            markdown_to_html_node(MARKDOWN)
+        self.assertEqual(first, [("link", "/x"), ("link", "/x")])
+        self.assertEqual(second, first)
+        paragraph = "Shared notice with a link"
+        self.assertEqual(first_texts, ["Title", paragraph, "a", "b", paragraph])
+        self.assertEqual(second_texts, first_texts)
+
+    def test_text_is_only_collected_when_wanted(self):
+        with links.capture() as refs:
+            markdown_to_html_node(MARKDOWN)
+        self.assertEqual(refs, [("link", "/x"), ("link", "/x")])
+        self.assertFalse(feeds.collecting())
+
+
+if __name__ == "__main__":
+    unittest.main()
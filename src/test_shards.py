@@ -0,0 +1,45 @@
+import unittest
+from metadata import PageMeta
+from shards import ShardManifest, check_manifests, parse_shard, shard_of
+
+class TestShards(unittest.TestCase):
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for spec in ("4/4", "-1/4", "0/0", "1", "a/b"):
+            with self.assertRaises(ValueError):
+                parse_shard(spec)
+
+    def test_partition_is_stable_and_complete(self):
+        sources = [f"blog/post-{i}.md" for i in range(200)]
+        shards = [shard_of(source, 4) for source in sources]
+        # The same on every run, unlike the salted hash()
+        self.assertEqual(shard_of("blog/post-0.md", 4), shard_of("blog/post-0.md", 4))
+        self.assertEqual(set(shards), {0, 1, 2, 3})
+        self.assertTrue(all(shards.count(shard) > 20 for shard in range(4)))
+
+    def manifests(self, count=2):
+        manifests = [ShardManifest(index, count, "/", "nav") for index in range(count)]
+        for index, manifest in enumerate(manifests):
+            manifest.add_page(f"p{index}/index.html", "h", PageMeta(f"P{index}", f"/p{index}/"))
+        return manifests
+
+    def test_check_manifests(self):
+        check_manifests(self.manifests())
+        with self.assertRaisesRegex(ValueError, "missing \\[1\\]"):
+            check_manifests(self.manifests()[:1])
+        manifests = self.manifests()
+        manifests[1].basepath = "/other/"
+        with self.assertRaisesRegex(ValueError, "built for"):
+            check_manifests(manifests)
+        manifests = self.manifests()
+        manifests[1].nav_hash = "stale"
+        with self.assertRaisesRegex(ValueError, "different navigation"):
+            check_manifests(manifests)
+        manifests = self.manifests()
+        manifests[1].pages.update(manifests[0].pages)
+        with self.assertRaisesRegex(ValueError, "p0/index.html was produced by both shard 0 and shard 1"):
+            check_manifests(manifests)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+from template import RelocatableHTML, Template, load_template, relocate
+
+class TestTemplate(unittest.TestCase):
+    def test_compile_segments(self):
+        template = Template("<title>{{ Title }}</title><main>{{Content}}</main>")
+        self.assertEqual(template.slots, ["Title", "Content"])
+        self.assertEqual(template.segments, ["<title>", "Title", "</title><main>", "Content", "</main>"])
+
+    def test_render(self):
+        template = Template("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        html = template.render({"Title": "Home", "Content": iter(["<p>", "hi", "</p>"])})
+        self.assertEqual(html, "<title>Home</title><main><p>hi</p></main>")
+
+    def test_missing_value_keeps_placeholder(self):
+        template = Template("<nav>{{ Nav }}</nav>{{ Content }}")
+        self.assertEqual(template.render({"Content": "x"}), "<nav>{{ Nav }}</nav>x")
+
+    def test_static_segments_relocated(self):
+        template = Template('<link href="/index.css" /><img src="/a.png" />{{ Content }}', "/site/")
+        self.assertEqual(
+            template.render({"Content": ""}),
+            '<link href="/site/index.css" /><img src="/site/a.png" />',
+        )
+        self.assertEqual(relocate('<a href="/x">', "/"), '<a href="/x">')
+
+    def test_relocatable_html_matches_relocate(self):
+        html = ('<a href="/x">x</a><a href="https://e.com/">e</a><img src="/a.png" '
+                'srcset="/a-480.png 480w, /a-960.png 960w, https://e.com/b.png 2x" />')
+        body = RelocatableHTML(html)
+        self.assertEqual(len(body.offsets), 4)
+        self.assertIs(body.relocate("/"), html)
+        self.assertEqual(
+            body.relocate("/site/"),
+            '<a href="/site/x">x</a><a href="https://e.com/">e</a><img src="/site/a.png" '
+            'srcset="/site/a-480.png 480w, /site/a-960.png 960w, https://e.com/b.png 2x" />',
+        )
+        links = '<a href="/x">x</a> <img src="/a.png" /> <a href="#top">top</a>'
+        self.assertEqual(RelocatableHTML(links).relocate("/v1.2/"), relocate(links, "/v1.2/"))
+
+    def test_minified_segments(self):
+        source = "<!doctype html>\n<html>\n  <head>\n    <title>{{ Title }}</title>\n  </head>\n  <body>\n    <p>{{ Content }}</p>\n  </body>\n</html>\n"
+        template = Template(source, minify=True)
+        self.assertEqual(
+            template.render({"Title": "T", "Content": "<b>x</b>\n"}),
+            "<!doctype html><html><head><title>T</title></head><body><p><b>x</b>\n</p></body></html>",
+        )
+
+    def test_load_template_is_cached_until_changed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, 'w') as f:
+                f.write("<p>{{ Content }}</p>")
+            first = load_template(path)
+            self.assertIs(first, load_template(path))
+            with open(path, 'w') as f:
+                f.write("<div>{{ Content }}</div>")
+            os.utime(path, ns=(0, 0))
+            self.assertEqual(load_template(path).render({"Content": "x"}), "<div>x</div>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 
-from textnode import TextNode, TextType, text_node_to_html_node
+from textnode import TextNode, TextType, text_node_to_html_node, text_nodes_to_html
 from htmlnode import LeafNode
 
 class TestTextNode(unittest.TestCase):
@@ -63,6 +63,19 @@ class TestTextNode(unittest.TestCase):
         self.assertEqual(html_node.value, None)
         self.assertEqual(html_node.props, {"src": "source_image", "alt": "I'm an image"})
 
+    def test_batched_matches_per_node(self):
+        nodes = [
+            TextNode("a < b & ", TextType.TEXT),
+            TextNode("bold", TextType.BOLD),
+            TextNode("x<y", TextType.CODE),
+            TextNode("Q&A", TextType.LINK, "/q?a=1&b=2"),
+            TextNode('a "tag"', TextType.IMAGE, "/a.png"),
+        ]
+        html = text_nodes_to_html(nodes)
+        self.assertEqual(html, "".join(text_node_to_html_node(node).to_html() for node in nodes))
+        self.assertEqual(html, 'a &lt; b &amp; <b>bold</b><code>x&lt;y</code><a href="/q?a=1&amp;b=2">Q&amp;A</a>'
+                               '<img src="/a.png" alt="a &quot;tag&quot;" />')
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+import urllib.request
+from watch import DevServer, snapshot, diff_snapshots
+
+class TestWatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.page = os.path.join(self.root, "index.html")
+        with open(self.page, 'w') as f:
+            f.write("<html><body><p>hi</p></body></html>")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_snapshot_diff(self):
+        before = snapshot([self.root])
+        self.assertEqual(diff_snapshots(before, snapshot([self.root])), (set(), set()))
+        new_file = os.path.join(self.root, "new.css")
+        with open(new_file, 'w') as f:
+            f.write("body {}")
+        os.utime(self.page, ns=(0, 0))
+        changed, removed = diff_snapshots(before, snapshot([self.root]))
+        self.assertEqual(changed, {new_file, self.page})
+        self.assertEqual(removed, set())
+        with_new_file = snapshot([self.root])
+        os.remove(new_file)
+        self.assertEqual(diff_snapshots(with_new_file, snapshot([self.root])), (set(), {new_file}))
+
+    def test_dev_server_live_reload(self):
+        server = DevServer(self.root, port=0, basepath="/site/", live_reload=True)
+        server.start()
+        try:
+            with urllib.request.urlopen(server.url) as response:
+                html = response.read().decode()
+            self.assertIn("<p>hi</p>", html)
+            self.assertIn("__livereload", html)
+            self.assertTrue(html.endswith("</script></body></html>"))
+            server.notify_reload()
+            host, port = server.httpd.server_address[:2]
+            with urllib.request.urlopen(f"http://{host}:{port}/__livereload") as response:
+                self.assertEqual(response.read().decode(), "1")
+        finally:
+            server.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
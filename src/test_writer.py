@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+import writer
+from writer import OutputWriter
+from main import generate_pages_recursive
+
+
+class TestOutputWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        writer.disable()
+        self.tmp.cleanup()
+
+    def test_writes_and_skips_unchanged(self):
+        output_writer = OutputWriter(threads=2, max_pending=2, batch_size=2)
+        for i in range(10):
+            output_writer.submit(self.root / f"page-{i}" / "index.html", f"<p>{i}</p>".encode())
+        output_writer.flush()
+        mtime = os.stat(self.root / "page-3" / "index.html").st_mtime_ns
+        output_writer.submit(self.root / "page-3" / "index.html", b"<p>3</p>")
+        output_writer.submit(self.root / "page-4" / "index.html", b"<p>four</p>")
+        output_writer.close()
+        self.assertEqual(output_writer.stats(), {"written": 11, "unchanged": 1})
+        self.assertEqual(os.stat(self.root / "page-3" / "index.html").st_mtime_ns, mtime)
+        self.assertEqual((self.root / "page-4" / "index.html").read_bytes(), b"<p>four</p>")
+        self.assertEqual(len(output_writer.directories), 10)
+        self.assertEqual(sorted(p.name for p in self.root.rglob("*.tmp")), [])
+
+    def test_error_is_raised(self):
+        (self.root / "file").write_text("not a directory")
+        output_writer = OutputWriter(threads=1)
+        output_writer.submit(self.root / "file" / "index.html", b"x")
+        with self.assertRaises(RuntimeError):
+            output_writer.close()
+
+    def test_build_matches_synchronous_writes(self):
+        content = self.root / "content"
+        (content / "blog").mkdir(parents=True)
+        (content / "index.md").write_text("# Home\n\n[Blog](/blog)")
+        (content / "blog" / "index.md").write_text("# Blog\n\n- one\n- two")
+        template = self.root / "template.html"
+        template.write_text("<title>{{ Title }}</title>{{ Content }}")
+        generate_pages_recursive(content, template, content, self.root / "sync")
+        for jobs in (1, 2):
+            writer.configure(threads=2)
+            generate_pages_recursive(content, template, content, self.root / f"behind-{jobs}", jobs=jobs)
+            writer.disable()
+            for page in ("index.html", "blog/index.html"):
+                self.assertEqual((self.root / f"behind-{jobs}" / page).read_bytes(),
+                                 (self.root / "sync" / page).read_bytes())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import functools
+import os
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+LIVE_RELOAD_PATH = "/__livereload"
+# Injected into served pages when live reload is on: polls the build version
+# and reloads the page once it changes.
+LIVE_RELOAD_SCRIPT = """<script>
+(function () {
+  var version = null;
+  setInterval(function () {
+    fetch("%s").then(function (r) { return r.text(); }).then(function (v) {
+      if (version !== null && v !== version) { location.reload(); }
+      version = v;
+    }).catch(function () {});
+  }, 1000);
+})();
+</script>""" % LIVE_RELOAD_PATH
+
+
+def snapshot(paths):
+    """
+    Records the size and mtime of every file under the given paths.
+
+    Args:
+        paths (list): Files or directories to scan.
+
+    Returns:
+        dict: File path to (mtime_ns, size).
+    """
+    files = {}
+    for path in paths:
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            files[path] = (stat.st_mtime_ns, stat.st_size)
+            continue
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                file_path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(file_path)
+                except FileNotFoundError:
+                    # Deleted between listing and stat, e.g. an editor's swap file
+                    continue
+                files[file_path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def diff_snapshots(old, new):
+    """
+    Compares two snapshots.
+
+    Returns:
+        tuple: (set of added or modified paths, set of removed paths).
+    """
+    changed = {path for path, signature in new.items() if old.get(path) != signature}
+    removed = set(old) - set(new)
+    return changed, removed
+
+
+class DevServer:
+    """
+    Serves a directory over HTTP from a background thread, mapping the site's
+    basepath back onto the directory so links built for it resolve locally.
+
+    With live_reload, HTML pages are served with a script that reloads them
+    after each call to notify_reload.
+    """
+    def __init__(self, directory, port=8000, basepath="/", live_reload=False, host="127.0.0.1"):
+        self.directory = directory
+        self.basepath = basepath
+        self.live_reload = live_reload
+        self.version = 0
+        handler = functools.partial(_DevRequestHandler, self, directory=directory)
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{self.basepath}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        print(f"Serving {self.directory} at {self.url}")
+
+    def notify_reload(self):
+        """Marks a new build so live-reloading pages refresh."""
+        self.version += 1
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _DevRequestHandler(SimpleHTTPRequestHandler):
+    def __init__(self, server_state, *args, **kwargs):
+        self.state = server_state
+        super().__init__(*args, **kwargs)
+
+    def translate_path(self, path):
+        # Requests arrive under the basepath the site was built for
+        basepath = self.state.basepath
+        if basepath != "/" and path.startswith(basepath):
+            path = "/" + path[len(basepath):]
+        return super().translate_path(path)
+
+    def do_GET(self):
+        if self.path == LIVE_RELOAD_PATH:
+            self.send_text(str(self.state.version), "text/plain")
+            return
+        if self.state.live_reload:
+            file_path = self.translate_path(self.path.split("?", 1)[0])
+            if os.path.isdir(file_path):
+                file_path = os.path.join(file_path, "index.html")
+            if file_path.endswith(".html") and os.path.isfile(file_path):
+                with open(file_path, 'r') as f:
+                    html = f.read()
+                head, body_end, tail = html.rpartition("</body>")
+                html = head + LIVE_RELOAD_SCRIPT + body_end + tail if body_end else html + LIVE_RELOAD_SCRIPT
+                self.send_text(html, "text/html")
+                return
+        super().do_GET()
+
+    def send_text(self, text, content_type):
+        body = text.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep the console for build output
+        pass
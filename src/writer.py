@@ -0,0 +1,193 @@
+import os
+import queue
+import threading
+
+# The OutputWriter that generated pages are handed to in this process, or
+# None when pages are written synchronously
+_active = None
+
+
+class OutputWriter:
+    """
+    A write-behind stage for generated files. Pages are queued as bytes and
+    written by a pool of threads, so the file system's latency overlaps with
+    rendering the next pages.
+
+    The queue is bounded, so rendering blocks instead of piling up pages in
+    memory when the disk falls behind. Each thread takes up to batch_size
+    queued files at a time and creates the directories the batch needs
+    before writing it; directories already created are remembered and never
+    created again. Every file goes through a temporary file renamed into
+    place, and a file whose bytes are already on disk is not written at all.
+    """
+    def __init__(self, threads=4, max_pending=64, batch_size=16):
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.directories = set()
+        self.lock = threading.Lock()
+        self.written = 0
+        self.unchanged = 0
+        self.error = None
+        self.threads = [threading.Thread(target=self._run, daemon=True) for _ in range(threads)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, path, data):
+        """
+        Queues a file to be written, blocking while the queue is full.
+
+        Args:
+            path (str): The path of the file.
+            data (bytes): The complete contents of the file.
+        """
+        if self.error is not None:
+            raise RuntimeError(f"Output writer failed: {self.error}") from self.error
+        self.queue.put((os.fspath(path), data))
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            # Take whatever else is already waiting, up to a batch
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch([item for item in batch if item is not None])
+            except Exception as e:
+                self.error = self.error or e
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+            if None in batch:
+                # The batch held this thread's sentinel; hand any other
+                # thread's sentinel back to the queue for it to find
+                for _ in range(batch.count(None) - 1):
+                    self.queue.put(None)
+                return
+
+    def _write_batch(self, batch):
+        for directory in {os.path.dirname(path) for path, _ in batch}:
+            self.make_directory(directory)
+        for path, data in batch:
+            written = self.write_file(path, data)
+            with self.lock:
+                if written:
+                    self.written += 1
+                else:
+                    self.unchanged += 1
+
+    def make_directory(self, directory):
+        """Creates a directory and its parents, once per writer."""
+        if not directory or directory in self.directories:
+            return
+        os.makedirs(directory, exist_ok=True)
+        with self.lock:
+            self.directories.add(directory)
+
+    @staticmethod
+    def write_file(path, data):
+        """
+        Writes a file through a temporary file renamed into place, unless it
+        already holds exactly these bytes.
+
+        Args:
+            path (str): The path of the file.
+            data (bytes): The complete contents of the file.
+
+        Returns:
+            bool: True if the file was written, False if it was unchanged.
+        """
+        try:
+            # Only read the old file when its size leaves a chance of a match
+            if os.stat(path).st_size == len(data):
+                with open(path, 'rb') as f:
+                    if f.read() == data:
+                        return False
+        except FileNotFoundError:
+            pass
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, path)
+        return True
+
+    def flush(self):
+        """
+        Waits for every file queued so far to be written. Raises the first
+        error a thread ran into, if any.
+        """
+        self.queue.join()
+        if self.error is not None:
+            raise RuntimeError(f"Output writer failed: {self.error}") from self.error
+
+    def close(self):
+        """
+        Waits for every queued file to be written and stops the threads.
+        Raises the first error a thread ran into, if any.
+        """
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        if self.error is not None:
+            raise RuntimeError(f"Output writer failed: {self.error}") from self.error
+
+    def stats(self):
+        """Returns how many files were written and how many were left unchanged."""
+        return {"written": self.written, "unchanged": self.unchanged}
+
+
+class OutputBuffer:
+    """
+    Stands in for an OutputWriter in a worker process: keeps the submitted
+    files so they can be handed to the parent's writer instead of being
+    written from every worker.
+    """
+    def __init__(self):
+        self.pending = []
+
+    def submit(self, path, data):
+        self.pending.append((os.fspath(path), data))
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """Returns the files submitted so far and forgets them."""
+        pending, self.pending = self.pending, []
+        return pending
+
+
+def configure(threads=4, max_pending=64, batch_size=16):
+    """Starts writing generated pages behind rendering and returns the OutputWriter."""
+    global _active
+    _active = OutputWriter(threads, max_pending, batch_size)
+    return _active
+
+
+def buffer():
+    """Starts keeping generated pages in an OutputBuffer and returns it."""
+    global _active
+    _active = OutputBuffer()
+    return _active
+
+
+def disable():
+    """Writes out everything queued and goes back to synchronous writes."""
+    global _active
+    output_writer, _active = _active, None
+    if isinstance(output_writer, OutputWriter):
+        output_writer.close()
+
+
+def active():
+    """Returns the active OutputWriter, or None when pages are written synchronously."""
+    return _active